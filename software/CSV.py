@@ -1,35 +1,246 @@
-#import machine
-#import SD
+import array
+import frame
+import delta
 
 #an abstraction of a CSV file, used for logging sensor data
+#rows are held in a fixed-capacity ring buffer of numbers (one flat array, no per-row lists) so adding a row never allocates,
+#comp() formats every buffered row into one reusable bytearray and write() hands the whole batch to the SD card in a single call
+#with fmt = 'frame' rows are written as fixed-width binary frames instead of text (see frame.py), which needs x = frame.COLUMNS:
+#the 15 channels in frame.FIELDS order followed by the tick in ms
+#fmt = 'delta' takes the same rows and writes each batch as one delta compressed block (see delta.py), with a keyframe
+#every keyframe_every rows. The encoder carries on from one batch to the next, so in this mode only write() calls comp()
+#tick_column is a column holding a tick in ms (the last one for frames), kept in an integer array of its own: a float32
+#one stops holding every millisecond once the tick passes 2^24 ms, 4.66 hours after the pico started
+
+INT_MAX = 999999999 #integer parts are clamped to 9 digits so the digit maths stays in small ints
+_PAIRS = bytes(''.join(['%02d' % i for i in range(100)]), 'ascii') #'00' to '99', so digits are written two at a time
+
 
 class CSV():
-    
-    def __init__(self, x = 10, y = 10, fname = 'log', directory = 'logs'):
-        self.x = x
-        self.y = y
-        array = []
-        for i in range(self.y):
-            b = []
-            for j in range(self.x):
-                b = b + ['']
-            array = array + [b]
-        self.array = array
+
+    def __init__(self, x = 16, y = 32, fname = 'log', directory = 'logs', sd = None, header = None, decimals = 3, typecode = 'f', fmt = 'csv', keyframe_every = 100, tick_column = None):
+        self.x = x #number of columns
+        self.y = y #capacity in rows, when full the oldest row is overwritten and counted in self.dropped
+        self.array = array.array(typecode, [0] * (x * y)) #row r, column c lives at array[r*x + c]
+        if(tick_column is None and (fmt == 'frame' or fmt == 'delta')):
+            tick_column = x - 1
+        self.tick_column = tick_column
+        self.ticks = array.array('L', [0] * y) if tick_column is not None else None #row r's tick, in place of its column
+        self.head = 0 #slot of the oldest buffered row
+        self.count = 0 #number of complete rows in the buffer
+        self.pending = False #True while a row is being filled in with put()
+        self.dropped = 0
+        self.decimals = decimals
+        self.scale = 10 ** decimals
+        self.header = b''
+        if(header):
+            self.header = (','.join(header) + '\n').encode()
+        self.header_written = False
+        self.fmt = fmt
+        self.seq = 0 #sequence number of the next frame
+        if(fmt == 'frame' or fmt == 'delta'):
+            if(x != frame.COLUMNS):
+                raise ValueError('frames need %d columns' % frame.COLUMNS)
+            self.header = b''
+            if(fmt == 'delta'): #the encoder has its own buffer
+                self.enc = delta.encoder(y, keyframe_every)
+                self.out = self.enc.buf
+            else:
+                self.out = bytearray(frame.SIZE * y)
+        else:
+            #worst case formatted value: sign, 10 integer digits (9 plus a rounding carry), point, decimals and the separator
+            self.out = bytearray(len(self.header) + (13 + decimals) * x * y)
+        self.out_mv = memoryview(self.out)
         self.fname = fname
         self.directory = directory
-        self.sd = SD.card(self.fname, self.directory)
-        
-        
+        if(sd is None): #anything with a write_to_card(data, fname) method will do, which lets the logger run without a card
+            import SD
+            sd = SD.card(self.fname, self.directory, ext_default = 'csv' if fmt == 'csv' else 'bin')
+        self.sd = sd
+
+    def __len__(self):
+        return(self.count)
+
+    def _slot(self): #returns the slot for a new row, giving up the oldest row if the buffer is full
+        if(self.count == self.y):
+            self.head += 1
+            if(self.head == self.y):
+                self.head = 0
+            self.count -= 1
+            self.dropped += 1
+        i = self.head + self.count
+        if(i >= self.y):
+            i -= self.y
+        return(i)
+
+    def append(self, row): #copy one row (any sequence of at least x numbers, ideally a preallocated list or array) into the buffer
+        if(self.pending): #a row half built with put() goes in first, rather than being written over
+            self.commit()
+        i = self._slot()
+        base = i * self.x
+        a = self.array
+        for c in range(self.x):
+            a[base + c] = row[c]
+        if(self.ticks is not None):
+            self.ticks[i] = int(row[self.tick_column])
+        self.count += 1
+        self.pending = False
+
+    def put(self, column, value): #set a single column of the row being built, call commit() once the row is complete
+        if(not self.pending):
+            self.pending_slot = self._slot()
+            self.pending_base = self.pending_slot * self.x
+            self.pending = True
+        if(column == self.tick_column):
+            self.ticks[self.pending_slot] = int(value)
+        self.array[self.pending_base + column] = value
+
+    def commit(self): #finish the row started with put(), columns that were not set keep whatever the slot held before
+        if(self.pending):
+            self.count += 1
+            self.pending = False
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.pending = False
+
     def comp(self):
-        return(0)
-        #return a CSV-formatted string for writing to the card
-        
+        #return the buffered rows as CSV-formatted bytes (or frames) for writing to the card
+        #the result is a memoryview into self.out, so it is only valid until the next call
+        buf = self.out
+        n = 0
+        if(self.fmt == 'frame'):
+            r = self.head
+            for k in range(self.count):
+                n = frame.pack_into(buf, n, self.seq + k, self.array, r * self.x, self.ticks[r])
+                r += 1
+                if(r == self.y):
+                    r = 0
+            return(self.out_mv[:n])
+        if(self.fmt == 'delta'):
+            enc = self.enc
+            enc.seq = self.seq
+            r = self.head
+            block = None
+            for k in range(self.count):
+                block = enc.add(self.array, r * self.x, self.ticks[r]) #y rows per block, so only the last row can finish it
+                r += 1
+                if(r == self.y):
+                    r = 0
+            return(block if block is not None else enc.finish())
+        if(not self.header_written and self.header):
+            n = len(self.header)
+            buf[0:n] = self.header
+        #every value as fixed point text with self.decimals places, written straight into buf: the integer and fraction
+        #digits go in right to left two at a time from _PAIRS, so there's no call and one divide per two digits
+        a = self.array
+        x = self.x
+        tc = self.tick_column
+        ticks = self.ticks
+        pairs = _PAIRS
+        d = self.decimals
+        scale = self.scale
+        top = INT_MAX
+        r = self.head
+        for k in range(self.count):
+            base = r * x
+            tick = base + tc if tc is not None else -1
+            for c in range(base, base + x):
+                v = a[c] if c != tick else ticks[r]
+                if(v != v): #nan
+                    buf[n] = 110
+                    buf[n + 1] = 97
+                    buf[n + 2] = 110
+                    buf[n + 3] = 44 #','
+                    n += 4
+                    continue
+                if(v < 0):
+                    buf[n] = 45 #'-'
+                    n += 1
+                    v = -v
+                if(v > top):
+                    v = top
+                i = int(v)
+                if(d):
+                    f = int((v - i) * scale + 0.5)
+                    if(f >= scale): #rounding carried into the integer part
+                        f -= scale
+                        i += 1
+                elif(v - i >= 0.5):
+                    i += 1
+                if(i < 10):
+                    buf[n] = 48 + i
+                    n += 1
+                elif(i < 100):
+                    buf[n] = pairs[i << 1]
+                    buf[n + 1] = pairs[(i << 1) + 1]
+                    n += 2
+                else: #find the width, then right to left
+                    w = 3
+                    p = 1000
+                    while(i >= p):
+                        w += 1
+                        p *= 10
+                    n += w
+                    j = n
+                    while(i >= 100):
+                        q = i // 100
+                        t = (i - q * 100) << 1
+                        j -= 2
+                        buf[j] = pairs[t]
+                        buf[j + 1] = pairs[t + 1]
+                        i = q
+                    if(i >= 10):
+                        buf[j - 2] = pairs[i << 1]
+                        buf[j - 1] = pairs[(i << 1) + 1]
+                    else:
+                        buf[j - 1] = 48 + i
+                if(d):
+                    buf[n] = 46 #'.'
+                    n += 1 + d
+                    j = n
+                    if(d & 1): #the last digit on its own, then pairs
+                        q = f // 10
+                        j -= 1
+                        buf[j] = 48 + f - q * 10
+                        f = q
+                    for e in range(d >> 1):
+                        q = f // 100
+                        t = (f - q * 100) << 1
+                        j -= 2
+                        buf[j] = pairs[t]
+                        buf[j + 1] = pairs[t + 1]
+                        f = q
+                buf[n] = 44 #','
+                n += 1
+            buf[n - 1] = 10 #'\n' replaces the last separator
+            r += 1
+            if(r == self.y):
+                r = 0
+        return(self.out_mv[:n])
+
     def write(self, fname = ''):
-        return(0)
-        #compile then write to SD card
-        
+        #compile then write to SD card, the whole batch goes out as one write and the buffer is emptied
+        #returns the number of bytes written
+        if(self.count == 0):
+            return(0)
+        data = self.comp()
+        self.sd.write_to_card(data, fname)
+        self.header_written = True
+        self.seq += self.count
+        self.head += self.count #a row still being built with put() keeps its slot
+        if(self.head >= self.y):
+            self.head -= self.y
+        self.count = 0
+        return(len(data))
+
     def __str__(self):
-        ret = ''
-        for i in range(self.y):
-            ret = ret + str(self.array[i]) + '\n'
-        return(ret)
\ No newline at end of file
+        if(self.fmt == 'csv'):
+            return(str(bytes(self.comp()), 'ascii'))
+        ret = [] #debug only, not worth a text buffer in frame mode
+        for k in range(self.count):
+            r = (self.head + k) % self.y
+            base = r * self.x
+            ret.append(','.join(['%.3f' % (self.array[base + c] if c != self.tick_column else self.ticks[r]) for c in range(self.x)]))
+        return('\n'.join(ret))
@@ -1,21 +1,34 @@
-import machine
-import sdcard
+import board
 import os
+import rawlog
+import sdclock
+from utime import ticks_ms, ticks_diff
 
 # wrapper for the SD card class that includes some additional utilities
 
 class card():
-    def __init__(self, fname_default='log', directory_default = 'logs'):
+    def __init__(self, fname_default='log', directory_default = 'logs', sd = None, mount = '/sd', ext_default = 'csv', tune = True):
         self.fname_default = fname_default #default filename
         self.directory_default = directory_default #default log directory
-        spi= machine.SPI(1, baudrate=40000000, sck=machine.Pin(10), mosi=machine.Pin(11), miso=machine.Pin(12))
-        self.SD=sdcard.SDCard(spi, machine.Pin(13))
+        self.ext_default = ext_default #extension of the default filename, 'bin' for binary frames
+        self.mount = mount #where the card is mounted
+        if(sd is None): #sd can be any block device, e.g. a ramdisk for testing
+            sd = board.sd()
+        self.SD = sd
+        self.session = None #open log session, see open_session()
+        self.session_path = ''
         
         self.vfs=os.VfsFat(self.SD)
-        os.mount(self.SD, "/sd") #not entirely sure you can mount a filsystem inside a class constructor and access it after the call returns, may have to do this somewhere else to avoid repeatedly mounting and demounting
-        x = os.listdir("/sd")
+        os.mount(self.vfs, mount) #not entirely sure you can mount a filsystem inside a class constructor and access it after the call returns, may have to do this somewhere else to avoid repeatedly mounting and demounting
+        x = os.listdir(mount)
         if((directory_default in x) == False):
-            os.mkdir("/sd/" + directory_default)
+            os.mkdir(mount + '/' + directory_default)
+        self.clock = None #SPI clock calibration, see sdclock.py
+        if(tune and hasattr(self.SD, 'init_spi')): #an sdcard.SDCard, which is still running at its slow default rate
+            scratch = sdclock.scratch_file(self.SD, mount + '/' + sdclock.SCRATCH_FILE, mount)
+            if(scratch is not None): #otherwise it stays at the safe rate
+                self.clock = sdclock.clock(self.SD, scratch)
+                self.clock.tune(mount + '/' + sdclock.CACHE)
         self.get_current_file_number()
         
     def __str__(self):
@@ -23,40 +36,173 @@ class card():
         x = os.listdir('/sd')
         y = os.listdir('/sd/logs')
         
-    def write_to_card(self, data, fname = '', directory = ''):
+    def path(self, fname = '', directory = ''): #full path of a file on the card, blank arguments give the current log file
         if(fname == ''):
-            fname = self.fname_default + '_'+ f'{self.current_file_number:04}'+'.csv'
-            print(fname)
+            fname = self.fname_default + '_'+ f'{self.current_file_number:04}'+'.'+self.ext_default
         if(directory == ''):
             directory = self.directory_default
-        file = open("/sd/"+ directory + '/' + fname, "a")
-        file.write(str(data))
+        return(self.mount + '/' + directory + '/' + fname)
+        
+    def write_to_card(self, data, fname = '', directory = ''):
+        path = self.path(fname, directory)
+        if(not isinstance(data, (bytes, bytearray, memoryview))): #buffers (e.g. from CSV.comp()) are written as they are
+            data = str(data).encode()
+        if(self.session is not None and path == self.session_path): #file already open, no need to walk the directory again
+            self.session.write(data)
+            return
+        file = self._open_append(path)
+        file.write(data)
         file.close()
         
+    #keep a log file open for appending instead of opening and closing it on every write
+    #writes are gathered into chunk sized pieces (one sector by default) before they reach the filesystem,
+    #and the file is synced (data, FAT and directory entry on the card) every sync_bytes bytes, every sync_ms milliseconds,
+    #or when sync() is called. Set either limit to 0 to turn it off. Only one session is kept open at a time
+    def open_session(self, fname = '', directory = '', chunk = 512, sync_bytes = 8192, sync_ms = 1000):
+        self.close_session()
+        file = self._open_append(self.path(fname, directory))
+        self.session_path = self.path(fname, directory) #may have moved on if the manifest was stale
+        self.session = session(file, chunk, sync_bytes, sync_ms)
+        return(self.session)
+        
+    def close_session(self):
+        if(self.session is not None):
+            self.session.close()
+            self.session = None
+            self.session_path = ''
+        
+    #high rate log mode: makes a file of size bytes once and then streams into its sectors directly, see rawlog.py
+    #raises OSError if the card is too fragmented to give the file one contiguous run of clusters
+    def open_raw(self, fname, size, directory = '', buffer_sectors = 8):
+        path = self.path(fname, directory)
+        rawlog.preallocate(path, size)
+        first, sectors = rawlog.fat_extent(self.SD, path[len(self.mount):])
+        return(rawlog.rawlog(self.SD, first, sectors, buffer_sectors))
+        
     def read_from_card(self, fname):
-        file = open("/sd/"+fname, "r")
+        file = open(self.mount + '/' + fname, "r")
         ret = file.read()
         print(ret)
         file.close()
         return(ret)
     
     #utility for writing consecutive log files. names must be in the format fname_xxxx.yyy, where xxxx is the 4-digit number of the file, and yyy is the 3 digit file extension.
-    def get_current_file_number(self, fname = '', directory = 'logs'):
+    #the next free number is kept in a small manifest file (fname.nxt in the log directory) so the directory doesn't have to be listed at boot.
+    #the number is claimed when it is read (the manifest is moved on straight away) so a reset can't hand out the same number twice.
+    #if the manifest is missing, unreadable, or stale (the first open of the new log file finds it already exists) the directory is scanned instead
+    def get_current_file_number(self, fname = '', directory = 'logs', rescan = False):
         if(fname == ''):
             fname = self.fname_default
-        length = len(fname)
-        files = os.listdir('/sd/'+directory)
-        number = 0
-        for i in files:
-            if(len(i) == length+9 and i[0:length] == fname): #checking for format fname_xxxx.yyy
-                x = i[-8:-4]
-                x = int(x)
-                if(x >= number):
-                    number = x + 1
+        directory = self.mount + '/' + directory
+        manifest = directory + '/' + fname + '.nxt'
+        number = -1
+        if(not rescan):
+            try:
+                file = open(manifest, "r")
+                number = int(file.read())
+                file.close()
+            except (OSError, ValueError):
+                number = -1
+        if(number < 0):
+            number = scan_file_number(directory, fname)
+        file = open(manifest, "w")
+        file.write(str(number + 1))
+        file.close()
         self.current_file_number = number
+        self.unverified = True #checked by _open_append() the first time the file is opened
         return(self.current_file_number)
+        
+    def _open_append(self, path): #open a file for appending, catching a stale manifest the first time the new log file is opened
+        file = open(path, "ab")
+        if(self.unverified and path == self.path()):
+            self.unverified = False
+            if(file.tell()): #the file should not have existed yet
+                file.close()
+                self.get_current_file_number(rescan = True)
+                path = self.path()
+                self.unverified = False
+                file = open(path, "ab")
+        return(file)
             
     def debug(self):
-        print(os.listdir('/sd'))
+        print(os.listdir(self.mount))
+        if(self.clock is not None):
+            print(self.clock)
     
-   
\ No newline at end of file
+    
+#returns the number after the highest numbered fname_xxxx.yyy file in directory (0 if there are none)
+#os.ilistdir streams the directory one entry at a time rather than building a list of every name in it
+def scan_file_number(directory, fname):
+    length = len(fname)
+    number = 0
+    for entry in os.ilistdir(directory):
+        i = entry[0]
+        if(len(i) == length+9 and i.startswith(fname) and i[length] == '_'): #checking for format fname_xxxx.yyy
+            try:
+                x = int(i[length+1:length+5])
+            except ValueError:
+                continue
+            if(x >= number):
+                number = x + 1
+    return(number)
+    
+    
+#a log file held open by card.open_session()
+class session():
+    def __init__(self, file, chunk = 512, sync_bytes = 8192, sync_ms = 1000):
+        self.file = file
+        self.chunk = chunk
+        self.buf = bytearray(chunk)
+        self.mv = memoryview(self.buf)
+        self.fill = 0 #bytes waiting in buf
+        self.sync_bytes = sync_bytes
+        self.sync_ms = sync_ms
+        self.unsynced = 0 #bytes accepted since the last sync
+        self.last_sync = ticks_ms()
+        self.bytes = 0 #total bytes accepted
+        self.syncs = 0 #number of syncs so far
+        
+    def write(self, data):
+        n = len(data)
+        chunk = self.chunk
+        i = 0
+        if(self.fill + n < chunk): #the common case, just gather it
+            self.buf[self.fill:self.fill + n] = data
+            self.fill += n
+        else:
+            mv = memoryview(data)
+            if(self.fill): #top up and write the partly filled chunk
+                i = chunk - self.fill
+                self.buf[self.fill:chunk] = mv[0:i]
+                self.file.write(self.buf)
+                self.fill = 0
+            whole = (n - i) // chunk * chunk
+            if(whole): #whole chunks go straight through without a copy
+                self.file.write(mv[i:i + whole])
+                i += whole
+            if(i < n):
+                self.buf[0:n - i] = mv[i:n]
+                self.fill = n - i
+        self.bytes += n
+        self.unsynced += n
+        if(self.sync_bytes and self.unsynced >= self.sync_bytes):
+            self.sync()
+        else:
+            self.poll()
+            
+    def poll(self): #sync if sync_ms has run out, call this periodically if writes can stop for a long time
+        if(self.sync_ms and self.unsynced and ticks_diff(ticks_ms(), self.last_sync) >= self.sync_ms):
+            self.sync()
+            
+    def sync(self): #push everything written so far onto the card
+        if(self.fill):
+            self.file.write(self.mv[0:self.fill])
+            self.fill = 0
+        self.file.flush()
+        self.unsynced = 0
+        self.last_sync = ticks_ms()
+        self.syncs += 1
+        
+    def close(self):
+        self.sync()
+        self.file.close()
@@ -0,0 +1,113 @@
+import array
+try:
+    from utime import ticks_diff
+except ImportError: #CPython, for the benchmarks
+    def ticks_diff(a, b):
+        return(a - b)
+import gyro
+
+#sampling rate that follows what the car is doing: slow and cheap on a steady straight, fast through corners, braking
+#and knocks. update() is given the IMU's extremes since the last row (gyro.fifo.lows, highs) and the speed, and moves
+#between levels, each one a row period, an IMU sample rate and a hall sensor window:
+#  any of the thresholds crossed (acceleration on x or y, z away from 1 g, yaw rate, or speed changing faster than
+#  speed kph/s) goes straight to the top level and holds it for hold_ms after the last crossing,
+#  after that it steps down one level every decay_ms while nothing crosses, to the base level (the first one)
+#it starts at the top level, as the wheel sensors have no reading yet. apply() puts the current level onto the sample
+#task, the IMU FIFO and the hall sensors, and below the top level has the FIFO watch the same thresholds: the first sample
+#past one ends the row there (gyro.fifo.watch()), so the caller can take that row at once (main.py wakes the sample task)
+#and a jolt isn't averaged into a slow row. Every change is passed to on_change(now_ms, level) so it can be logged: the
+#rows carry their own tick, the change log says which rate they were taken at, see main.py and tools/decode_log.py
+#on bench_adaptive.py's race this logs less than a fixed 100 ms with less bus time, and follows speed, yaw and the knock
+#more closely
+
+#row period ms, IMU sample rate Hz, hall sensor window (intervals averaged)
+LEVELS = ((500, 250, 3), (200, 500, 2), (50, 500, 2))
+PERIOD = 0
+IMU_RATE = 1
+HALL_WINDOW = 2
+
+
+class controller():
+    def __init__(self, levels = LEVELS, accel = 4000, yaw = 1500, speed = 4, hold_ms = 500, decay_ms = 500, one_g = 16384, on_change = None):
+        self.levels = levels
+        self.accel = accel #raw counts either side of rest, 16384 = 1 g
+        self.yaw = yaw #raw gyro counts on z, 131 = 1 degree/s
+        self.speed = speed #kph/s
+        self.hold = hold_ms
+        self.decay = decay_ms
+        self.one_g = one_g
+        self.on_change = on_change
+        self.level = len(levels) - 1
+        self.since = None #ms of the last crossing, or of the last step down, None until the first update()
+        self.last_kph = None
+        self.last_ms = 0
+        self.changes = 0
+        self.triggers = 0
+        self.lows = array.array('h', [-32768] * 7) #the same thresholds as limits for gyro.fifo.watch()
+        self.highs = array.array('h', [32767] * 7)
+        for i in (gyro.AX, gyro.AY):
+            self.lows[i] = -accel
+            self.highs[i] = accel
+        self.lows[gyro.AZ] = one_g - accel
+        self.highs[gyro.AZ] = min(32767, one_g + accel)
+        self.lows[gyro.GZ] = -yaw
+        self.highs[gyro.GZ] = yaw
+
+    def current(self): #(period ms, IMU rate, hall window)
+        return(self.levels[self.level])
+
+    def busy(self, lows, highs, kph, now_ms): #True if anything crossed its threshold either way since the last call
+        ret = False
+        a = self.accel
+        if(highs[gyro.AX] > a or lows[gyro.AX] < -a or highs[gyro.AY] > a or lows[gyro.AY] < -a):
+            ret = True
+        elif(highs[gyro.AZ] - self.one_g > a or self.one_g - lows[gyro.AZ] > a): #z rests at 1 g, a crest takes it towards 0
+            ret = True
+        elif(highs[gyro.GZ] > self.yaw or lows[gyro.GZ] < -self.yaw):
+            ret = True
+        elif(self.last_kph is not None):
+            dt = ticks_diff(now_ms, self.last_ms)
+            dv = kph - self.last_kph
+            if(dt > 0 and (dv if dv >= 0 else -dv) * 1000 > self.speed * dt):
+                ret = True
+        self.last_kph = kph
+        self.last_ms = now_ms
+        return(ret)
+
+    def update(self, lows, highs, kph, now_ms): #call once a row, returns True if the level changed
+        if(self.busy(lows, highs, kph, now_ms)):
+            return(self.crossed(now_ms))
+        level = self.level
+        if(self.since is None): #the level it started at is held as if it had just crossed
+            self.since = now_ms + self.hold - self.decay
+        if(level and ticks_diff(now_ms, self.since) >= self.decay):
+            level -= 1
+            self.since = now_ms
+        return(self._change(level, now_ms))
+
+    def crossed(self, now_ms): #a threshold was crossed: straight to the top level, returns True if the level changed
+        self.triggers += 1
+        self.since = now_ms + self.hold - self.decay #the first step down comes hold_ms from now
+        return(self._change(len(self.levels) - 1, now_ms))
+
+    def _change(self, level, now_ms):
+        if(level == self.level):
+            return(False)
+        self.level = level
+        self.changes += 1
+        if(self.on_change is not None):
+            self.on_change(now_ms, self.levels[level])
+        return(True)
+
+    def apply(self, task = None, fifo = None, halls = ()): #the current level onto a scheduler task, a gyro.fifo and hall sensors
+        l = self.levels[self.level]
+        if(task is not None):
+            task.set_period(l[PERIOD])
+        if(fifo is not None):
+            fifo.set_rate(l[IMU_RATE])
+            if(self.level < len(self.levels) - 1): #below the top a crossing cuts the row short, see gyro.fifo.watch()
+                fifo.watch(self.lows, self.highs)
+            else:
+                fifo.watch()
+        for h in halls:
+            h.set_window(l[HALL_WINDOW])
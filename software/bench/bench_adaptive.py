@@ -0,0 +1,154 @@
+#the adaptive sampling rate (adaptive.py) against fixed rates on a made up race: laps of a long straight, braking into a
+#corner and accelerating out, and one knock. The IMU is the simulated chip behind the real gyro.fifo and the wheel is
+#the real hall sensor fed with edges at the true speed, so every setup sees the same car.
+#storage is the delta log (delta.py) and frames, CPU is simulated bus time: the IMU FIFO reads plus each row's ADC and
+#thermistor reads on the simulated board. Fidelity is how far the logged speed and yaw rate are from the truth, held
+#from one row to the next the way a plot of the log would show them
+import math
+import random
+import benchutil
+from benchutil import CPYTHON, timeit, allocs, report, title
+import fakes
+import frame
+import delta
+import gyro
+import hall_speed
+import scheduler
+import adaptive
+import sim
+import board
+
+SECONDS = 120 if CPYTHON else 20
+STEP = 5 #ms
+LAP = 30000 #ms: 18 s straight, 2 s braking, 5 s corner, 5 s accelerating out
+KNOCK = 70000 #ms, a knock for 20 ms at the top of the 2 g range
+G = 16384
+DEG = 131 #gyro counts per degree/s
+
+def truth(t): #speed kph, ax, ay and yaw in counts at t ms
+    l = t % LAP
+    if(l < 18000):
+        kph, ax, ay, gz = 35.0, 0, 0, 0
+    elif(l < 20000):
+        kph, ax, ay, gz = 35.0 - 15 * (l - 18000) / 2000, -int(0.21 * G), 0, 0
+    elif(l < 25000):
+        kph, ax, ay, gz = 20.0, 0, int(0.4 * G), 30 * DEG
+    else:
+        kph, ax, ay, gz = 20.0 + 15 * (l - 25000) / 5000, int(0.08 * G), 0, 0
+    if(KNOCK <= t < KNOCK + 20):
+        ax = 32000
+    return(kph, ax, ay, gz)
+
+CIRCUMFERENCE = math.pi * hall_speed.WHEEL_DIAMETER * 0.0254 #m
+
+#bus cost of the rest of a row on the simulated board: four ADC channels and the thermistor scan
+s = sim.setup()
+adc = board.adc()
+temps = board.thermistors()
+s.reset_counters()
+for i in range(4):
+    adc.read_channel_se(i)
+temps.read()
+ROW_US = s.bus_us()
+
+def run(controller = None, period = 100, rate = 500):
+    random.seed(2)
+    now = [0]
+    def signal(n): #the IMU at the current time, with road vibration on top
+        kph, ax, ay, gz = truth(now[0])
+        return(ax + int(random.gauss(0, 300)), ay + int(random.gauss(0, 300)), G + int(random.gauss(0, 300)), 0,
+            int(random.gauss(0, 40)), int(random.gauss(0, 40)), gz + int(random.gauss(0, 40)))
+    bus = fakes.i2cbus(400000)
+    chip = bus.attach(0x68, fakes.mpu6050(signal))
+    f = gyro.fifo(gyro.accel(bus), rate, ring_size = 64)
+    wheel = hall_speed.hall(None, magnets = 1)
+    task = scheduler.task('sample', None, period)
+    changes = []
+    if(controller is not None):
+        controller.on_change = lambda t, level: changes.append('%d,%d,%d,%d\n' % ((t,) + level))
+        controller.apply(task, f, (wheel,))
+    enc = delta.encoder(32, 100)
+    stored = 0
+    rows = 0
+    row = [0.0] * frame.COLUMNS
+    logged = (0.0, 0) #speed and yaw as the log shows them
+    err_kph = 0.0
+    err_yaw = 0.0
+    peak_ax = 0
+    next_row = 0
+    edge = 0.0 #ms of the next wheel edge
+    for t in range(0, SECONDS * 1000, STEP):
+        now[0] = t
+        chip.advance(STEP * 1000)
+        kph = truth(t)[0]
+        while(edge <= t):
+            wheel.edge(int(edge * 1000))
+            edge += CIRCUMFERENCE / (kph / 3.6) * 1000
+        if(t % 50 == 0):
+            f.drain()
+            if(f.cut): #a crossing cut the row short, it's logged now (main.py wakes the sample task)
+                next_row = t
+        if(t >= next_row):
+            v = f.read()
+            row[0] = wheel.get_speed_kph(t * 1000)
+            for i in range(6):
+                row[9 + i] = v[(gyro.AX, gyro.AY, gyro.AZ, gyro.GX, gyro.GY, gyro.GZ)[i]]
+            row[15] = t
+            b = enc.add(row)
+            if(b is not None):
+                stored += len(b)
+            rows += 1
+            logged = (row[0], v[gyro.GZ])
+            peak_ax = max(peak_ax, v[gyro.AX])
+            if(controller is not None and controller.update(f.lows, f.highs, row[0], t)):
+                controller.apply(task, f, (wheel,))
+            next_row = t + task.period // 1000
+        err_kph += (logged[0] - kph) ** 2
+        err_yaw += (logged[1] - truth(t)[3]) ** 2
+    stored += len(enc.finish())
+    steps = SECONDS * 1000 // STEP
+    return({'rows': rows, 'delta': stored + sum([len(c) for c in changes]), 'frames': rows * frame.SIZE,
+        'bus': bus.bus_us + rows * ROW_US, 'imu': f.samples, 'kph': math.sqrt(err_kph / steps),
+        'yaw': math.sqrt(err_yaw / steps) / DEG, 'knock': peak_ax / G, 'changes': len(changes)})
+
+results = []
+for period, rate in ((20, 1000), (100, 500), (500, 250)):
+    results.append(('fixed %d ms, %d Hz' % (period, rate), run(period = period, rate = rate)))
+c = adaptive.controller()
+results.append(('adaptive', run(c)))
+base = results[1][1] #main.py's fixed 100 ms
+
+for name, r in results:
+    title('%s, %d s' % (name, SECONDS))
+    report('rows', r['rows'], '')
+    report('IMU samples', r['imu'], '')
+    report('delta log', r['delta'] / SECONDS, 'bytes/s')
+    report('frame log', r['frames'] / SECONDS, 'bytes/s')
+    report('bus time', r['bus'] / SECONDS / 10000, '% of the time')
+    report('storage against fixed 100 ms', r['delta'] / base['delta'] * 100, '%')
+    report('bus time against fixed 100 ms', r['bus'] / base['bus'] * 100, '%')
+    report('speed error, RMS', r['kph'], 'kph')
+    report('yaw rate error, RMS', r['yaw'], 'deg/s')
+    report('largest logged x (the knock is 1.95 g)', r['knock'], 'g')
+    if(name == 'adaptive'):
+        report('rate changes logged', r['changes'], '')
+        report('rows that crossed a threshold', c.triggers, '')
+
+title('controller')
+lows = [-300, -300, G - 300, 0, -40, -40, -40]
+highs = [300, 300, G + 300, 0, 40, 40, 40]
+c = adaptive.controller()
+k = [0]
+def steady():
+    k[0] += 100
+    c.update(lows, highs, 35.0, k[0])
+report('update()', timeit(steady, 5000), 'us')
+report('update() heap', allocs(steady, 5000), 'bytes')
+assert c.level == 0
+lows[gyro.AZ] = G // 4 #a crest, z dropping towards 0 g
+assert c.update(lows, highs, 35.0, k[0] + 100) and c.level == len(adaptive.LEVELS) - 1
+
+#against main.py's fixed 100 ms: no more storage or bus time, and speed, yaw and the knock followed at least as closely
+r = results[-1][1]
+assert r['delta'] <= base['delta'] and r['bus'] <= base['bus']
+assert r['kph'] <= base['kph'] and r['yaw'] <= base['yaw'] and r['knock'] >= base['knock']
@@ -0,0 +1,45 @@
+#benchmark for ADS7830.scan() against the old write-then-read per channel, on a fake 400 kHz bus
+import array
+import benchutil
+from benchutil import allocs, timeit, report, title
+import fakes
+import ADC
+
+bus = fakes.i2cbus(400000)
+chip = bus.attach(0x48, fakes.ads7830())
+adc = ADC.ADS7830(bus)
+
+def legacy_read(channel): #what read_channel_se used to do: command write and data read as two transactions
+    adc.temp[0] = 128 + (ADC.channels[channel]<<4) + 4
+    bus.writeto(adc.address, adc.temp)
+    bus.readfrom_into(adc.address, adc.temp_read)
+    return(adc.temp_read[0])
+
+def legacy_scan():
+    for i in range(8):
+        out[i] = legacy_read(i)
+
+out = bytearray(8)
+def scan():
+    adc.scan(ADC.ALL_SE, out)
+
+def results(name, fn, n = 200):
+    bus.reset_counters()
+    us = timeit(fn, n)
+    channels = 8 * n
+    title(name)
+    report('bus transactions', bus.transactions / channels, 'per channel')
+    report('bus time', bus.bus_us / channels, 'us/channel')
+    report('channels/s the bus allows at 400 kHz', channels * 1000000 / bus.bus_us, '')
+    report('CPU time (this machine)', us / 8, 'us/channel')
+    report('heap', allocs(fn, n), 'bytes/scan')
+
+results('old: writeto + readfrom_into per channel', legacy_scan)
+results('scan(ALL_SE)', scan)
+assert list(out) == chip.levels, out
+
+signed = array.array('h', [0] * 4)
+adc.scan(bytes([ADC.cmd_se(2), ADC.cmd_se(3), ADC.cmd_diff(2), ADC.cmd_diff(3)]), signed)
+print('')
+print('ch2, ch3, hardware diff 2-3, hardware diff 3-2:', list(signed))
+print('read_channels_diff(2, 3) =', adc.read_channels_diff(2, 3), ', read_channels_diff(3, 2) =', adc.read_channels_diff(3, 2))
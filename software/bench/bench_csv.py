@@ -0,0 +1,76 @@
+#benchmark for the CSV row store: cost of appending a row and of formatting a batch for the card
+import benchutil
+from benchutil import allocs, peak_heap, timeit, report, title
+import CSV
+
+COLUMNS = 16
+ROWS = 32
+
+
+class sink(): #stands in for SD.card, just counts what it is given
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+
+    def write_to_card(self, data, fname = ''):
+        self.calls += 1
+        self.bytes += len(data)
+
+
+def legacy_comp(rows): #the obvious way: one string per value, joined per row and concatenated per batch
+    ret = ''
+    for row in rows:
+        ret = ret + ','.join(['%.3f' % v for v in row]) + '\n'
+    return(ret)
+
+def legacy_built(rows): #bytes of string legacy_comp() makes and throws away on the way, object headers not counted
+    ret = 0
+    built = 0
+    for row in rows:
+        parts = ['%.3f' % v for v in row]
+        line = sum([len(p) for p in parts]) + len(parts) - 1
+        built += line - len(parts) + 1 + line #the values, then the join
+        ret += line
+        built += ret + ret + 1 #the two concatenations each copy everything so far
+        ret += 1
+    return(built)
+
+row = [12.345, 1800.0, 12.6, 12.4, 35.2, 41.5, 39.0, 28.25, 27.75, -0.12, 0.98, 9.81, 1.5, -2.25, 0.5, 123456.0]
+card = sink()
+log = CSV.CSV(COLUMNS, ROWS, sd = card)
+
+def append():
+    log.append(row)
+
+title('CSV ring buffer, %d columns x %d rows' % (COLUMNS, ROWS))
+log.append(row) #first call warms up anything lazily created
+report('append', timeit(append, 2000), 'us/row')
+report('append heap', allocs(append, 2000), 'bytes/row')
+
+for i in range(ROWS):
+    log.append(row)
+n = len(log.comp())
+us = timeit(log.comp, 50)
+report('comp', us, 'us/batch')
+report('comp throughput', n / (us / 1000), 'bytes/ms')
+report('comp heap', allocs(log.comp, 50), 'bytes/batch')
+report('comp peak heap', peak_heap(log.comp), 'bytes')
+
+rows = [row] * ROWS
+us = timeit(lambda: legacy_comp(rows), 50)
+report('legacy str formatting', us, 'us/batch')
+report('legacy str formatting throughput', len(legacy_comp(rows)) / (us / 1000), 'bytes/ms')
+report('legacy peak heap', peak_heap(lambda: legacy_comp(rows)), 'bytes')
+report('legacy strings built', legacy_built(rows), 'bytes/batch') #all of it garbage for the gc on the pico
+
+log.write()
+report('write() calls to the card per batch', card.calls, '')
+report('bytes per row', card.bytes / ROWS, '')
+
+log = CSV.CSV(4, 4, sd = sink())
+log.put(0, 1.0) #a row half built with put() when append() comes along
+log.append([2.0, 2.0, 2.0, 2.0])
+log.put(1, 3.0)
+log.commit()
+assert len(log) == 3 and str(log).split('\n')[0].startswith('1.000,') and str(log).split('\n')[1].startswith('2.000,')
+report('rows kept with put() and append() mixed', len(log), 'of 3')
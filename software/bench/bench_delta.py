@@ -0,0 +1,115 @@
+#delta compressed logging (delta.py) against frames and CSV text on a race's worth of rows: bytes and sectors written,
+#encode cost per row on the logger, decode speed on a PC, and how much a damaged byte loses
+#    python3 bench/bench_delta.py [log.bin]
+#with a frame log copied off the card its rows are used, otherwise a 20 minute run at 10 Hz is made up: speed and rpm
+#following the throttle, the batteries sagging under the current, temperatures creeping up and the IMU's 100 ms means
+import sys
+import math
+import random
+import benchutil
+from benchutil import CPYTHON, allocs, timeit, report, title
+import CSV
+import frame
+import delta
+
+BATCH = 10 #rows per write, main.py writes once a second at 10 Hz
+
+
+class sink(): #stands in for SD.card and keeps what it is given
+    def __init__(self):
+        self.data = bytearray()
+        self.writes = 0
+
+    def write_to_card(self, data, fname = ''):
+        self.data.extend(data)
+        self.writes += 1
+
+
+def made_up_run(n = 12000):
+    random.seed(1)
+    ret = []
+    speed = 0.0
+    temps = [25.0, 25.0, 24.0, 24.0]
+    for i in range(n):
+        throttle = 0.6 + 0.4 * math.sin(i / 300) #laps
+        speed += (throttle * 40 - speed) * 0.01
+        current = throttle * 30 + random.gauss(0, 0.3)
+        for k in range(4):
+            temps[k] += (current * 0.002 - (temps[k] - 25) * 0.0005) * (k + 1) / 4
+        row = [speed + random.gauss(0, 0.05), speed * 75, 12.6 - current * 0.01 - i * 0.00005, 12.5 - current * 0.01 - i * 0.00005,
+            current] + temps + [int(random.gauss(0, 40)), int(random.gauss(0, 40)), 16384 + int(random.gauss(0, 40)),
+            int(random.gauss(0, 20)), int(random.gauss(0, 20)), int(random.gauss(0, 20)), i * 100]
+        ret.append(row)
+    return(ret)
+
+def recorded_run(path):
+    f = open(path, 'rb')
+    data = f.read()
+    f.close()
+    return([list(r[2:]) + [r[1]] for r in frame.decode(data)])
+
+rows = recorded_run(sys.argv[1]) if len(sys.argv) > 1 else made_up_run(12000 if CPYTHON else 600)
+
+def log(fmt):
+    s = sink()
+    c = CSV.CSV(frame.COLUMNS, 32, sd = s, fmt = fmt)
+    for i in range(len(rows)):
+        c.append(rows[i])
+        if(i % BATCH == BATCH - 1):
+            c.write()
+    c.write()
+    return(s)
+
+title('%d rows, written %d at a time' % (len(rows), BATCH))
+sizes = {}
+for fmt in ('csv', 'frame', 'delta'):
+    s = log(fmt)
+    sizes[fmt] = s
+    report(fmt + ', bytes per row', len(s.data) / len(rows), '')
+    report(fmt + ', 512 byte sectors per hour at 10 Hz', len(s.data) / len(rows) * 36000 / 512, '')
+report('delta against frames', len(sizes['frame'].data) / len(sizes['delta'].data), 'x smaller')
+report('delta against CSV', len(sizes['csv'].data) / len(sizes['delta'].data), 'x smaller')
+
+#same numbers back out as the frames give
+d = delta.decode(sizes['delta'].data)
+f = frame.decode(sizes['frame'].data)
+assert d == f
+
+title('encode, per row')
+for fmt in ('frame', 'delta'):
+    c = CSV.CSV(frame.COLUMNS, BATCH, sd = sink(), fmt = fmt)
+    k = [0]
+    def batch():
+        for j in range(BATCH):
+            c.append(rows[k[0] % len(rows)])
+            k[0] += 1
+        c.write()
+    report(fmt + ' append and write', timeit(batch, 50) / BATCH, 'us')
+    report(fmt + ' heap', allocs(batch, 50) / BATCH, 'bytes')
+
+if(CPYTHON):
+    title('decode on the PC')
+    data = sizes['delta'].data
+    t = benchutil.ticks_us()
+    delta.rows(data)
+    report('rows()', (benchutil.ticks_us() - t) / len(rows), 'us/row')
+    try:
+        import numpy
+        t = benchutil.ticks_us()
+        a = delta.to_numpy(data)
+        report('to_numpy()', (benchutil.ticks_us() - t) / len(rows), 'us/row')
+        assert list(a['tick']) == [r[1] for r in f]
+        assert numpy.allclose(a['temp3'], [r[2 + 8] for r in f])
+    except ImportError:
+        pass
+
+    title('one damaged byte in the middle of the log')
+    bad = bytearray(data)
+    bad[len(bad) // 2] ^= 0xFF
+    stats = {}
+    n = len(delta.rows(bad, stats))
+    report('rows lost, delta', len(rows) - n, '')
+    report('blocks skipped to the next keyframe', stats['orphans'], '')
+    bad = bytearray(sizes['frame'].data)
+    bad[len(bad) // 2] ^= 0xFF
+    report('rows lost, frames', len(rows) - len(frame.decode(bad)), '')
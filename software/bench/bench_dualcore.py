@@ -0,0 +1,56 @@
+#the dual core mode under CPython threads: a sampler thread fills 42 byte frames at 1 kHz into a dualcore.ring while the
+#main thread writes them out in batches to a card that stalls (time.sleep standing in for the card holding the logger up).
+#every frame that arrives has its CRC checked, and the drops are counted for a few ring sizes.
+#N.B. CPython threads share one interpreter lock, so the timing is rough; on the pico the two cores really run at once
+import time
+import benchutil
+from benchutil import allocs, report, title
+import frame
+import dualcore
+
+SECONDS = 2
+STALL_MS = 40 #a card housekeeping stall every 10th batch
+
+def run(slots):
+    frames = dualcore.ring(frame.SIZE, slots)
+    row = [0.0] * frame.COLUMNS
+    seq = [0]
+    def sample(slot):
+        row[0] = seq[0] % 100
+        row[15] = seq[0]
+        frame.pack_into(slot, 0, seq[0], row)
+        seq[0] += 1
+    acq = dualcore.core1(frames, sample, 1)
+    batch = bytearray(frame.SIZE * slots)
+    got = 0
+    bad = 0
+    stats = {}
+    acq.start()
+    end = time.time() + SECONDS
+    k = 0
+    while(time.time() < end):
+        n = frames.drain_into(batch)
+        got += len(list(frame.frames(batch[0:n], stats))) #CRC checked, so a torn frame wouldn't count
+        bad += stats.get('bad', 0)
+        k += 1
+        time.sleep(STALL_MS / 1000 if k % 10 == 0 else 0.005) #writing the batch to the card
+    acq.stop()
+    title('ring of %d frames' % slots)
+    report('frames sampled', acq.runs, '')
+    report('frames received', got + len(frames), '')
+    report('dropped (ring full)', frames.dropped(), '')
+    report('damaged frames', bad, '')
+    assert got + len(frames) + frames.dropped() == acq.runs
+
+for slots in (8, 32, 128):
+    run(slots)
+
+title('heap per record')
+r = dualcore.ring(frame.SIZE, 16)
+def through():
+    v = r.reserve()
+    v[0] = 1
+    r.publish()
+    r.peek()
+    r.release()
+report('reserve, publish, peek, release', allocs(through, 10000), 'bytes')
@@ -0,0 +1,65 @@
+#benchmark for the MPU6050 FIFO mode against polling, on a simulated chip sampling a vibrating car with one knock in it
+import math
+import array
+import benchutil
+from benchutil import allocs, report, title
+import fakes
+import gyro
+
+RATE = 1000 #Hz, chip sample rate
+KNOCK = 2503 #sample number of the knock, between two 100 ms log samples
+def signal(n): #1 g on z, 120 Hz vibration on x, a 3 g knock for 2 ms
+    ax = int(2000 * math.sin(2 * math.pi * 120 * n / RATE))
+    if(KNOCK <= n < KNOCK + 2):
+        ax = 30000
+    return(ax, 0, 16384, 0, 0, 0, 100)
+
+def run(drain_ms, seconds = 4, poll = False):
+    bus = fakes.i2cbus(400000)
+    chip = bus.attach(0x68, fakes.mpu6050(signal))
+    imu = gyro.accel(bus)
+    f = None if poll else gyro.fifo(imu, RATE, trigger = 24000, post = 100)
+    seen = 0
+    for t in range(0, seconds * 1000, drain_ms):
+        chip.advance(drain_ms * 1000)
+        if(poll): #what main.py did, one snapshot every 100 ms
+            v = imu.read()
+        elif(t % 100 == 0):
+            v = f.read()
+        else:
+            f.drain()
+        seen = max(seen, v[gyro.AX]) if (poll or t % 100 == 0) else seen
+    return(bus, chip, f, seen)
+
+title('polling read() every 100 ms')
+bus, chip, f, seen = run(100, poll = True)
+report('samples read', chip.reads, '')
+report('largest logged x', seen, 'counts')
+
+for ms in (20, 50, 100):
+    bus, chip, f, seen = run(ms)
+    title('FIFO at %d Hz, drained every %d ms' % (RATE, ms))
+    report('samples drained', f.samples, '')
+    report('overflows', f.overflows, '')
+    report('bus transactions', bus.transactions / 4, 'per second')
+    report('bus time', bus.bus_us / 4 / 10000, '% of the bus')
+    report('largest logged x (a 100 ms mean)', seen, 'counts')
+    if(f.triggered):
+        ring, at = f.dump()
+        report('knock caught, samples before it in the dump', at, '')
+        report('ring x at the knock', ring[6 * at], 'counts')
+        into = array.array('h', [0] * (6 * f.ring_size)) #how core 1 copies it out with DUAL_CORE, see main.py
+        samples, at2 = f.dump(into)
+        assert list(samples) == list(ring) and at2 == at
+        report('dump() into an array, heap', allocs(lambda: f.dump(into), 100), 'bytes')
+
+title('drain heap')
+bus = fakes.i2cbus(400000)
+chip = bus.attach(0x68, fakes.mpu6050(signal))
+f = gyro.fifo(gyro.accel(bus), RATE)
+def step():
+    chip.advance(20000)
+    f.drain()
+step()
+fill = allocs(lambda: chip.advance(20000), 200) #the model's own share
+report('drain() of 20 samples', max(0, allocs(step, 200) - fill), 'bytes')
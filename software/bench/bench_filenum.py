@@ -0,0 +1,58 @@
+#benchmark for finding the next log file number at boot with 5000 old logs on the card:
+#the old listdir-and-parse scan, the manifest, and the ilistdir scan used when the manifest is missing or stale
+#uses fakes.fatmodel on CPython; on the pico it uses whatever card is in the slot, so only run it there on a spare card
+import benchutil
+from benchutil import CPYTHON, peak_heap, ticks_us, ticks_diff, report, title
+import fakes
+import SD
+
+FILES = 5000
+
+
+def legacy(directory, fname): #what SD.card.get_current_file_number used to do
+    length = len(fname)
+    files = SD.os.listdir(directory)
+    number = 0
+    for i in files:
+        if(len(i) == length+9 and i[0:length] == fname):
+            x = int(i[-8:-4])
+            if(x >= number):
+                number = x + 1
+    return(number)
+
+if(CPYTHON):
+    dev = fakes.ramdisk(65536)
+    fs = fakes.fatmodel(dev)
+    SD.os = SD.open = fs
+    c = SD.card('log', 'logs', sd = dev, mount = '/sd')
+    fs.dirs['/sd/logs'] += ['log_%04d.csv' % i for i in range(FILES)] #quicker than creating them one by one
+    for i in range(FILES):
+        fs.files['/sd/logs/log_%04d.csv' % i] = bytearray(100)
+    fs.files['/sd/logs/log.nxt'] = bytearray(b'%d' % FILES) #as the logger would have left it
+else:
+    dev = None
+    c = SD.card()
+
+def measure(name, fn):
+    if(dev is not None):
+        dev.reset_counters()
+    t = ticks_us()
+    n = fn()
+    us = ticks_diff(ticks_us(), t)
+    title(name)
+    report('result', n, '')
+    report('wall time', us / 1000, 'ms')
+    if(dev is not None):
+        report('blocks read', dev.blocks_read, '')
+        report('blocks written', dev.blocks_written, '')
+    report('peak heap', peak_heap(fn), 'bytes')
+
+def first_open(): #FatFs walks the whole directory to create the new file on either path, this is where a stale manifest is caught
+    c._open_append(c.path()).close()
+    return(c.current_file_number)
+
+print('%d log files in /sd/logs' % len(SD.os.listdir('/sd/logs')))
+measure('old: listdir and parse every name', lambda: legacy('/sd/logs', 'log'))
+measure('ilistdir scan (manifest missing or stale)', lambda: SD.scan_file_number('/sd/logs', 'log'))
+measure('manifest', c.get_current_file_number) #each call claims a number, so this takes two
+measure('creating the new log file', first_open)
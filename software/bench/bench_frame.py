@@ -0,0 +1,80 @@
+#benchmark for the binary frame format: size against CSV text, packing cost on the logger and decoding speed on a PC
+import benchutil
+from benchutil import CPYTHON, allocs, timeit, report, title
+import CSV
+import frame
+import delta
+
+ROWS = 32
+
+
+class sink(): #stands in for SD.card and keeps what it is given
+    def __init__(self):
+        self.data = bytearray()
+
+    def write_to_card(self, data, fname = ''):
+        self.data.extend(data)
+
+
+row = [23.45, 1800, 12.61, 12.43, 35.2, 41.5, 39.0, 28.3, 27.7, -124, 980, 16384, 150, -225, 50, 0]
+text = CSV.CSV(frame.COLUMNS, ROWS, sd = sink())
+binary = CSV.CSV(frame.COLUMNS, ROWS, sd = sink(), fmt = 'frame')
+for i in range(ROWS):
+    row[15] = i * 100
+    text.append(row)
+    binary.append(row)
+
+title('frame format')
+csv_bytes = len(text.comp()) / ROWS
+report('CSV row', csv_bytes, 'bytes')
+report('binary frame', frame.SIZE, 'bytes')
+report('512 byte sectors per hour at 10 Hz, CSV', csv_bytes * 36000 / 512, '')
+report('512 byte sectors per hour at 10 Hz, frames', frame.SIZE * 36000 / 512, '')
+report('CSV comp', timeit(text.comp, 50) / ROWS, 'us/row')
+report('frame comp', timeit(binary.comp, 50) / ROWS, 'us/row')
+enc = frame.encoder()
+report('encoder.pack heap', allocs(lambda: enc.pack(row), 500), 'bytes/frame')
+
+for i in range(100):
+    binary.write()
+    for j in range(ROWS):
+        row[15] = (i * ROWS + j) * 100
+        binary.append(row)
+data = bytes(binary.sd.data)
+title('decoding %d frames' % (len(data) // frame.SIZE))
+report('decode()', timeit(lambda: frame.decode(data), 3) / 1000, 'ms')
+if(CPYTHON):
+    try:
+        import numpy
+        report('to_numpy()', timeit(lambda: frame.to_numpy(data), 3) / 1000, 'ms')
+    except ImportError:
+        print('numpy not installed, skipping to_numpy()')
+damaged = bytearray(data)
+damaged[frame.SIZE * 10 + 7] ^= 0xFF #corrupt one frame
+del damaged[frame.SIZE * 20:frame.SIZE * 21 + 5] #and lose one and a bit
+stats = {}
+rows = frame.decode(damaged, stats)
+report('frames recovered from damaged copy', len(rows), 'of %d' % (len(data) // frame.SIZE))
+report('damaged stretches / missing frames', stats['bad'], '/ %d' % stats['missing'])
+
+title('rows with a bad value')
+bad = list(row)
+bad[0] = float('nan')
+bad[5] = float('inf')
+bad[9] = float('-inf')
+enc = frame.encoder()
+d = frame.decode(enc.pack(bad))
+assert len(d) == 1 and d[0][2] == 0 and d[0][2 + 5] == 3276.7 and d[0][2 + 9] == -32768 and d[0][2 + 4] == bad[4]
+report('frames packed with nan and inf', len(d), 'of 1')
+
+title('a tick past 2^24 ms, where a float32 stops holding every ms')
+for fmt in ('frame', 'delta'):
+    log = CSV.CSV(frame.COLUMNS, 4, sd = sink(), fmt = fmt)
+    ticks = [(1 << 24) + 1, 999999999, 4000000001]
+    for t in ticks:
+        row[15] = t
+        log.append(row)
+    log.write()
+    got = [r[1] for r in (frame.decode(log.sd.data) if fmt == 'frame' else delta.decode(log.sd.data))]
+    assert got == ticks, got
+    report(fmt + ', ticks back exactly', len(got), 'of %d' % len(ticks))
@@ -0,0 +1,80 @@
+#render benchmark for the dashboard: large readings drawn like the Arduino firmware does (the 8x8 font scaled up pixel by
+#pixel, setTextSize) against copies from the glyph atlas, and against a layout that only redraws the characters that changed
+#N.B. on the PC framebuf is the Python stand-in from host.py, so the scaled text and blit() look slower than they are on
+#the pico; the page copies are slice assignments either way
+import benchutil
+import framebuf
+from benchutil import allocs, timeit, report, title
+import fakes
+import OLED
+import glyphs
+
+bus = fakes.i2cbus(400000)
+bus.attach(0x3C, fakes.ssd1306())
+d = OLED.SSD1306_I2C(128, 64, bus, 0x3C)
+small = bytearray(8)
+sfb = framebuf.FrameBuffer(small, 8, 8, framebuf.MONO_VLSB)
+
+def scaled_text(s, x, y, scale): #Adafruit_GFX style large text
+    for ch in s:
+        sfb.fill(0)
+        sfb.text(ch, 0, 0, 1)
+        for col in range(8):
+            for row in range(8):
+                if(small[col] >> row & 1):
+                    d.fill_rect(x + col * scale, y + row * scale, scale, scale, 1)
+        x += 8 * scale
+
+t = benchutil.ticks_us()
+g = glyphs.atlas()
+title('glyph atlas')
+report('build, %d characters at %dx%d' % (len(g.chars), g.w, g.h), benchutil.ticks_diff(benchutil.ticks_us(), t) / 1000, 'ms')
+report('size', len(g.data), 'bytes')
+
+#same pixels either way
+d.fill(0)
+scaled_text('12.5', 0, 0, 4)
+a = bytes(d.buffer)
+d.fill(0)
+g.text(d, '12.5', 0, 0)
+assert a == bytes(d.buffer)
+d.fill(0)
+g.text(d, '12.5', 0, 3) #off the page grid, through blit()
+scaled_text('12.5', 0, 35, 4)
+d.fill(0)
+
+screen = glyphs.layout(d)
+speed = screen.add('speed', glyphs.field(g, 0, 0, 4, '%.1f'))
+values = [20 + (k // 3) * 0.1 for k in range(30)] #a reading that changes in its last digit every third frame
+
+k = [0]
+def legacy_frame():
+    d.fill(0)
+    scaled_text('%4.1f' % values[k[0] % 30], 0, 0, 4)
+    d.text('kph', 0, 56)
+    d.show()
+    k[0] += 1
+
+def atlas_frame():
+    d.fill(0)
+    g.text(d, '%4.1f' % values[k[0] % 30], 0, 0)
+    d.text('kph', 0, 56)
+    d.show()
+    k[0] += 1
+
+def layout_frame():
+    screen.set('speed', values[k[0] % 30])
+    d.show()
+    k[0] += 1
+
+d.fill(0)
+d.text('kph', 0, 56)
+for name, fn in (('scaled 8x8 font, whole screen redrawn', legacy_frame), ('atlas, whole screen redrawn', atlas_frame),
+        ('layout, changed characters only', layout_frame)):
+    bus.reset_counters()
+    n = 30
+    us = timeit(fn, n)
+    title(name)
+    report('render and show', us / 1000, 'ms/frame')
+    report('bytes on the bus', bus.bytes / n, 'per frame')
+    report('heap', allocs(fn, n), 'bytes/frame')
@@ -0,0 +1,69 @@
+#benchmark for the PCA9555 driver: button polls and LED changes, the old string based code against integer registers,
+#pin shadows and the INT line
+import benchutil
+from benchutil import allocs, timeit, report, title
+import fakes
+import GPIO
+
+bus = fakes.i2cbus(400000)
+chip = bus.attach(0x20, fakes.pca9555())
+io = GPIO.PCA9555(bus)
+io.display_setup()
+
+def legacy_read(): #what display_read used to do
+    io.i2c.readfrom_mem_into(io.address, GPIO.INPUT1, io.temp_read)
+    state = str(bin(io.temp_read[0]))
+    return [state[9] == '0', state[8] == '0']
+
+def legacy_led(n, value): #setting one LED meant writing both output registers
+    out = io.out | (1 << n) if value else io.out & ~(1 << n)
+    io.reg_write(GPIO.OUTPUT0, out & 0xFF)
+    io.reg_write(GPIO.OUTPUT1, out >> 8)
+
+def results(name, fn, n = 1000):
+    bus.reset_counters()
+    us = timeit(fn, n)
+    title(name)
+    report('bus transactions', bus.transactions / n, 'per call')
+    report('bus time', bus.bus_us / n, 'us/call')
+    report('CPU time (this machine)', us, 'us/call')
+    report('heap', allocs(fn, n), 'bytes/call')
+
+chip.press(9) #right button held
+results('old: button poll through bin() strings', legacy_read)
+results('display_read()', io.display_read)
+assert legacy_read() == io.display_read() == [False, True]
+bus.reset_counters()
+legacy_read()
+old_us = bus.bus_us
+bus.reset_counters()
+io.display_read()
+assert bus.bus_us == old_us #without INT only port 1 is read, one byte like before
+chip.set_pins(0x0000) #everything on port 1 low, bin() drops the leading zeros and the old code fails
+try:
+    old = legacy_read()
+except IndexError:
+    old = 'IndexError'
+print('')
+print('all port 1 inputs low: old', old, 'new', io.display_read())
+chip.set_pins(0xFFFF)
+
+k = [0]
+def toggle_old():
+    legacy_led(k[0] & 7, k[0] & 8)
+    k[0] += 1
+def toggle_new():
+    io.pin(k[0] & 7, k[0] & 8)
+    k[0] += 1
+results('old: one LED, both output registers written', toggle_old)
+results('pin(): one LED through the shadow', toggle_new)
+
+io.use_interrupt(22) #any free pin, the board doesn't wire INT
+chip.int_pin = io.int_pin
+io.read_inputs()
+results('display_read() with the INT line, no change', io.display_read)
+chip.press(8)
+bus.reset_counters()
+pressed = io.display_read()
+print('')
+print('after a press with the INT line:', pressed, bus.transactions, 'transaction(s)')
@@ -0,0 +1,67 @@
+#benchmark for reading the MPU6050: the old readfrom_mem + dict path against read() into a reusable array
+import benchutil
+from benchutil import allocs, timeit, report, title
+import fakes
+import gyro
+
+bus = fakes.i2cbus(400000)
+chip = bus.attach(0x68, fakes.mpu6050())
+chip.set(-1200, 350, 16384, -2000, 12, -7, 300)
+imu = gyro.accel(bus)
+
+def legacy(): #what get_values used to do
+    raw_ints = imu.iic.readfrom_mem(imu.addr, 0x3B, 14)
+    vals = {}
+    vals["AcX"] = imu.bytes_toint(raw_ints[0], raw_ints[1])
+    vals["AcY"] = imu.bytes_toint(raw_ints[2], raw_ints[3])
+    vals["AcZ"] = imu.bytes_toint(raw_ints[4], raw_ints[5])
+    vals["Tmp"] = imu.bytes_toint(raw_ints[6], raw_ints[7]) / 340.00 + 36.53
+    vals["GyX"] = imu.bytes_toint(raw_ints[8], raw_ints[9])
+    vals["GyY"] = imu.bytes_toint(raw_ints[10], raw_ints[11])
+    vals["GyZ"] = imu.bytes_toint(raw_ints[12], raw_ints[13])
+    return vals
+
+class nullbus(): #hands back the same 14 bytes with no bus model, so the timings are the driver's own work
+    def __init__(self, data):
+        self.data = bytes(data)
+
+    def writeto(self, address, buf):
+        pass
+
+    def readfrom_mem(self, address, reg, n):
+        return(self.data)
+
+    def readfrom_mem_into(self, address, reg, buf):
+        pass
+
+def kept(fn, n): #heap per call when every result is held on to, i.e. what each sample leaves for the gc on the pico
+    out = [None] * n
+    def run():
+        for i in range(n):
+            out[i] = fn()
+    return(allocs(run) / n)
+
+def results(name, fn, n = 2000):
+    bus.reset_counters()
+    timeit(fn, n)
+    title(name)
+    report('samples/s the bus allows at 400 kHz', n * 1000000 / bus.bus_us, '')
+    report('bus transactions', bus.transactions / n, 'per sample')
+    imu.iic = fast
+    us = timeit(fn, n)
+    report('driver CPU time (this machine)', us, 'us/sample')
+    report('samples/s, driver CPU only', 1000000 / us, '')
+    report('heap left per sample', kept(fn, n), 'bytes')
+    imu.iic = bus
+
+imu.read()
+fast = nullbus(imu.buf)
+
+results('old: readfrom_mem, bytes_toint, dict', legacy)
+results('read() into a reusable array', imu.read)
+results('get_values() on top of read()', imu.get_values)
+old = legacy()
+new = imu.get_values()
+assert old == new, (old, new)
+print('')
+print('read():', list(imu.read()))
@@ -0,0 +1,41 @@
+#benchmark and check of the hall speed engine, fed with synthetic edge times instead of a magnet
+import benchutil
+from benchutil import allocs, timeit, report, title
+import fakes
+import hall_speed
+
+def feed(h, intervals, t = 0): #record an edge after each interval (us), returns the time of the last one
+    h.edge(t)
+    for dt in intervals:
+        t += dt
+        h.edge(t)
+    return(t)
+
+#wheel at 300 rpm (a 200 ms interval), one edge caught early by noise
+noisy = [200000] * 8 + [15000, 185000] + [200000] * 2
+mean = hall_speed.hall(None, magnets = 1)
+median = hall_speed.hall(None, magnets = 1, method = hall_speed.MEDIAN)
+t = feed(mean, noisy)
+feed(median, noisy)
+title('300 rpm with one noisy edge in the window')
+report('mean', mean.get_rpm(t), 'rpm')
+report('median', median.get_rpm(t), 'rpm')
+report('speed, median', median.get_speed_kph(t), 'kph')
+report('median, 300 ms since the last edge', median.get_rpm(t + 300000), 'rpm')
+report('median after the timeout', median.get_rpm(t + 61000000), 'rpm')
+
+motor = hall_speed.hall(None, magnets = 4, window = 8)
+t = feed(motor, [5000] * 20) #3000 rpm, four magnets
+report('motor, 5 ms between magnets', motor.get_rpm(t), 'rpm')
+
+#the IRQ handler, called the way the pin would call it
+p = fakes.pin(20)
+h = hall_speed.hall(None)
+p.irq(trigger = p.IRQ_FALLING, handler = h._irq)
+title('costs (this machine)')
+report('IRQ handler', timeit(p.fire, 5000), 'us')
+report('IRQ handler heap', allocs(p.fire, 5000), 'bytes/edge')
+t = feed(median, [200000] * 10)
+report('get_rpm, mean', timeit(lambda: mean.get_rpm(t), 2000), 'us')
+report('get_rpm, median', timeit(lambda: median.get_rpm(t), 2000), 'us')
+report('get_rpm heap', allocs(lambda: median.get_rpm(t), 2000), 'bytes/read')
@@ -0,0 +1,82 @@
+#benchmark for the OLED dirty region refresh: bytes on the bus per frame of a typical dashboard, whole frame against changes only
+import benchutil
+from benchutil import report, title
+import fakes
+import OLED
+
+def dashboard(d, k): #labels stay put, the readings change every frame
+    d.fill_rect(64, 0, 64, 8, 0)
+    d.text('%.1f' % (20 + k * 0.3 % 10), 64, 0) #speed
+    d.fill_rect(64, 16, 64, 8, 0)
+    d.text('%d' % (1500 + k * 7 % 300), 64, 16) #rpm
+    if(k % 10 == 0): #temperatures move slowly
+        d.fill_rect(64, 48, 64, 8, 0)
+        d.text('%d C' % (40 + k // 10), 64, 48)
+
+def labels(d):
+    d.text('kph', 0, 0)
+    d.text('rpm', 0, 16)
+    d.text('V', 0, 32)
+    d.text('temp', 0, 48)
+
+def i2c_run(full, frames = 50):
+    bus = fakes.i2cbus(400000)
+    panel = bus.attach(0x3C, fakes.ssd1306())
+    d = OLED.SSD1306_I2C(128, 64, bus, 0x3C)
+    labels(d)
+    d.show()
+    bus.reset_counters()
+    for k in range(frames):
+        dashboard(d, k)
+        d.show(full)
+        assert panel.ram == d.buffer
+    return(bus)
+
+def spi_run(full, frames = 50):
+    spi = fakes.spibus(1, 10000000)
+    d = OLED.SSD1306_SPI(128, 64, spi, fakes.pin(), fakes.pin(), fakes.pin())
+    labels(d)
+    d.show()
+    spi.reset_counters()
+    for k in range(frames):
+        dashboard(d, k)
+        d.show(full)
+    return(spi)
+
+for name, full in (('whole frame every time', True), ('changed regions only', False)):
+    bus = i2c_run(full)
+    title('I2C at 400 kHz, ' + name)
+    report('bytes per frame', bus.bytes / 50, '')
+    report('transactions per frame', bus.transactions / 50, '')
+    report('bus time per frame', bus.bus_us / 50 / 1000, 'ms')
+    spi = spi_run(full)
+    title('SPI at 10 MHz, ' + name)
+    report('bytes per frame', spi.bytes / 50, '')
+    report('bus time per frame', spi.bus_us / 50 / 1000, 'ms')
+
+#chunked: a frame goes out one step() per scheduler tick while the next one is drawn
+bus = fakes.i2cbus(400000)
+panel = bus.attach(0x3C, fakes.ssd1306())
+d = OLED.SSD1306_I2C(128, 64, bus, 0x3C)
+d.show()
+for name, draw in (('whole frame', lambda k: d.fill(k & 1)), ('dashboard', lambda k: dashboard(d, k))):
+    worst = 0
+    steps = 0
+    torn = 0
+    for k in range(20):
+        draw(k)
+        d.begin()
+        snapshot = bytes(d.buffer)
+        draw(k + 1) #drawing the next frame while this one is in flight
+        while(True):
+            before = bus.bus_us
+            more = d.step()
+            worst = max(worst, bus.bus_us - before)
+            steps += 1
+            if(not more):
+                break
+        torn += panel.ram != snapshot
+    title('I2C, chunks of %d bytes, %s' % (d.chunk, name))
+    report('steps per frame', steps / 20, '')
+    report('longest step on the bus', worst / 1000, 'ms')
+    report('frames that tore', torn, '')
@@ -0,0 +1,81 @@
+#oversampling the ADS7830 (oversample.py) on a fake 400 kHz bus: conversions per second for each burst length, how far
+#the readings are from a true level between two counts with a count of noise on it, what the moving average adds, and
+#the charge counted over a made up 10 minute run against the true charge
+import math
+import random
+import benchutil
+from benchutil import allocs, timeit, report, title
+import fakes
+import ADC
+import oversample
+
+TRUE = 100.37 #counts
+NOISE = 1.0 #counts, RMS
+
+random.seed(3)
+def noisy(channel): #a conversion, rounded to a count the way the chip does
+    return(TRUE + random.gauss(0, NOISE) + 0.5)
+
+bus = fakes.i2cbus(400000)
+chip = bus.attach(0x48, fakes.ads7830(noisy))
+adc = ADC.ADS7830(bus)
+CMDS = bytes([ADC.cmd_se(i) for i in range(4)])
+
+def rms(o, n = 300, filtered = False): #RMS error of channel 0 against TRUE, in counts
+    e = 0.0
+    for k in range(n):
+        o.read()
+        v = o.filtered[0] if filtered else o.values[0]
+        e += (v / o.one - TRUE) ** 2
+    return(math.sqrt(e / n))
+
+title('single read_channel_se()')
+e = 0.0
+for k in range(300):
+    e += (adc.read_channel_se(0) - TRUE) ** 2
+single = math.sqrt(e / 300)
+report('error, RMS', single, 'counts')
+
+for bits in range(oversample.MAX_BITS + 1):
+    o = oversample.oversampler(adc, CMDS, bits)
+    bus.reset_counters()
+    us = timeit(o.read, 50)
+    title('%d conversions a channel, %d extra bits' % (o.n, bits))
+    report('bus time for four channels', bus.bus_us / 50, 'us')
+    report('conversions/s the bus allows', o.n * 4 * 50 * 1000000 / bus.bus_us, '')
+    report('readings/s (four channels)', 50 * 1000000 / bus.bus_us, '')
+    report('CPU time (this machine)', us, 'us')
+    report('error, RMS', rms(o), 'counts')
+    report('noise reduction', single / rms(o), 'x')
+    model = allocs(lambda: [adc.read_burst(c, o.buf) for c in CMDS], 50) #the fake bus's own share
+    report('heap', max(0, allocs(o.read, 50) - model), 'bytes/read')
+
+for budget in (1000, 2000, 5000):
+    title('bus budget %d us for four channels' % budget)
+    report('extra bits chosen', oversample.bits_for(budget, 4), '')
+
+title('moving average on 16 conversion readings')
+for ema in (2, 4):
+    o = oversample.oversampler(adc, CMDS, 2, ema = ema)
+    report('ema %d, error RMS' % ema, rms(o, filtered = True), 'counts')
+    report('ema %d heap' % ema, max(0, allocs(o.read, 50) - model), 'bytes/read')
+
+#10 minutes drawing 20-40 A, read every 100 ms, the current's 4.128 A counts as one channel with noise
+title('charge over 10 minutes')
+AMPS = 0.0258 / 0.00625
+level = [0.0]
+chip.levels = lambda channel: level[0] / AMPS + random.gauss(0, NOISE) + 0.5
+truth = 0.0
+single = oversample.coulombs(AMPS)
+o = oversample.oversampler(adc, bytes([ADC.cmd_se(2)]), 2)
+over = oversample.coulombs(AMPS / o.one)
+for t in range(0, 600000, 100):
+    level[0] = 30 + 10 * math.sin(t / 20000)
+    truth += level[0] * 0.1
+    single.add(adc.read_channel_se(2), t)
+    over.add(o.read()[0], t)
+truth /= 3600
+report('true', truth, 'Ah')
+report('single readings, error', (single.amp_hours() - truth) / truth * 100, '%')
+report('16 conversions, error', (over.amp_hours() - truth) / truth * 100, '%')
+report('add() heap', allocs(lambda: over.add(120, 0), 1000), 'bytes')
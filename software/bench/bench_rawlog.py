@@ -0,0 +1,69 @@
+#benchmark for rawlog: streaming IMU sized records into a preallocated file, against the same records through a log session
+#on CPython the card is a ramdisk with a FAT16 volume built by fakes.fatimage, on the pico it needs a real card in the slot
+import struct
+import benchutil
+from benchutil import CPYTHON, ticks_us, ticks_diff, report, title
+import fakes
+import rawlog
+import SD
+
+RECORDS = 20000 if CPYTHON else 2000
+RECORD = '<IhhhhhhH' #tick, 3 accel axes, 3 gyro axes, sequence
+size = struct.calcsize(RECORD)
+record = bytearray(size)
+
+def stream(write, flush):
+    t = ticks_us()
+    for i in range(RECORDS):
+        struct.pack_into(RECORD, record, 0, i * 2, i, -i, 1000, 3, -3, 7, i & 0xFFFF)
+        write(record)
+        if(i % 500 == 499): #flush twice a second at 1 kHz
+            flush()
+    flush()
+    return(ticks_diff(ticks_us(), t))
+
+def results(name, us, dev):
+    title(name)
+    report('wall time', us / RECORDS, 'us/record')
+    report('writeblocks() calls', dev.writes * 1000 / RECORDS, 'per 1000 records')
+    report('blocks written', dev.blocks_written * 1000 / RECORDS, 'per 1000 records')
+    report('blocks read', dev.blocks_read * 1000 / RECORDS, 'per 1000 records')
+
+if(CPYTHON):
+    dev = fakes.ramdisk(8192)
+    image = fakes.fatimage(dev, spc = 1, mbr = True)
+    image.mkdir('logs')
+    image.add_file('logs/other.csv', 3000)
+    image.add_file('logs/raw_0000.log', (RECORDS * size // 512 + 2) * 512)
+    first, sectors = rawlog.fat_extent(dev, '/logs/raw_0000.log')
+    dev.reset_counters()
+    log = rawlog.rawlog(dev, first, sectors)
+else:
+    c = SD.card()
+    dev = c.SD
+    log = c.open_raw('raw_0000.log', RECORDS * size)
+
+us = stream(log.write, log.flush)
+results('rawlog, %d byte records, 8 sector buffer' % size, us, dev)
+report('bytes dropped', log.dropped, '')
+
+if(CPYTHON): #read the file back through the FAT and check every record made it
+    data = image.read_file('logs/raw_0000.log')
+    used = struct.unpack_from(rawlog.HEADER, data, 0)[3]
+    assert used == RECORDS * size, 'header says %d bytes' % used
+    for i in (0, RECORDS // 2, RECORDS - 1):
+        assert struct.unpack_from(RECORD, data, 512 + i * size)[0] == i * 2
+    frag = fakes.ramdisk(8192)
+    fakes.fatimage(frag).add_file('frag.log', 64 * 512, fragment = True)
+    try:
+        rawlog.fat_extent(frag, 'frag.log')
+        print('fragmented file was not detected')
+    except OSError:
+        pass
+
+    dev = fakes.ramdisk(8192)
+    SD.os = SD.open = fakes.fatmodel(dev)
+    c = SD.card('raw', 'logs', sd = dev, mount = '/ram')
+    dev.reset_counters()
+    s = c.open_session(sync_bytes = 0, sync_ms = 0)
+    results('same records through SD.card.open_session()', stream(s.write, s.sync), dev)
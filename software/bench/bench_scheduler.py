@@ -0,0 +1,54 @@
+#runs the scheduler with fake drivers at the Arduino firmware's period tiers and prints the per-task statistics
+#one fake "SD write" stalls for 30 ms every few seconds to show how a slow card shows up as misses in the other tasks
+import benchutil
+from benchutil import CPYTHON
+import scheduler
+from utime import ticks_us, ticks_diff
+
+RUN_MS = 5000
+
+
+def busy(us): #stands in for a driver call that holds the CPU
+    t = ticks_us()
+    while(ticks_diff(ticks_us(), t) < us):
+        pass
+
+count = [0]
+
+def hall(): #edge bookkeeping, tiny
+    busy(20)
+
+def sample(): #ADC scan plus MPU6050 read
+    busy(1500)
+
+def buttons():
+    busy(300)
+
+def log(): #a card that occasionally takes a long time to program a block
+    count[0] += 1
+    busy(30000 if count[0] % 3 == 0 else 2000)
+
+def housekeeping():
+    busy(100)
+
+s = scheduler.scheduler()
+s.add('hall', hall, scheduler.TICK_1M, deadline_ms = 5)
+s.add('sample', sample, scheduler.TICK_100M, deadline_ms = 20)
+s.add('buttons', buttons, scheduler.TICK_300M)
+s.add('log', log, scheduler.TICK_1S)
+s.add('house', housekeeping, scheduler.TICK_10S)
+print('running for %d ms under %s' % (RUN_MS, 'CPython asyncio' if CPYTHON else 'uasyncio'))
+s.run(RUN_MS)
+s.report()
+
+#wake(): a slow task brought forward by another one, the way main.py takes a row early when the IMU sees a jolt
+starts = []
+s = scheduler.scheduler()
+slow = s.add('slow', lambda: starts.append(ticks_us()), 500, nap_ms = 10)
+def poke():
+    if(len(starts) == 1 and ticks_diff(ticks_us(), starts[0]) > 100000):
+        slow.wake()
+s.add('poke', poke, 20)
+s.run(400)
+print('woken task: %d runs in 400 ms, second run %d ms after the first' % (len(starts), ticks_diff(starts[1], starts[0]) // 1000))
+assert len(starts) >= 2 and ticks_diff(starts[1], starts[0]) < 200000
@@ -0,0 +1,46 @@
+#benchmark for SD.card: the old open-append-close per write against a log session that keeps the file open
+#on CPython the filesystem is fakes.fatmodel, on the pico a real FAT filesystem is made on a ramdisk
+import benchutil
+from benchutil import CPYTHON, ticks_us, ticks_diff, report, title
+import fakes
+import SD
+
+ROW = b'12.345,1800.000,12.600,12.400,35.200,41.500,39.000,28.250,27.750,-0.120,0.980,9.810,1.500,-2.250,0.500,1234\n'
+ROWS = 1000 if CPYTHON else 300 #the pico ramdisk has to fit in RAM
+
+def make_card():
+    if(CPYTHON):
+        dev = fakes.ramdisk(4096)
+        SD.os = SD.open = fakes.fatmodel(dev)
+    else:
+        import os
+        dev = fakes.ramdisk(160)
+        os.VfsFat.mkfs(dev)
+    c = SD.card('log', 'logs', sd = dev, mount = '/ram')
+    dev.reset_counters()
+    return(c, dev)
+
+def run(name, c, dev, rows):
+    t = ticks_us()
+    for i in range(rows):
+        c.write_to_card(ROW)
+    c.close_session()
+    us = ticks_diff(ticks_us(), t)
+    title(name)
+    report('wall time', us / rows, 'us/row')
+    report('writeblocks() calls', dev.writes / rows, 'per row')
+    report('blocks written', dev.blocks_written / rows, 'per row')
+    report('blocks read', dev.blocks_read / rows, 'per row')
+    return(dev.blocks_written + dev.blocks_read)
+
+c, dev = make_card()
+legacy = run('open-append-close per row (%d rows)' % ROWS, c, dev, ROWS)
+if(not CPYTHON):
+    import os
+    os.umount('/ram')
+
+c, dev = make_card()
+c.open_session(sync_bytes = 8192, sync_ms = 1000)
+s = run('log session, sync every 8 KiB or 1 s', c, dev, ROWS)
+print('')
+report('block I/O reduction', legacy / s, 'x')
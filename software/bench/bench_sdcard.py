@@ -0,0 +1,80 @@
+#latency of sdcard.SDCard writes against a simulated card: how long each writeblocks() call holds up the logger,
+#waiting on the card as before, with ACMD23 pre-erase, and in cooperative mode where the card programs while the
+#logger carries on. The SPI clock is 20 MHz and times are simulated (bus time plus the logger's work, which is also
+#what the driver's ticks_ms() timeouts see), see fakes.sdcard for the card's busy times
+import benchutil
+from benchutil import report, title
+import fakes
+import host
+import sdcard
+
+BUCKETS = (1, 2, 5, 10, 20, 50, 100) #ms
+
+def histogram(times):
+    counts = [0] * (len(BUCKETS) + 1)
+    for t in times:
+        i = 0
+        while(i < len(BUCKETS) and t >= BUCKETS[i] * 1000):
+            i += 1
+        counts[i] += 1
+    lo = 0
+    for i in range(len(counts)):
+        hi = '%d ms' % BUCKETS[i] if i < len(BUCKETS) else ''
+        print('    {:>6} - {:<8}{:>6} {}'.format('%d ms' % lo if i else '0', hi, counts[i], '#' * (counts[i] * 40 // len(times))))
+        lo = BUCKETS[i] if i < len(BUCKETS) else lo
+
+def run(name, cooperative = False, pre_erase = False, writes = 200, blocks = 4, work_us = 20000):
+    bus = fakes.spibus(1, 1000000)
+    cs = fakes.pin(13, value = 1)
+    card = bus.attach(fakes.sdcard(4096, spike_us = 40000, spike_every = 25), cs)
+    host.clock(bus.now)
+    sd = sdcard.SDCard(bus, cs, 20000000, cooperative = cooperative, pre_erase = pre_erase)
+    card.reset_counters()
+    sd.busy_polls = 0
+    buf = bytearray(512 * blocks)
+    times = []
+    start = bus.now()
+    for i in range(writes):
+        t = bus.now()
+        sd.writeblocks(100 + i * blocks, buf)
+        times.append(bus.now() - t)
+        bus.wait(work_us) #the logger sampling until the next batch is due
+    total = bus.now() - start
+    title(name)
+    report('longest write call', max(times) / 1000, 'ms')
+    report('mean write call', sum(times) / len(times) / 1000, 'ms')
+    report('card busy', card.busy_us / writes / 1000, 'ms/write')
+    report('busy polls (old driver: one allocation each)', sd.busy_polls / writes, 'per write')
+    report('logger time lost to the card', (total - writes * work_us) / total * 100, '%')
+    histogram(times)
+
+run('waiting for the card, as before')
+run('waiting, with ACMD23 pre-erase', pre_erase = True)
+run('cooperative, with ACMD23 pre-erase', cooperative = True, pre_erase = True)
+
+title('a card busy for 200 ms, within the write busy limit')
+bus = fakes.spibus(1, 1000000)
+cs = fakes.pin(13, value = 1)
+card = bus.attach(fakes.sdcard(4096, spike_us = 200000, spike_every = 1), cs)
+host.clock(bus.now)
+sd = sdcard.SDCard(bus, cs, 20000000)
+start = bus.now()
+sd.writeblocks(100, bytearray(512))
+sd.writeblocks(101, bytearray(1024))
+assert card.blocks_written == 3
+report('two writes took', (bus.now() - start) / 1000, 'ms')
+
+title('a card that never finishes writing')
+bus = fakes.spibus(1, 1000000)
+cs = fakes.pin(13, value = 1)
+card = bus.attach(fakes.sdcard(4096, spike_us = 10000000, spike_every = 1), cs)
+host.clock(bus.now)
+sd = sdcard.SDCard(bus, cs, 20000000)
+start = bus.now()
+try:
+    sd.writeblocks(100, bytearray(512))
+    raise AssertionError('writeblocks() returned with the card still busy')
+except OSError:
+    pass
+report('writeblocks() gave up after', (bus.now() - start) / 1000, 'ms')
+host.clock()
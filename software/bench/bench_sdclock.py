@@ -0,0 +1,69 @@
+#SPI clock calibration against a simulated card that garbles data and command addresses above 20 MHz: the rate it
+#settles on, that nothing outside the scratch file was touched, the throughput at each rate, and SD.card caching the
+#result on the card so the next boot only checks it. The card holds a FAT16 volume (fakes.fatimage) with a log file and
+#the scratch file on it. Times are simulated bus time, see fakes.sdcard; the SDCard itself only looks at the data, so
+#the same run on the pico measures a real card
+import benchutil
+from benchutil import report, title
+import fakes
+import sdcard
+import sdclock
+import SD
+
+MAX_BAUD = 20000000
+
+def make_card():
+    bus = fakes.spibus(1, 1000000)
+    cs = fakes.pin(13, value = 1)
+    card = bus.attach(fakes.sdcard(8192, max_baud = MAX_BAUD), cs)
+    disk = fakes.ramdisk(8192)
+    image = fakes.fatimage(disk)
+    image.mkdir('logs')
+    image.add_file('logs/log_0000.bin', bytes(range(256)) * 40)
+    image.add_file(sdclock.SCRATCH_FILE, sdclock.SCRATCH * 512)
+    card.data[:] = disk.data
+    sd = sdcard.SDCard(bus, cs)
+    return(bus, card, sd)
+
+def now_fn(bus):
+    return(lambda: bus.now())
+
+bus, card, sd = make_card()
+c = sdclock.clock(sd, sdclock.scratch_file(sd, '/sd/' + sdclock.SCRATCH_FILE, '/sd'))
+before = bytes(card.data)
+rate = c.calibrate()
+title('calibration, card good to %.1f MHz' % (MAX_BAUD / 1000000))
+report('settled on', rate / 1000000, 'MHz')
+report('first rate that failed', c.failed / 1000000, 'MHz')
+report('commands and blocks rejected by CRC', card.crc_errors, '')
+lo, hi = c.scratch, c.scratch + sdclock.SCRATCH
+changed = sum([before[i * 512:(i + 1) * 512] != card.data[i * 512:(i + 1) * 512] for i in range(8192) if not lo <= i < hi])
+report('sectors changed outside the scratch file', changed, '')
+assert changed == 0
+assert not sd.crc
+
+title('throughput by rate, %d sector writes and reads' % sdclock.SCRATCH)
+for r in sdclock.RATES:
+    if(r > rate):
+        break
+    c.set(r)
+    w, rd = c.measure(8, now_fn(bus), lambda a, b: a - b)
+    report('%.2f MHz write' % (r / 1000000), w, 'kB/s')
+    report('%.2f MHz read' % (r / 1000000), rd, 'kB/s')
+
+#through SD.card: the first mount calibrates and writes the cache, the second only checks the cached rate
+#(SD.card measures with ticks_us, so on the PC the kB/s it prints are the speed of the simulation, not the card)
+fs = fakes.fatmodel(fakes.ramdisk(16))
+SD.os = SD.open = sdclock.open = fs
+for boot in (1, 2):
+    bus, card, sd = make_card()
+    card.reset_counters()
+    t = bus.now()
+    log = SD.card('log', 'logs', sd = sd)
+    title('SD.card, boot %d' % boot)
+    report('rate', log.clock.rate / 1000000, 'MHz')
+    report('from the cache', log.clock.cached, '')
+    report('time spent tuning', (bus.now() - t) / 1000, 'ms')
+    report('blocks written', card.blocks_written, '')
+print('cache file: ' + fs.files['/sd/' + sdclock.CACHE].decode().strip())
+print(log.clock)
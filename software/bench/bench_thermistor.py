@@ -0,0 +1,42 @@
+#benchmark for temperature conversion: the old cubic polynomial per thermistor against one scan and table lookups
+import benchutil
+from benchutil import allocs, timeit, report, title
+import fakes
+import ADC
+import thermistor
+import thermtable
+
+bus = fakes.i2cbus(400000)
+bus.attach(0x48, fakes.ads7830([0, 0, 0, 0, 90, 128, 150, 200]))
+adc = ADC.ADS7830(bus)
+
+def cubic(raw): #the conversion thermistor.py used to do
+    return(-54.9 + (1.52*raw) + (-0.011*pow(raw,2)) + (0.0000312*pow(raw,3)))
+
+def legacy():
+    for i in range(4):
+        raw = adc.read_channel_se(4 + i)
+        c = int(cubic(raw))
+        f = int((c*5/9)+32)
+
+temps = thermistor.bank(adc)
+
+def results(name, fn, n = 500):
+    bus.reset_counters()
+    us = timeit(fn, n)
+    title(name)
+    report('time for all four', us, 'us')
+    report('bus transactions', bus.transactions / n, 'per read')
+    report('heap', allocs(fn, n), 'bytes/read')
+
+results('old: read and cubic per thermistor', legacy)
+results('bank.read(): one scan, table lookups', temps.read)
+conv = timeit(lambda: cubic(150), 5000)
+look = timeit(lambda: thermtable.TABLE[150], 5000)
+print('')
+report('cubic conversion', conv, 'us')
+report('table lookup', look, 'us')
+#the cubic rose with the reading, the table follows main.ino (thermistor on the low side of the divider, hotter reads lower)
+#so only the 25C point is worth comparing
+report('table at the 25C reading (128)', thermtable.TABLE[128] / 10, 'C')
+print('readings', list(temps.raw), '->', temps.read(), 'tenths C')
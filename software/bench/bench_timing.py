@@ -0,0 +1,78 @@
+#cost of the timing spans (timing.py) on the simulated board, and the summary they give for a few seconds of the logger's
+#work with a card that stalls now and then. Span times are wall time, so on the PC they time the simulation rather than
+#the buses; the histogram shape is the point
+import benchutil
+from benchutil import allocs, timeit, report, title
+import sim
+import board
+import fakes
+import SD
+import timing
+
+s = sim.setup(spike_us = 40000, spike_every = 10)
+adc = board.adc()
+imu = board.imu()
+sd = board.sd()
+block = bytearray(512)
+
+title('overhead per call')
+for name, fn in (('ADS7830.read_channel_se', lambda: adc.read_channel_se(3)), ('accel.get_values', imu.get_values),
+        ('SDCard.readblocks', lambda: sd.readblocks(200, block))):
+    plain = timeit(fn, 2000)
+    plain_heap = allocs(fn, 2000)
+    timing.instrument()
+    timed = timeit(fn, 2000)
+    timed_heap = allocs(fn, 2000)
+    timing.uninstrument()
+    report(name + ', added', timed - plain, 'us')
+    report(name + ', added heap', max(0, timed_heap - plain_heap), 'bytes')
+
+title('a span on its own')
+sp = timing.get('bench')
+report('add()', timeit(lambda: sp.add(700), 10000), 'us')
+report('add() heap', allocs(lambda: sp.add(700), 10000), 'bytes')
+
+#exactly 1% outliers: the p99 call is still a fast one
+sp = timing.span('p99')
+for i in range(990):
+    sp.add(80)
+for i in range(10):
+    sp.add(40000)
+assert sp.percentile(99) == 100, sp.percentile(99) #the 80 us calls' bucket
+assert sp.percentile(100) == 40000
+
+#keyword arguments go through the wrapper, OLED.SSD1306.show(full=True) is in HOT
+oled = board.display(0)
+timing.instrument()
+oled.show(full = True)
+timing.uninstrument()
+
+timing.reset()
+timing.instrument()
+for i in range(200):
+    adc.scan(b'\x84\xc4\x94\xd4', bytearray(4))
+    imu.get_values()
+    if(i % 10 == 0):
+        sd.writeblocks(200 + i, block)
+        sd.readblocks(200 + i, block)
+timing.uninstrument()
+print('')
+print(timing.summary())
+
+#the filesystem keeps the block device's methods from when it is mounted: only a card mounted after instrument() is timed
+def mounted_io(instrument_first):
+    timing.reset()
+    if(instrument_first):
+        timing.instrument()
+    SD.os = SD.open = fakes.fatmodel(s.card)
+    c = SD.card(sd = board.sd(), tune = False)
+    if(not instrument_first):
+        timing.instrument()
+    c.write_to_card(b'x' * 600, 'profile.csv')
+    timing.uninstrument()
+    return(timing.get('SDCard.readblocks').n + timing.get('SDCard.writeblocks').n)
+title('block I/O seen through the filesystem')
+report('card mounted, then instrument()', mounted_io(False), 'calls')
+n = mounted_io(True)
+report('instrument(), then card mounted', n, 'calls')
+assert n > 0
@@ -0,0 +1,58 @@
+#benchmark for the buffered writer: a 1 kHz sampler logging 64 byte records into a rawlog on a card that stalls now and then,
+#written straight through (the sampler waits on every write) against writer.writer with a few buffer counts and both policies.
+#times are simulated, see fakes.stalldisk; a sample is late when it starts after its 1 ms slot
+import struct
+import benchutil
+from benchutil import allocs, report, title
+import fakes
+import rawlog
+import writer
+
+RECORD = '<IhhhhhhH' + 'x' * 48 #tick, 3 accel axes, 3 gyro axes, sequence, padded to 64 bytes
+record = bytearray(struct.calcsize(RECORD))
+SECONDS = 4
+
+def card(wait):
+    return(fakes.stalldisk(4096, xfer_us = 30, program_us = 300, stall_us = 50000, stall_every = 100, wait = wait))
+
+def run(name, buffers = 0, policy = writer.DROP):
+    disk = card(buffers == 0)
+    raw = rawlog.rawlog(disk, 0, 4000, buffer_sectors = 1)
+    w = writer.writer(raw.write, buffers, 512, policy, disk.ready) if buffers else None
+    out = w if w else raw
+    worst = 0
+    late = 0
+    accepted = 0
+    for k in range(SECONDS * 1000):
+        due = k * 1000
+        if(disk.clock < due):
+            disk.clock = due
+        worst = max(worst, disk.clock - due)
+        late += disk.clock - due > 1000
+        struct.pack_into(RECORD, record, 0, k, 0, 0, 16384, 0, 0, 0, k & 0xFFFF)
+        accepted += out.write(record)
+        disk.wait(100) #the rest of the sample's work
+        if(w):
+            w.step()
+    if(w):
+        w.flush()
+    raw.flush()
+    assert raw.used() == accepted
+    title(name)
+    report('longest sample delay', worst / 1000, 'ms')
+    report('samples more than 1 ms late', late, '')
+    report('card stalls', disk.stalls, '')
+    if(w):
+        report('overruns', w.overruns, '')
+        report('records dropped', w.dropped // len(record), '')
+        report('most bytes waiting', w.max_fill, '')
+        report('writes put off while the card was busy', w.deferred, '')
+
+run('straight through, waiting on the card')
+for buffers in (2, 4, 8, 16):
+    run('%d buffers, drop when full' % buffers, buffers)
+run('4 buffers, block when full', 4, writer.BLOCK)
+
+title('heap')
+w = writer.writer(lambda mv: None, 4)
+report('write() and step()', allocs(lambda: (w.write(record), w.step()), 1000), 'bytes/record')
@@ -0,0 +1,74 @@
+#shared helpers for the benchmark scripts in this folder
+#the scripts run on a PC under CPython (from any directory) or on the pico with the library files copied over as usual
+import sys
+import gc
+
+CPYTHON = sys.implementation.name != 'micropython'
+
+if(CPYTHON):
+    import os
+    import time
+    import tracemalloc
+    import host
+    host.install()
+    _here = os.path.dirname(os.path.abspath(__file__))
+    for _p in ('..', os.path.join('..', 'libraries')):
+        _p = os.path.normpath(os.path.join(_here, _p))
+        if(_p not in sys.path):
+            sys.path.insert(0, _p)
+
+    def ticks_us():
+        return(time.perf_counter_ns() // 1000)
+
+    def ticks_diff(a, b):
+        return(a - b)
+else:
+    from time import ticks_us, ticks_diff
+
+
+def timeit(fn, n = 1): #average microseconds per call of fn()
+    t = ticks_us()
+    for i in range(n):
+        fn()
+    return(ticks_diff(ticks_us(), t) / n)
+
+#heap bytes per call of fn()
+#on the pico this is every allocation (gc is held off for the run), on CPython temporaries are freed straight away
+#so the host number is the memory still held after the run, i.e. what would keep growing a gc heap
+def allocs(fn, n = 1):
+    gc.collect()
+    if(CPYTHON):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(n):
+            fn()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return(max(0, after - before) / n)
+    gc.disable()
+    before = gc.mem_alloc()
+    for i in range(n):
+        fn()
+    after = gc.mem_alloc()
+    gc.enable()
+    return((after - before) / n)
+
+#largest amount of heap fn() has in use at once, for things that build big temporary lists
+def peak_heap(fn):
+    gc.collect()
+    if(CPYTHON):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return(peak - before)
+    return(allocs(fn))
+
+def report(name, value, unit = ''):
+    print('{:<44}{:>14.2f} {}'.format(name, value, unit))
+
+def title(name):
+    print('')
+    print(name)
+    print('-' * len(name))
@@ -0,0 +1,1083 @@
+#fake devices for the benchmarks, so the logging code can be measured without a card or a pico
+
+
+#an in-memory block device with the same readblocks/writeblocks/ioctl interface as sdcard.SDCard,
+#counting calls and blocks so the benchmarks can compare how hard each approach works the card
+class ramdisk():
+    def __init__(self, blocks = 2048, block_size = 512):
+        self.blocks = blocks
+        self.block_size = block_size
+        self.data = bytearray(blocks * block_size)
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.reads = 0 #readblocks() calls
+        self.writes = 0 #writeblocks() calls
+        self.blocks_read = 0
+        self.blocks_written = 0
+
+    def readblocks(self, block_num, buf, offset = 0):
+        start = block_num * self.block_size + offset
+        if(start + len(buf) > len(self.data)):
+            raise OSError(5)
+        buf[:] = self.data[start:start + len(buf)]
+        self.reads += 1
+        self.blocks_read += (len(buf) + self.block_size - 1) // self.block_size
+
+    def writeblocks(self, block_num, buf, offset = 0):
+        start = block_num * self.block_size + offset
+        if(start + len(buf) > len(self.data)):
+            raise OSError(5)
+        self.data[start:start + len(buf)] = buf
+        self.writes += 1
+        self.blocks_written += (len(buf) + self.block_size - 1) // self.block_size
+
+    def ioctl(self, op, arg):
+        if(op == 4): #number of blocks
+            return(self.blocks)
+        if(op == 5): #block size
+            return(self.block_size)
+        return(0)
+
+
+#a ramdisk on a simulated clock (now(), wait()) whose writes take time like a card's: a writeblocks() call costs
+#xfer_us per block on the bus, then the card programs for program_us per block plus stall_us every stall_every writes.
+#with wait = True a write returns once the card is done, as with sdcard.SDCard waiting on busy; with wait = False it
+#returns straight after the transfer (a cooperative SDCard) and the next write waits out whatever busy is left.
+#ready() says whether a write would start now. Counters as ramdisk plus stalls, waited_us (time callers spent waiting on busy)
+class stalldisk(ramdisk):
+    def __init__(self, blocks = 2048, xfer_us = 30, program_us = 300, stall_us = 0, stall_every = 0, wait = True):
+        ramdisk.__init__(self, blocks)
+        self.xfer_us = xfer_us
+        self.program_us = program_us
+        self.stall_us = stall_us
+        self.stall_every = stall_every
+        self.wait_busy = wait
+        self.clock = 0
+        self.busy_until = 0
+
+    def reset_counters(self):
+        ramdisk.reset_counters(self)
+        self.stalls = 0
+        self.waited_us = 0
+
+    def now(self):
+        return(self.clock)
+
+    def wait(self, us): #time spent on other work
+        self.clock += us
+
+    def ready(self):
+        return(self.clock >= self.busy_until)
+
+    def writeblocks(self, block_num, buf, offset = 0):
+        if(self.clock < self.busy_until):
+            self.waited_us += self.busy_until - self.clock
+            self.clock = self.busy_until
+        ramdisk.writeblocks(self, block_num, buf, offset)
+        n = (len(buf) + self.block_size - 1) // self.block_size
+        self.clock += n * self.xfer_us
+        busy = n * self.program_us
+        if(self.stall_every and self.writes % self.stall_every == 0):
+            busy += self.stall_us
+            self.stalls += 1
+        self.busy_until = self.clock + busy
+        if(self.wait_busy):
+            self.waited_us += busy
+            self.clock = self.busy_until
+
+
+#what micropython's VfsFat keeps of a block device: its readblocks, writeblocks and ioctl bound when it is made, so a
+#method patched on the class afterwards (e.g. by timing.instrument()) is never called by the filesystem
+class _mounted():
+    def __init__(self, dev):
+        self.readblocks = dev.readblocks
+        self.writeblocks = dev.writeblocks
+        self.ioctl = dev.ioctl
+        self.blocks = dev.ioctl(4, 0)
+
+
+#CPython has no os.VfsFat, so this stands in for the os module and open() and charges block I/O to a ramdisk
+#roughly the way FatFs would: a directory walk on every open, a sector window per file, a cluster chain walk to
+#seek to the end for appending, and FAT plus directory entry writes whenever a file is synced or closed
+#put it in place of a module's os and open globals, e.g. SD.os = SD.open = model
+class fatmodel():
+    SECTOR = 512
+    CLUSTER = 8 #sectors per cluster
+    ENTRY = 32 #bytes per directory entry
+
+    def __init__(self, dev = None):
+        self.dev = dev if dev is not None else ramdisk()
+        self.scratch = bytearray(self.SECTOR)
+        self.files = {} #path: bytearray of contents
+        self.dirs = {'': []} #path: list of names in it
+        self.opens = 0
+        self.syncs = 0
+
+    def __call__(self, path, mode = 'r'): #acts as open()
+        return(self.open(path, mode))
+
+    def _split(self, path):
+        path = path.rstrip('/')
+        i = path.rfind('/')
+        return(path[:i], path[i + 1:])
+
+    def _sector(self, key, n): #a stable made-up sector number for block n of some object
+        return((hash(key) * 131 + n) % (self.dev.blocks - 1) + 1)
+
+    def _walk_dir(self, directory, upto = None): #read directory sectors until upto is found (or all of them)
+        names = self.dirs[directory]
+        count = len(names) + 1
+        if(upto in names):
+            count = names.index(upto) + 1
+        for n in range((count * self.ENTRY + self.SECTOR - 1) // self.SECTOR):
+            self.dev.readblocks(self._sector(directory, n), self.scratch)
+
+    def _dir_entry_write(self, directory, name):
+        n = self.dirs[directory].index(name) * self.ENTRY // self.SECTOR
+        self.dev.readblocks(self._sector(directory, n), self.scratch)
+        self.dev.writeblocks(self._sector(directory, n), self.scratch)
+
+    #the os functions SD.card uses
+    def VfsFat(self, dev): #from here on the block I/O goes to dev's methods as they are now, see _mounted
+        self.dev = _mounted(dev)
+        return(self)
+
+    def mount(self, vfs, path):
+        self.root = path.rstrip('/')
+        if(self.root not in self.dirs): #mounting again finds the files from last time
+            self.dirs[self.root] = []
+
+    def listdir(self, path = ''):
+        path = path.rstrip('/')
+        self._walk_dir(path)
+        return(list(self.dirs[path]))
+
+    def ilistdir(self, path = ''): #yields (name, type, inode, size) like micropython
+        path = path.rstrip('/')
+        names = self.dirs[path]
+        per_sector = self.SECTOR // self.ENTRY
+        for i in range(len(names)):
+            if(i % per_sector == 0):
+                self.dev.readblocks(self._sector(path, i // per_sector), self.scratch)
+            full = path + '/' + names[i]
+            if(full in self.dirs):
+                yield (names[i], 0x4000, 0, 0)
+            else:
+                yield (names[i], 0x8000, 0, len(self.files[full]))
+
+    def mkdir(self, path):
+        directory, name = self._split(path)
+        self._walk_dir(directory)
+        self.dirs[directory].append(name)
+        self.dirs[path.rstrip('/')] = []
+        self._dir_entry_write(directory, name)
+
+    def stat(self, path):
+        directory, name = self._split(path)
+        self._walk_dir(directory, name)
+        path = path.rstrip('/')
+        if(path in self.dirs):
+            return((0x4000, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+        if(path in self.files):
+            return((0x8000, 0, 0, 0, 0, 0, len(self.files[path]), 0, 0, 0))
+        raise OSError(2) #ENOENT
+
+    def remove(self, path):
+        directory, name = self._split(path)
+        self._walk_dir(directory, name)
+        self._dir_entry_write(directory, name)
+        self.dirs[directory].remove(name)
+        del self.files[path]
+
+    def rename(self, old, new):
+        d0, n0 = self._split(old)
+        d1, n1 = self._split(new)
+        self._walk_dir(d0, n0)
+        self._dir_entry_write(d0, n0)
+        if(new in self.files):
+            self.remove(new)
+        self.dirs[d0].remove(n0)
+        self.dirs[d1].append(n1)
+        self._dir_entry_write(d1, n1)
+        self.files[new] = self.files.pop(old)
+
+    def sync(self):
+        pass
+
+    def open(self, path, mode = 'r'):
+        directory, name = self._split(path)
+        if(directory not in self.dirs):
+            raise OSError(2)
+        self._walk_dir(directory, name)
+        self.opens += 1
+        if(name not in self.dirs[directory]):
+            if('r' in mode):
+                raise OSError(2)
+            self.dirs[directory].append(name)
+            self.files[path] = bytearray()
+            self._dir_entry_write(directory, name)
+        elif('w' in mode):
+            self.files[path] = bytearray()
+        return(_fatfile(self, path, directory, name, mode))
+
+
+class _fatfile():
+    def __init__(self, fs, path, directory, name, mode):
+        self.fs = fs
+        self.path = path
+        self.directory = directory
+        self.name = name
+        self.binary = 'b' in mode
+        self.data = fs.files[path]
+        self.pos = 0
+        self.window = -1 #file sector held in the sector window
+        self.dirty = False #window holds unwritten data
+        self.fat_dirty = False #clusters allocated since the last sync
+        self.size_dirty = False
+        if('a' in mode): #seeking to the end walks the cluster chain through the FAT, then loads the last sector
+            self.pos = len(self.data)
+            clusters = (len(self.data) + fs.SECTOR * fs.CLUSTER - 1) // (fs.SECTOR * fs.CLUSTER)
+            for n in range((clusters * 4 + fs.SECTOR - 1) // fs.SECTOR):
+                fs.dev.readblocks(fs._sector('FAT', n), fs.scratch)
+            if(self.pos % fs.SECTOR):
+                self._load(self.pos // fs.SECTOR)
+
+    def _load(self, sector):
+        fs = self.fs
+        if(self.window == sector):
+            return
+        self._flush_window()
+        if(sector * fs.SECTOR < len(self.data)): #sector already has data on the card
+            fs.dev.readblocks(fs._sector(self.path, sector), fs.scratch)
+        self.window = sector
+
+    def _flush_window(self):
+        if(self.dirty):
+            self.fs.dev.writeblocks(self.fs._sector(self.path, self.window), self.fs.scratch)
+            self.dirty = False
+
+    def _grow(self, end): #allocate clusters up to byte offset end
+        fs = self.fs
+        size = fs.SECTOR * fs.CLUSTER
+        if((end + size - 1) // size > (len(self.data) + size - 1) // size):
+            fs.dev.readblocks(fs._sector('FAT', len(self.data) // size // 128), fs.scratch)
+            self.fat_dirty = True
+
+    def write(self, data):
+        fs = self.fs
+        if(isinstance(data, str)):
+            data = data.encode()
+        data = memoryview(data)
+        n = len(data)
+        end = self.pos + n
+        self._grow(end)
+        i = 0
+        while(i < n):
+            sector = (self.pos + i) // fs.SECTOR
+            offset = (self.pos + i) % fs.SECTOR
+            whole = (n - i) // fs.SECTOR
+            if(offset == 0 and whole): #aligned whole sectors go straight to the card in one multi-block write
+                self._flush_window()
+                if(self.window >= sector and self.window < sector + whole):
+                    self.window = -1
+                fs.dev.writeblocks(fs._sector(self.path, sector), data[i:i + whole * fs.SECTOR])
+                i += whole * fs.SECTOR
+                continue
+            self._load(sector)
+            k = min(fs.SECTOR - offset, n - i)
+            self.dirty = True
+            i += k
+            if(offset + k == fs.SECTOR): #window is full
+                self._flush_window()
+        self.data[self.pos:end] = data
+        self.pos = end
+        self.size_dirty = True
+        return(n)
+
+    def tell(self):
+        return(self.pos)
+
+    def read(self, n = -1):
+        fs = self.fs
+        if(n < 0):
+            n = len(self.data) - self.pos
+        for s in range(self.pos // fs.SECTOR, (self.pos + n + fs.SECTOR - 1) // fs.SECTOR):
+            fs.dev.readblocks(fs._sector(self.path, s), fs.scratch)
+        ret = bytes(self.data[self.pos:self.pos + n])
+        self.pos += len(ret)
+        if(self.binary):
+            return(ret)
+        return(ret.decode())
+
+    def flush(self): #f_sync: data window, FAT and directory entry
+        fs = self.fs
+        self._flush_window()
+        if(self.fat_dirty):
+            fs.dev.writeblocks(fs._sector('FAT', len(self.data) // (fs.SECTOR * fs.CLUSTER) // 128), fs.scratch)
+            self.fat_dirty = False
+        if(self.size_dirty):
+            fs._dir_entry_write(self.directory, self.name)
+            self.size_dirty = False
+        fs.syncs += 1
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *args):
+        self.close()
+
+
+#writes a small FAT16 volume straight onto a block device, so code that reads the FAT itself (rawlog.fat_extent)
+#can be tried on CPython. Names must fit 8.3, directories only one level deep
+class fatimage():
+    def __init__(self, dev, spc = 1, mbr = False):
+        import struct
+        self.struct = struct
+        self.dev = dev
+        self.spc = spc
+        self.base = 63 if mbr else 0
+        sector = bytearray(512)
+        total = dev.blocks - self.base
+        fatsz = ((total // spc + 2) * 2 + 511) // 512
+        self.fat_start = self.base + 1
+        self.root_start = self.fat_start + 2 * fatsz
+        self.data_start = self.root_start + 32
+        self.fatsz = fatsz
+        self.clusters = (total - (self.data_start - self.base)) // spc
+        if(self.clusters < 4085 or self.clusters >= 65525):
+            raise ValueError('ramdisk size does not give a FAT16 volume')
+        if(mbr):
+            struct.pack_into('<B3xB3xII', sector, 446, 0, 0x06, self.base, total)
+            sector[510] = 0x55
+            sector[511] = 0xAA
+            dev.writeblocks(0, sector)
+            sector = bytearray(512)
+        sector[0:3] = b'\xeb\x3c\x90'
+        sector[3:11] = b'MSWIN4.1'
+        struct.pack_into('<HBHBHHBHHHII', sector, 11, 512, spc, 1, 2, 512, total if total < 65536 else 0, 0xF8,
+            fatsz, 63, 255, self.base, total if total >= 65536 else 0)
+        sector[36:62] = b'\x80\x00\x29\x78\x56\x34\x12NO NAME    FAT16   '
+        sector[510] = 0x55
+        sector[511] = 0xAA
+        dev.writeblocks(self.base, sector)
+        self._set_fat(0, 0xFFF8)
+        self._set_fat(1, 0xFFFF)
+        self.next_free = 2
+        self.dirs = {'': 0} #name: first cluster, 0 is the fixed root directory
+
+    def _set_fat(self, cluster, value):
+        buf = bytearray(512)
+        for copy in range(2):
+            s = self.fat_start + copy * self.fatsz + cluster * 2 // 512
+            self.dev.readblocks(s, buf)
+            self.struct.pack_into('<H', buf, cluster * 2 % 512, value)
+            self.dev.writeblocks(s, buf)
+
+    def _alloc(self, n, fragment = False): #claim n clusters, leaving a free cluster between each if fragment is set
+        ret = []
+        for i in range(n):
+            ret.append(self.next_free)
+            self.next_free += 2 if fragment else 1
+        for i in range(n):
+            self._set_fat(ret[i], ret[i + 1] if i + 1 < n else 0xFFFF)
+        return(ret)
+
+    def _entry(self, directory, name, attr, cluster, size):
+        base, dot, ext = name.upper().partition('.')
+        raw = (base.ljust(8) + ext.ljust(3)).encode()
+        if(directory == 0):
+            sectors = range(self.root_start, self.root_start + 32)
+        else:
+            first = self.data_start + (directory - 2) * self.spc
+            sectors = range(first, first + self.spc)
+        buf = bytearray(512)
+        for s in sectors:
+            self.dev.readblocks(s, buf)
+            for e in range(0, 512, 32):
+                if(buf[e] == 0):
+                    buf[e:e + 11] = raw
+                    buf[e + 11] = attr
+                    self.struct.pack_into('<HHHHI', buf, e + 20, 0, 0, 0, cluster, size)
+                    self.dev.writeblocks(s, buf)
+                    return
+        raise OSError(28)
+
+    def mkdir(self, name):
+        cluster = self._alloc(1)[0]
+        self.dev.writeblocks(self.data_start + (cluster - 2) * self.spc, bytearray(512 * self.spc))
+        self._entry(cluster, '.', 0x10, cluster, 0)
+        self._entry(cluster, '..', 0x10, 0, 0)
+        self._entry(0, name, 0x10, cluster, 0)
+        self.dirs[name.lower()] = cluster
+
+    def add_file(self, path, data, fragment = False): #data is the contents, or an int for a file of zeros that long
+        directory, slash, name = path.strip('/').rpartition('/')
+        if(isinstance(data, int)):
+            data = bytes(data)
+        size = 512 * self.spc
+        chain = self._alloc(max(1, (len(data) + size - 1) // size), fragment)
+        for i in range(len(chain)):
+            piece = bytearray(data[i * size:(i + 1) * size])
+            piece.extend(bytes(size - len(piece)))
+            self.dev.writeblocks(self.data_start + (chain[i] - 2) * self.spc, piece)
+        self._entry(self.dirs[directory.lower()], name, 0x20, chain[0], len(data))
+
+    def read_file(self, path): #contents of a file added with add_file(), following its cluster chain
+        import rawlog
+        fat = rawlog._fat(self.dev)
+        first, length = fat.find(path)
+        ret = bytearray()
+        buf = bytearray(512 * self.spc)
+        cluster = first
+        while(cluster < 0xFFF8 and len(ret) < length):
+            self.dev.readblocks(fat.cluster_sector(cluster), buf)
+            ret.extend(buf)
+            cluster = fat.next_cluster(cluster)
+        return(bytes(ret[:length]))
+
+
+#an I2C bus with the same methods as machine.I2C, passing transactions on to device models and keeping a tally
+#of the time they would take on the wire: 9 clocks per byte (address included), plus a start and stop per transaction
+#devices are objects with write(data) and read(buf) methods, attach them with bus.attach(address, device)
+class i2cbus():
+    def __init__(self, freq = 400000):
+        self.freq = freq
+        self.devices = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes = 0 #on the wire, addresses included
+        self.bus_us = 0.0
+
+    def attach(self, address, device):
+        self.devices[address] = device
+        return(device)
+
+    def _device(self, address):
+        if(address not in self.devices):
+            raise OSError(19) #ENODEV, what machine.I2C raises on a NAK
+        return(self.devices[address])
+
+    def _account(self, nbytes, starts = 1):
+        self.transactions += 1
+        self.bytes += nbytes
+        self.bus_us += (nbytes * 9 + starts + 1) * 1000000 / self.freq
+
+    def scan(self):
+        return(sorted(self.devices))
+
+    def writeto(self, address, buf, stop = True):
+        self._device(address).write(bytes(buf))
+        self._account(1 + len(buf))
+        return(len(buf))
+
+    def writevto(self, address, vector, stop = True):
+        data = b''.join([bytes(b) for b in vector])
+        self._device(address).write(data)
+        self._account(1 + len(data))
+        return(len(data))
+
+    def readfrom_into(self, address, buf, stop = True):
+        self._device(address).read(buf)
+        self._account(1 + len(buf))
+
+    def readfrom(self, address, n, stop = True):
+        buf = bytearray(n)
+        self.readfrom_into(address, buf)
+        return(bytes(buf))
+
+    def writeto_mem(self, address, reg, buf, addrsize = 8):
+        self._device(address).write(bytes([reg]) + bytes(buf))
+        self._account(2 + len(buf))
+
+    def readfrom_mem_into(self, address, reg, buf, addrsize = 8): #register write, repeated start, read: one transaction
+        dev = self._device(address)
+        dev.write(bytes([reg]))
+        dev.read(buf)
+        self._account(3 + len(buf), starts = 2)
+
+    def readfrom_mem(self, address, reg, n, addrsize = 8):
+        buf = bytearray(n)
+        self.readfrom_mem_into(address, reg, buf)
+        return(bytes(buf))
+
+
+#ADS7830 model: the command byte picks the channel, every byte read is a fresh conversion of that channel
+#levels holds the 8 input levels (0-255), or a function of the channel number for signals that change
+class ads7830():
+    ORDER = (0, 2, 4, 6, 1, 3, 5, 7) #channel selected by command bits 6-4 in single-ended mode
+    DIFF = ((0, 1), (2, 3), (4, 5), (6, 7), (1, 0), (3, 2), (5, 4), (7, 6)) #(+, -) for each code in differential mode
+
+    def __init__(self, levels = None):
+        self.levels = levels if levels is not None else [0, 32, 64, 96, 128, 160, 192, 224]
+        self.cmd = 0x84
+        self.conversions = 0
+
+    def level(self, channel):
+        if(callable(self.levels)):
+            return(max(0, min(255, int(self.levels(channel)))))
+        return(self.levels[channel])
+
+    def write(self, data):
+        if(data):
+            self.cmd = data[-1]
+
+    def read(self, buf):
+        code = (self.cmd >> 4) & 7
+        for i in range(len(buf)):
+            if(self.cmd & 0x80):
+                buf[i] = self.level(self.ORDER[code])
+            else:
+                p, m = self.DIFF[code]
+                buf[i] = max(0, self.level(p) - self.level(m))
+            self.conversions += 1
+
+
+#MPU6050 register model: a write sets the register pointer and stores any data after it, reads auto-increment from there
+#(except FIFO_R_W, which pops the FIFO). set() loads a sample into the data registers (0x3B-0x48), values are the raw
+#signed 16-bit counts. With the FIFO on, advance(us) has the chip take samples at the rate set by CONFIG and SMPLRT_DIV,
+#each one from signal(n) (n counts samples from 0) if given, a 7-tuple like set(), and queues the ones FIFO_EN selects.
+#a full FIFO throws away its oldest bytes and sets FIFO_OFLOW in INT_STATUS, the way the chip does
+class mpu6050():
+    FIFO_SIZE = 1024
+
+    def __init__(self, signal = None):
+        self.regs = bytearray(128)
+        self.regs[0x75] = 0x68 #WHO_AM_I
+        self.regs[0x6B] = 0x40 #PWR_MGMT_1, asleep at power up
+        self.ptr = 0
+        self.reads = 0
+        self.signal = signal
+        self.fifo = bytearray()
+        self.sampled = 0 #samples taken
+        self.lost = 0 #bytes dropped by overflows
+        self.clock = 0.0 #us towards the next sample
+
+    def set(self, ax = 0, ay = 0, az = 16384, temp = 0, gx = 0, gy = 0, gz = 0):
+        v = (ax, ay, az, temp, gx, gy, gz)
+        for i in range(7):
+            self.regs[0x3B + 2 * i] = (v[i] >> 8) & 0xFF
+            self.regs[0x3C + 2 * i] = v[i] & 0xFF
+
+    def rate(self): #samples per second
+        dlpf = self.regs[0x1A] & 7
+        return((8000 if dlpf in (0, 7) else 1000) / (1 + self.regs[0x19]))
+
+    def advance(self, us):
+        self.clock += us
+        period = 1000000 / self.rate()
+        while(self.clock >= period):
+            self.clock -= period
+            if(self.signal is not None):
+                self.set(*self.signal(self.sampled))
+            self.sampled += 1
+            if(self.regs[0x6A] & 0x40):
+                self._queue()
+
+    def _queue(self):
+        en = self.regs[0x23]
+        data = bytearray()
+        if(en & 0x08):
+            data += self.regs[0x3B:0x41]
+        if(en & 0x80):
+            data += self.regs[0x41:0x43]
+        for bit, reg in ((0x40, 0x43), (0x20, 0x45), (0x10, 0x47)):
+            if(en & bit):
+                data += self.regs[reg:reg + 2]
+        self.fifo += data
+        over = len(self.fifo) - self.FIFO_SIZE
+        if(over > 0):
+            del self.fifo[0:over]
+            self.lost += over
+            self.regs[0x3A] |= 0x10
+
+    def write(self, data):
+        if(not data):
+            return
+        self.ptr = data[0]
+        for b in data[1:]:
+            self.write_reg(self.ptr, b)
+            self.ptr = (self.ptr + 1) & 0x7F
+
+    def write_reg(self, reg, value):
+        if(reg == 0x6A and value & 0x04): #FIFO_RESET, self clearing
+            self.fifo = bytearray()
+            value &= ~0x04
+        self.regs[reg] = value
+
+    def read_reg(self, reg):
+        if(reg == 0x3A): #INT_STATUS clears on read
+            v = self.regs[reg]
+            self.regs[reg] = 0
+            return(v)
+        if(reg == 0x72):
+            return(len(self.fifo) >> 8)
+        if(reg == 0x73):
+            return(len(self.fifo) & 0xFF)
+        if(reg == 0x74):
+            if(not self.fifo):
+                return(0)
+            v = self.fifo[0]
+            del self.fifo[0]
+            return(v)
+        return(self.regs[reg])
+
+    def read(self, buf):
+        for i in range(len(buf)):
+            buf[i] = self.read_reg(self.ptr)
+            if(self.ptr != 0x74):
+                self.ptr = (self.ptr + 1) & 0x7F
+        self.reads += 1
+
+
+#SSD1306 on I2C: a control byte then commands or data, horizontal addressing within the column/page window.
+#self.ram is what the panel shows, the same layout as the driver's buffer (page by page, column by column)
+class ssd1306():
+    def __init__(self, width = 128, height = 64):
+        self.width = width
+        self.pages = height // 8
+        self.ram = bytearray(width * self.pages)
+        self.window = [0, width - 1, 0, self.pages - 1]
+        self.col = 0
+        self.page = 0
+        self.args = [] #command waiting for its arguments
+        self.data_bytes = 0
+        self.commands = 0
+
+    def command(self, b):
+        if(self.args):
+            self.args.append(b)
+            if(len(self.args) == 3):
+                if(self.args[0] == 0x21):
+                    self.window[0:2] = self.args[1:3]
+                    self.col = self.args[1]
+                else:
+                    self.window[2:4] = self.args[1:3]
+                    self.page = self.args[1]
+                self.args = []
+            return
+        self.commands += 1
+        if(b in (0x21, 0x22)):
+            self.args = [b]
+
+    def data(self, b):
+        self.ram[self.page * self.width + self.col] = b
+        self.data_bytes += 1
+        self.col += 1
+        if(self.col > self.window[1]):
+            self.col = self.window[0]
+            self.page += 1
+            if(self.page > self.window[3]):
+                self.page = self.window[2]
+
+    def write(self, data):
+        i = 0
+        while(i < len(data)):
+            control = data[i]
+            i += 1
+            if(control & 0x80): #Co=1, one byte then another control byte
+                if(i < len(data)):
+                    (self.data if control & 0x40 else self.command)(data[i])
+                i += 1
+                continue
+            for b in data[i:]:
+                (self.data if control & 0x40 else self.command)(b)
+            return
+
+    def read(self, buf):
+        for i in range(len(buf)):
+            buf[i] = 0
+
+
+#PCA9555 model: 8 registers, the pointer flips between the two registers of a pair after each byte.
+#self.pins is the level on the 16 pins from outside (only seen on input pins), press() and release() drive it.
+#INT (self.int_low) goes low when an input differs from what was last read and back high when the input port is read
+class pca9555():
+    def __init__(self):
+        self.regs = bytearray([0xFF, 0xFF, 0xFF, 0xFF, 0, 0, 0xFF, 0xFF])
+        self.ptr = 0
+        self.pins = 0xFFFF
+        self.latched = [0xFF, 0xFF] #inputs as last read, for INT
+        self.int_low = False
+        self.int_pin = None #a fakes.pin to fire when INT falls
+
+    def _input(self, port):
+        cfg = self.regs[6 + port]
+        out = self.regs[2 + port]
+        return(((self.pins >> (8 * port)) & cfg | out & ~cfg) & 0xFF)
+
+    def _check_int(self):
+        low = self._input(0) != self.latched[0] or self._input(1) != self.latched[1]
+        if(low and not self.int_low and self.int_pin is not None):
+            self.int_pin.value(0)
+            self.int_pin.fire()
+        self.int_low = low
+        if(not low and self.int_pin is not None):
+            self.int_pin.value(1)
+
+    def set_pins(self, value):
+        self.pins = value & 0xFFFF
+        self._check_int()
+
+    def press(self, n):
+        self.set_pins(self.pins & ~(1 << n))
+
+    def release(self, n):
+        self.set_pins(self.pins | 1 << n)
+
+    def write(self, data):
+        if(not data):
+            return
+        self.ptr = data[0] & 7
+        for b in data[1:]:
+            self.regs[self.ptr] = b
+            self.ptr ^= 1
+        self._check_int()
+
+    def read(self, buf):
+        for i in range(len(buf)):
+            if(self.ptr < 2):
+                v = self._input(self.ptr)
+                self.latched[self.ptr] = v
+            else:
+                v = self.regs[self.ptr]
+            buf[i] = v
+            self.ptr ^= 1
+        self._check_int()
+
+
+#minimal machine.Pin: holds a value and can fire an irq handler when told to
+class pin():
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 4
+    IRQ_FALLING = 8
+
+    def __init__(self, id = None, mode = -1, pull = -1, value = None):
+        self.id = id
+        self._value = value if value is not None else 0
+        self.handler = None
+        self.trigger = 0
+
+    def init(self, mode = -1, pull = -1, value = None):
+        if(value is not None):
+            self._value = value
+
+    def value(self, v = None):
+        if(v is None):
+            return(self._value)
+        self._value = 1 if v else 0
+
+    def __call__(self, v = None):
+        return(self.value(v))
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler = None, trigger = 12, hard = False):
+        self.handler = handler
+        self.trigger = trigger
+
+    def fire(self): #what the hardware would do on an edge
+        if(self.handler is not None):
+            self.handler(self)
+
+
+#minimal machine.SPI: counts bytes and clocks them out at the configured rate. With nothing attached reads return 0xFF;
+#attach(device, cs) puts a device with an exchange(byte) -> byte method on the bus, selected while the cs pin is low.
+#now() is the simulated time in us: time on the wire plus whatever wait() says passed in between
+class spibus():
+    def __init__(self, id = 0, baudrate = 1000000, **kwargs):
+        self.baudrate = baudrate
+        self.device = None
+        self.cs = None
+        self.waited = 0.0
+        self.reset_counters()
+
+    def reset_counters(self):
+        if(hasattr(self, 'bus_us')): #now() carries on, a card that is busy stays busy
+            self.waited += self.bus_us
+        self.bytes = 0
+        self.bus_us = 0.0
+
+    def attach(self, device, cs):
+        self.device = device
+        self.cs = cs
+        device.bus = self
+        return(device)
+
+    def now(self):
+        return(self.bus_us + self.waited)
+
+    def wait(self, us): #time spent off the bus, e.g. the logger doing its other work
+        self.waited += us
+
+    def init(self, baudrate = None, **kwargs):
+        if(baudrate is not None):
+            self.baudrate = baudrate
+
+    def _account(self, n):
+        self.bytes += n
+        self.bus_us += n * 8 * 1000000 / self.baudrate
+
+    def _xfer(self, out, buf = None): #clock out the bytes of out (an int repeats), returning what came back in buf
+        n = len(buf) if buf is not None else len(out)
+        live = self.device is not None and self.cs.value() == 0
+        for i in range(n):
+            self._account(1)
+            o = out if isinstance(out, int) else out[i]
+            v = self.device.exchange(o) if live else 0xFF
+            if(buf is not None):
+                buf[i] = v
+
+    def write(self, buf):
+        self._xfer(buf)
+
+    def read(self, n, write = 0):
+        buf = bytearray(n)
+        self._xfer(write, buf)
+        return(bytes(buf))
+
+    def readinto(self, buf, write = 0):
+        self._xfer(write, buf)
+
+    def write_readinto(self, out, buf):
+        self._xfer(out, buf)
+
+
+def _crc7(cmd): #bit by bit, independent of the driver's version
+    c = 0
+    for b in cmd[0:5]:
+        for i in range(7, -1, -1):
+            top = (c >> 6) & 1
+            c = (c << 1) & 0x7F
+            if(top ^ ((b >> i) & 1)):
+                c ^= 0x09
+    return(c << 1 | 1)
+
+def _crc16_byte(c):
+    for i in range(8):
+        c = ((c << 1) ^ 0x1021 if c & 0x8000 else c << 1) & 0xFFFF
+    return(c)
+_CRC16 = [_crc16_byte(i << 8) for i in range(256)]
+
+def _crc16(data):
+    c = 0
+    for b in data:
+        c = ((c << 8) & 0xFFFF) ^ _CRC16[(c >> 8) ^ b]
+    return(c)
+
+
+#SD card on the SPI bus, enough of the protocol for sdcard.SDCard: init (CMD0/8/55/41/58/9/16), single and multi-block
+#reads and writes (CMD17/18/12/24/25) and ACMD23. blocks must be a multiple of 1024 (an SDHC CSD can't say less).
+#programming a block keeps DO low (busy) for a time taken from the bus clock:
+#    write_us per single block write, block_us per block of a multi-block write and stop_us after its stop token,
+#    plus erase_us per block of a multi-block write that wasn't announced with ACMD23 (the card erases as it goes),
+#    plus spike_us every spike_every writes (the card's own housekeeping)
+#the numbers are illustrative, set them to match a card's measurements. read_polls is how many 0xFF bytes come before a
+#data token. Above max_baud (None for no limit) the card's signals no longer settle in time: a byte of every block read
+#or written comes out with a bit flipped, and so does a bit of the address in every read or write command, which then
+#lands on some other block. CMD59 turns CRC checking on: a command or data block whose CRC doesn't match is rejected
+#(R1 0x08, data response 0x0B). Blocks read always carry their real CRC16.
+#Counters: writes, blocks_written, reads, busy_us (total time spent busy), crc_errors
+class sdcard():
+    def __init__(self, blocks = 2048, write_us = 700, block_us = 250, stop_us = 500, erase_us = 400,
+            spike_us = 0, spike_every = 0, read_polls = 4, max_baud = None):
+        self.blocks = blocks
+        self.max_baud = max_baud
+        self.data = bytearray(blocks * 512)
+        self.write_us = write_us
+        self.block_us = block_us
+        self.stop_us = stop_us
+        self.erase_us = erase_us
+        self.spike_us = spike_us
+        self.spike_every = spike_every
+        self.read_polls = read_polls
+        self.bus = None
+        self.busy_until = 0.0
+        self.idle = True #not initialised yet
+        self.acmd = False #the last command was CMD55
+        self.acmd41 = 0
+        self.erase_count = 0 #blocks announced by ACMD23
+        self.out = [] #bytes queued for DO
+        self.cmd = bytearray()
+        self.mode = None #None, 'read', 'write1', 'writen'
+        self.addr = 0
+        self.rx = bytearray() #data block coming in
+        self.rx_len = 0
+        self.polls = 0
+        self.crc = False #CMD59
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.writes = 0
+        self.blocks_written = 0
+        self.reads = 0
+        self.busy_us = 0.0
+        self.crc_errors = 0
+
+    def now(self):
+        return(self.bus.now() if self.bus is not None else 0.0)
+
+    def busy(self, us, first = True): #first: the first block of a write, where a housekeeping spike lands
+        if(self.spike_every and first):
+            if(self.writes % self.spike_every == 0):
+                us += self.spike_us
+        self.busy_until = self.now() + us
+        self.busy_us += us
+
+    def ioctl(self, op, arg):
+        if(op == 4):
+            return(self.blocks)
+        if(op == 5):
+            return(512)
+
+    def _garbled(self): #True if the bus is running faster than the card can follow
+        return(self.max_baud is not None and self.bus is not None and self.bus.baudrate > self.max_baud)
+
+    def _block(self, addr): #the 512 byte block at addr plus its CRC, as DO bytes
+        block = list(self.data[addr * 512:(addr + 1) * 512])
+        c = _crc16(block)
+        if(self._garbled()):
+            block[addr % 512] ^= 0x10
+        return([0xFE] + block + [c >> 8, c & 0xFF])
+
+    def _command(self, c, arg):
+        acmd = self.acmd
+        self.acmd = False
+        r1 = 0x01 if self.idle else 0x00
+        if(c == 0):
+            self.idle = True
+            self.mode = None
+            return([0xFF, 0x01])
+        if(c == 8):
+            return([0xFF, r1, 0x00, 0x00, 0x01, 0xAA])
+        if(c == 55):
+            self.acmd = True
+            return([0xFF, r1])
+        if(c == 41 and acmd):
+            self.acmd41 += 1
+            if(self.acmd41 >= 2):
+                self.idle = False
+            return([0xFF, 0x01 if self.idle else 0x00])
+        if(c == 23 and acmd):
+            self.erase_count = arg
+            return([0xFF, r1])
+        if(c == 58):
+            return([0xFF, r1, 0xC0, 0xFF, 0x80, 0x00]) #powered up, SDHC
+        if(c == 9):
+            csd = bytearray(16)
+            csd[0] = 0x40
+            size = self.blocks // 1024 - 1
+            csd[7] = (size >> 16) & 0x3F
+            csd[8] = (size >> 8) & 0xFF
+            csd[9] = size & 0xFF
+            return([0xFF, 0x00] + [0xFF] * self.read_polls + [0xFE] + list(csd) + [0xFF, 0xFF])
+        if(c == 16):
+            return([0xFF, 0x00])
+        if(c == 59):
+            self.crc = bool(arg & 1)
+            return([0xFF, r1])
+        if(c in (17, 18, 24, 25) and arg >= self.blocks):
+            return([0xFF, 0x20]) #address error
+        if(c == 17):
+            self.reads += 1
+            return([0xFF, 0x00] + [0xFF] * self.read_polls + self._block(arg))
+        if(c == 18):
+            self.reads += 1
+            self.mode = 'read'
+            self.addr = arg
+            return([0xFF, 0x00])
+        if(c == 12):
+            self.mode = None
+            return([0xFF, 0xFF, 0x00]) #stuff byte, then R1
+        if(c in (24, 25)):
+            self.mode = 'write1' if c == 24 else 'writen'
+            self.addr = arg
+            self.rx_len = 0
+            self.run = 0
+            return([0xFF, 0x00])
+        return([0xFF, 0x04]) #illegal command
+
+    def exchange(self, b):
+        if(self.cmd or (b & 0xC0) == 0x40 and self.rx_len == 0): #a command frame, never inside a data block
+            self.cmd.append(b)
+            if(len(self.cmd) == 6):
+                c = self.cmd[0] & 0x3F
+                arg = self.cmd[1] << 24 | self.cmd[2] << 16 | self.cmd[3] << 8 | self.cmd[4]
+                good = self.cmd[5] == _crc7(self.cmd)
+                self.cmd = bytearray()
+                if(self.mode == 'read'):
+                    self.mode = None
+                if(self._garbled() and c in (17, 18, 24, 25)):
+                    arg ^= 0x08
+                    good = False
+                if(self.crc and not good):
+                    self.crc_errors += 1
+                    self.out = [0xFF, 0x09 if self.idle else 0x08]
+                else:
+                    self.out = self._command(c, arg)
+            return(0xFF)
+        if(self.out):
+            return(self.out.pop(0))
+        if(self.now() < self.busy_until):
+            return(0x00)
+        if(self.mode == 'read'): #next block of a CMD18
+            self.out = [0xFF] * (self.read_polls - 1) + self._block(self.addr)
+            self.addr += 1
+            return(0xFF)
+        if(self.mode in ('write1', 'writen')):
+            return(self._write(b))
+        return(0xFF)
+
+    def _write(self, b):
+        if(self.rx_len == 0): #waiting for a token
+            if(b == 0xFE or b == 0xFC):
+                self.rx = bytearray()
+                self.rx_len = 514 #data and CRC
+            elif(b == 0xFD and self.mode == 'writen'): #stop
+                self.mode = None
+                self.out = [0xFF]
+                self.busy(self.stop_us, False)
+                self.erase_count = 0
+            return(0xFF)
+        self.rx.append(b)
+        if(len(self.rx) < self.rx_len):
+            return(0xFF)
+        self.rx_len = 0
+        if(self._garbled()):
+            self.rx[self.addr % 512] ^= 0x08
+        if(self.crc and _crc16(self.rx[0:512]) != self.rx[512] << 8 | self.rx[513]):
+            self.crc_errors += 1
+            self.out = [0xEB] #data rejected, CRC error
+            if(self.mode == 'write1'):
+                self.mode = None
+            return(0xFF)
+        self.data[self.addr * 512:(self.addr + 1) * 512] = self.rx[0:512]
+        self.addr += 1
+        self.blocks_written += 1
+        self.out = [0xE5] #data accepted, then busy
+        if(self.mode == 'write1'):
+            self.mode = None
+            self.writes += 1
+            self.busy(self.write_us)
+        else:
+            us = self.block_us
+            if(self.run >= self.erase_count):
+                us += self.erase_us
+            if(self.run == 0):
+                self.writes += 1
+            self.busy(us, self.run == 0)
+            self.run += 1
+        return(0xFF)
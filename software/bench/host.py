@@ -0,0 +1,198 @@
+#stand-ins for the micropython-only modules, so the libraries can be imported under CPython
+#only what the code in this repo uses is provided. Importing benchutil installs these automatically on CPython
+import sys
+import time
+import types
+
+_start = time.perf_counter_ns()
+_clock = None #simulated time in us, see clock()
+
+
+def clock(now_us = None): #run ticks_us/ticks_ms off a simulated clock (e.g. a fake bus's now()), None for this machine's
+    global _clock
+    _clock = now_us
+
+def _ticks_us():
+    if(_clock is not None):
+        return(int(_clock()))
+    return((time.perf_counter_ns() - _start) // 1000)
+
+def _ticks_ms():
+    if(_clock is not None):
+        return(int(_clock()) // 1000)
+    return((time.perf_counter_ns() - _start) // 1000000)
+
+def _ticks_diff(a, b):
+    return(a - b)
+
+def _ticks_add(a, b):
+    return(a + b)
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+def _sleep_us(us):
+    time.sleep(us / 1000000)
+
+def _passthrough(f = None, *args, **kwargs): #decorators like @micropython.native
+    return(f)
+
+def _module(name, **attrs):
+    m = types.ModuleType(name)
+    for k in attrs:
+        setattr(m, k, attrs[k])
+    return(m)
+
+#framebuf.FrameBuffer in plain Python, MONO_VLSB and MONO_HLSB only. text() uses a made up 8x8 font (the real one is
+#in the firmware), the same size and pixel count per column so drawing costs keep their shape
+MONO_VLSB = 0
+MONO_HLSB = 3
+
+class _framebuffer():
+    def __init__(self, buf, width, height, format, stride = None):
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = stride if stride is not None else width
+
+    def _index(self, x, y): #byte index and bit mask of a pixel
+        if(self.format == MONO_VLSB):
+            return((y >> 3) * self.stride + x, 1 << (y & 7))
+        return((y * ((self.stride + 7) >> 3)) + (x >> 3), 0x80 >> (x & 7))
+
+    def pixel(self, x, y, c = None):
+        if(x < 0 or y < 0 or x >= self.width or y >= self.height):
+            return(None)
+        i, m = self._index(x, y)
+        if(c is None):
+            return(1 if self.buf[i] & m else 0)
+        if(c):
+            self.buf[i] |= m
+        else:
+            self.buf[i] &= ~m & 0xFF
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self.width, x + w)
+        y1 = min(self.height, y + h)
+        if(self.format == MONO_VLSB):
+            for yy in range(y0, y1): #whole columns of a page at a time would be faster, this is only for the host
+                row = (yy >> 3) * self.stride
+                m = 1 << (yy & 7)
+                for xx in range(x0, x1):
+                    if(c):
+                        self.buf[row + xx] |= m
+                    else:
+                        self.buf[row + xx] &= ~m & 0xFF
+            return
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self.pixel(xx, yy, c)
+
+    def fill(self, c):
+        v = 0xFF if c else 0
+        for i in range(len(self.buf)):
+            self.buf[i] = v
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        e = dx + dy
+        while(True):
+            self.pixel(x0, y0, c)
+            if(x0 == x1 and y0 == y1):
+                return
+            e2 = 2 * e
+            if(e2 >= dy):
+                e += dy
+                x0 += sx
+            if(e2 <= dx):
+                e += dx
+                y0 += sy
+
+    def rect(self, x, y, w, h, c, f = False):
+        if(f):
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def text(self, s, x, y, c = 1):
+        for ch in s:
+            code = ord(ch)
+            for j in range(8):
+                col = 0 if code == 32 or j == 7 else (code * 37 + j * 11) & 0x7F
+                for k in range(8):
+                    if(col >> k & 1):
+                        self.pixel(x + j, y + k, c)
+            x += 8
+
+    def blit(self, fb, x, y, key = -1, palette = None):
+        for yy in range(fb.height):
+            for xx in range(fb.width):
+                c = fb.pixel(xx, yy)
+                if(c != key):
+                    self.pixel(x + xx, y + yy, c)
+
+    def ellipse(self, x, y, xr, yr, c, f = False, m = 0xF): #m picks the quadrants: 1 top right, 2 top left, 4 bottom left, 8 bottom right
+        for yy in range(-yr, yr + 1):
+            for xx in range(-xr, xr + 1):
+                q = (1 if yy <= 0 else 8) if xx >= 0 else (2 if yy <= 0 else 4)
+                if(not m & q):
+                    continue
+                d = (xx * xx * yr * yr + yy * yy * xr * xr) if xr and yr else 0
+                r = xr * xr * yr * yr
+                if(d <= r and (f or d > r - 2 * max(xr, yr) * min(xr, yr) or xr == 0 or yr == 0)):
+                    self.pixel(x + xx, y + yy, c)
+
+    def poly(self, x, y, coords, c, f = False): #outline only, a fill is drawn as the outline too (enough for the host)
+        n = len(coords) // 2
+        for i in range(n):
+            j = (i + 1) % n
+            self.line(x + coords[2 * i], y + coords[2 * i + 1], x + coords[2 * j], y + coords[2 * j + 1], c)
+
+    def scroll(self, dx, dy): #like framebuf: the contents move, what they uncover keeps its old pixels
+        w = self.width
+        h = self.height
+        xs = range(w - 1, -1, -1) if dx > 0 else range(w)
+        ys = range(h - 1, -1, -1) if dy > 0 else range(h)
+        for yy in ys:
+            for xx in xs:
+                sx = xx - dx
+                sy = yy - dy
+                if(0 <= sx < w and 0 <= sy < h):
+                    self.pixel(xx, yy, self.pixel(sx, sy))
+
+
+def install():
+    if('micropython' not in sys.modules):
+        sys.modules['micropython'] = _module('micropython', const = lambda x: x, native = _passthrough, viper = _passthrough,
+            alloc_emergency_exception_buf = lambda n: None, schedule = lambda f, arg: f(arg))
+    if('utime' not in sys.modules):
+        sys.modules['utime'] = _module('utime', ticks_us = _ticks_us, ticks_ms = _ticks_ms, ticks_cpu = _ticks_us,
+            ticks_diff = _ticks_diff, ticks_add = _ticks_add, sleep_ms = _sleep_ms, sleep_us = _sleep_us,
+            sleep = time.sleep, time = time.time)
+    for k in ('ticks_us', 'ticks_ms', 'ticks_cpu', 'ticks_diff', 'ticks_add', 'sleep_ms', 'sleep_us'): #micropython's time has these too
+        if(not hasattr(time, k)):
+            setattr(time, k, getattr(sys.modules['utime'], k))
+    if('framebuf' not in sys.modules):
+        sys.modules['framebuf'] = _module('framebuf', FrameBuffer = _framebuffer, MONO_VLSB = MONO_VLSB, MONO_HLSB = MONO_HLSB)
+    if('machine' not in sys.modules): #buses with nothing attached, benchmarks hand the drivers their own fakes
+        import fakes
+        class I2C(fakes.i2cbus):
+            def __init__(self, id = 0, scl = None, sda = None, freq = 400000, **kwargs):
+                fakes.i2cbus.__init__(self, freq)
+        sys.modules['machine'] = _module('machine', Pin = fakes.pin, I2C = I2C, SPI = fakes.spibus,
+            freq = lambda *args: 125000000, idle = lambda: None, disable_irq = lambda: 0, enable_irq = lambda state: None)
@@ -0,0 +1,144 @@
+#every driver in software/libraries on the simulated board (sim.py): simulated bus time, wall time and heap per operation,
+#one line each, so a change to a driver can be measured before and after
+#    python3 bench/run_all.py                    print the table
+#    python3 bench/run_all.py --save before.json  ...and keep the numbers
+#    python3 bench/run_all.py --compare before.json  ...and show the change from a saved run
+#bus time comes from the bus models (400 kHz I2C, the SD card at 20 MHz SPI plus its busy time), so it is the same on any PC;
+#wall time is CPython's and only means something next to another run on the same machine. Operations marked * include
+#the simulated chip's own work (e.g. an MPU6050 filling its FIFO) in their wall time
+import sys
+import json
+import benchutil
+from benchutil import allocs, ticks_us, ticks_diff
+import sim
+import board
+import ADC
+import GPIO
+import glyphs
+import gyro
+import hall_speed
+import oversample
+
+results = {}
+
+def measure(name, fn, n = 100):
+    s.reset_counters()
+    t = ticks_us()
+    for i in range(n):
+        fn()
+    wall = ticks_diff(ticks_us(), t) / n
+    bus = s.bus_us() / n
+    heap = allocs(fn, n)
+    results[name] = (bus, wall, heap)
+
+s = sim.setup()
+
+#ADC.py
+adc = board.adc()
+out = bytearray(8)
+measure('ADC read_channel_se', lambda: adc.read_channel_se(3))
+measure('ADC read_channel_diff', lambda: adc.read_channel_diff(0))
+measure('ADC scan, 8 channels', lambda: adc.scan(ADC.ALL_SE, out))
+burst = bytearray(16)
+measure('ADC read_burst, 16 conversions', lambda: adc.read_burst(ADC.cmd_se(3), burst))
+
+#oversample.py
+power = oversample.oversampler(adc, ADC.ALL_SE[0:4], 2)
+measure('oversampler read, 4 channels x 16', power.read)
+
+#thermistor.py
+therms = board.thermistors()
+measure('thermistor bank read, 4 channels', therms.read)
+
+#gyro.py
+imu = board.imu()
+measure('gyro accel read', imu.read)
+measure('gyro get_values (dict)', imu.get_values)
+f = gyro.fifo(imu, 1000)
+def drain():
+    s.imu.advance(20000)
+    f.drain()
+measure('gyro fifo drain, 20 samples *', drain)
+
+#GPIO.py
+io = board.ioex()
+io.display_setup()
+k = [0]
+def toggle():
+    k[0] ^= 1
+    io.pin(8, k[0])
+measure('GPIO display_read', io.display_read)
+measure('GPIO pin, toggling', toggle)
+measure('GPIO pair_write', lambda: io.pair_write(GPIO.OUTPUT0, 0x5AA5))
+
+#OLED.py and glyphs.py
+d = board.display(0)
+d.show()
+measure('OLED show, whole frame', lambda: d.show(True), 10)
+def reading():
+    k[0] += 1
+    d.fill_rect(64, 0, 64, 8, 0)
+    d.text('%d' % (k[0] % 1000), 64, 0)
+    d.show()
+measure('OLED text and show, one reading', reading, 20)
+def chunk():
+    if(not d.step()):
+        d.fill(k[0] & 1)
+        k[0] += 1
+        d.begin()
+d.begin()
+measure('OLED step, one chunk', chunk)
+g = glyphs.atlas()
+screen = glyphs.layout(d)
+screen.add('speed', glyphs.field(g, 0, 16, 4, '%.1f'))
+def dashboard():
+    k[0] += 1
+    screen.set('speed', 20 + (k[0] // 3 % 50) * 0.1)
+    d.show()
+measure('glyphs layout set and show', dashboard, 30)
+
+#hall_speed.py
+wheel = board.wheel()
+t = [0]
+def edge():
+    t[0] += 70000
+    wheel.edge(t[0])
+measure('hall_speed edge', edge, 1000)
+measure('hall_speed get_speed', lambda: wheel.get_speed(t[0]), 1000)
+
+#sdcard.py, at the rate sdclock would settle on for this card
+sd = board.sd()
+sd.init_spi(20000000)
+block = bytearray(512)
+blocks = bytearray(4096)
+b = [100]
+def write1():
+    b[0] += 1
+    sd.writeblocks(b[0], block)
+def write8():
+    b[0] += 8
+    sd.writeblocks(b[0], blocks)
+measure('sdcard writeblocks, 1 block', write1, 20)
+measure('sdcard writeblocks, 8 blocks', write8, 20)
+measure('sdcard readblocks, 1 block', lambda: sd.readblocks(100, block), 20)
+
+def load(path):
+    f = open(path)
+    ret = json.load(f)
+    f.close()
+    return(ret)
+
+before = None
+if('--compare' in sys.argv):
+    before = load(sys.argv[sys.argv.index('--compare') + 1])
+print('{:<36}{:>11}{:>11}{:>11}'.format('operation', 'bus us', 'wall us', 'heap B'))
+for name in results:
+    bus, wall, heap = results[name]
+    print('{:<36}{:>11.1f}{:>11.1f}{:>11.1f}'.format(name, bus, wall, heap))
+    if(before and name in before):
+        old = before[name]
+        print('{:<36}{:>+11.1f}{:>+11.1f}{:>+11.1f}'.format('    change', bus - old[0], wall - old[1], heap - old[2]))
+if('--save' in sys.argv):
+    f = open(sys.argv[sys.argv.index('--save') + 1], 'w')
+    json.dump(results, f)
+    f.close()
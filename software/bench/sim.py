@@ -0,0 +1,42 @@
+#the whole telemetry board simulated on the PC: board.py's buses are the fakes from fakes.py with the chips attached at
+#their real addresses, so board.adc(), board.imu(), board.display(), board.sd() and the rest work as they do on the pico
+#    import benchutil, sim
+#    b = sim.setup()
+#    board.adc().read_channel_se(3)
+#    b.bus_us() #simulated time on the buses so far
+#I2C0: ADS7830 (fakes.ads7830) and MPU6050 (fakes.mpu6050). I2C1: PCA9555 (fakes.pca9555) and two SSD1306 (fakes.ssd1306)
+#SPI1: the SD card (fakes.sdcard), with cs on SD_CS. The hall sensors are plain fakes.pin objects, fire() them for an edge
+import benchutil
+import board
+import fakes
+
+
+class board_sim():
+    def __init__(self, adc_levels = None, imu_signal = None, card_blocks = 4096, **card_args):
+        board.reset()
+        self.i2c0 = board.i2c(0)
+        self.i2c1 = board.i2c(1)
+        self.spi = board.spi(1)
+        self.spi.init(baudrate = 1000000) #the SD card starts slow, sdcard.SDCard sets its own rate
+        self.adc = self.i2c0.attach(board.ADC_ADDR, fakes.ads7830(adc_levels))
+        self.imu = self.i2c0.attach(board.IMU_ADDR, fakes.mpu6050(imu_signal))
+        self.ioex = self.i2c1.attach(board.IOEX_ADDR, fakes.pca9555())
+        self.displays = [self.i2c1.attach(a, fakes.ssd1306()) for a in board.DISPLAY_ADDR]
+        self.cs = fakes.pin(board.SD_CS, value = 1)
+        self.card = self.spi.attach(fakes.sdcard(card_blocks, **card_args), self.cs)
+        import sdcard
+        board.device('sd', lambda: sdcard.SDCard(self.spi, self.cs)) #board.sd() would make its own cs pin
+
+    def buses(self):
+        return((self.i2c0, self.i2c1, self.spi))
+
+    def reset_counters(self):
+        for b in self.buses():
+            b.reset_counters()
+
+    def bus_us(self): #simulated time spent on all the buses since the last reset_counters()
+        return(sum([b.bus_us for b in self.buses()]))
+
+
+def setup(**kwargs): #a fresh simulated board, see board_sim
+    return(board_sim(**kwargs))
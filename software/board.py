@@ -0,0 +1,79 @@
+import machine
+
+#the buses and devices on the telemetry board, each created once on first use and shared from then on
+#drivers used to build their own machine.I2C at import time (and one more per thermistor), now everything asks here:
+#    import board
+#    adc = board.adc()
+#nothing touches the hardware until something is asked for, so importing this (or any driver) costs nothing at boot
+
+#pins and settings, same as the Arduino firmware (main.ino)
+I2C_PINS = {0: (16, 17), 1: (14, 15)} #bus: (sda, scl). I2C0 is the on-board ADC and IMU, I2C1 the display header
+I2C_FREQ = 400000
+SPI_PINS = {1: (10, 11, 12)} #bus: (sck, mosi, miso)
+SPI_BAUD = 40000000
+SD_CS = 13
+
+ADC_ADDR = 0x48
+IMU_ADDR = 0x68
+IOEX_ADDR = 0x20
+DISPLAY_ADDR = (0x3C, 0x3D) #left, right
+
+_buses = {}
+_devices = {}
+
+
+def i2c(n = 0):
+    key = ('i2c', n)
+    if(key not in _buses):
+        sda, scl = I2C_PINS[n]
+        _buses[key] = machine.I2C(n, sda=machine.Pin(sda), scl=machine.Pin(scl), freq=I2C_FREQ)
+    return(_buses[key])
+
+def spi(n = 1):
+    key = ('spi', n)
+    if(key not in _buses):
+        sck, mosi, miso = SPI_PINS[n]
+        _buses[key] = machine.SPI(n, baudrate=SPI_BAUD, sck=machine.Pin(sck), mosi=machine.Pin(mosi), miso=machine.Pin(miso))
+    return(_buses[key])
+
+#returns the shared device called name, making it with make() the first time
+def device(name, make):
+    if(name not in _devices):
+        _devices[name] = make()
+    return(_devices[name])
+
+def adc():
+    import ADC
+    return(device('adc', lambda: ADC.ADS7830(i2c(0), ADC_ADDR)))
+
+def imu():
+    import gyro
+    return(device('imu', lambda: gyro.accel(i2c(0), IMU_ADDR)))
+
+def ioex():
+    import GPIO
+    return(device('ioex', lambda: GPIO.PCA9555(i2c(1), IOEX_ADDR)))
+
+def display(n = 0): #0 is the left display, 1 the right
+    import OLED
+    return(device('display%d' % n, lambda: OLED.SSD1306_I2C(128, 64, i2c(1), DISPLAY_ADDR[n])))
+
+def thermistors():
+    import thermistor
+    return(device('thermistors', lambda: thermistor.bank(adc())))
+
+def wheel(): #hall sensor SPD_0
+    import hall_speed
+    return(device('wheel', lambda: hall_speed.hall(hall_speed.SPD_0, magnets=1)))
+
+def motor(): #hall sensor SPD_1
+    import hall_speed
+    return(device('motor', lambda: hall_speed.hall(hall_speed.SPD_1, magnets=4)))
+
+def sd():
+    import sdcard
+    return(device('sd', lambda: sdcard.SDCard(spi(1), machine.Pin(SD_CS))))
+
+def reset(): #forget everything, the next request builds it again (e.g. after swapping a fake bus in for testing)
+    _buses.clear()
+    _devices.clear()
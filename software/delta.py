@@ -0,0 +1,226 @@
+import struct
+import binascii
+import array
+import frame
+
+#delta compressed log blocks, for the slowly varying channels that take up most of a frame for nothing
+#the rows are the same scaled integers as frame.py (frame.FIELDS, frame.SCALES), but each row after the first is stored
+#as the change from the row before: a row is the tick delta as a varint, a 16 bit mask of the channels that changed and
+#a zigzag varint for each of those, so a temperature that didn't move costs nothing and one that moved a count costs a byte
+#rows go out in blocks (one per CSV.write()), each with a header and a CRC32 so damage is confined to a block:
+#  magic 'GD', flags, sequence number of the first row, number of rows, body length, body, CRC32 of everything before it
+#a keyframe block (flags & KEY) starts with the full values: the tick as 4 bytes and each channel as a zigzag varint.
+#the other blocks carry on from the last row of the block before, so a keyframe goes out every keyframe_every rows and
+#a damaged block only loses the rows up to the next one. The encoder runs on the pico, the decoder below on a PC
+
+MAGIC = b'GD'
+HEADER = '<2sBHBH' #magic, flags, sequence, rows, body length
+HEADER_SIZE = struct.calcsize(HEADER)
+KEY = 0x01
+CHANNELS = len(frame.FIELDS)
+ROW_MAX = 5 + 2 + 3 * CHANNELS #largest delta row: tick varint, mask, a 3 byte varint per channel (a keyframe row is smaller)
+
+
+def _put_varint(buf, n, v): #v >= 0, returns the new end
+    while(v >= 0x80):
+        buf[n] = (v & 0x7F) | 0x80
+        v >>= 7
+        n += 1
+    buf[n] = v
+    return(n + 1)
+
+def _zigzag(v): #small magnitudes either side of 0 to small non-negative numbers
+    return(v << 1 if v >= 0 else (-v << 1) - 1)
+
+
+class encoder():
+    def __init__(self, block_rows = 32, keyframe_every = 100, seq = 0):
+        if(block_rows > 255):
+            raise ValueError('at most 255 rows per block')
+        self.block_rows = block_rows
+        self.keyframe_every = keyframe_every
+        self.seq = seq #sequence number of the next row
+        self.buf = bytearray(HEADER_SIZE + block_rows * ROW_MAX + 4)
+        self.mv = memoryview(self.buf)
+        self.prev = array.array('l', [0] * CHANNELS) #the last row's values
+        self.tick = 0
+        self.since_key = -1 #rows since the last keyframe, -1 before the first
+        self.rows = 0 #rows in the block being built
+        self.n = HEADER_SIZE
+        self.flags = 0
+
+    #add one row (the 15 channels then the tick from row[base], like frame.pack_into) to the block, returns the finished
+    #block as a memoryview once it holds block_rows rows, None until then. The block is only valid until the next add()
+    #tick, if given, is used in place of row[base + 15] as in frame.pack_into()
+    def add(self, row, base = 0, tick = None):
+        buf = self.buf
+        n = self.n
+        if(tick is None):
+            tick = row[base + CHANNELS]
+        tick = int(tick) & 0xFFFFFFFF
+        prev = self.prev
+        fix = frame._fix
+        if(self.rows == 0 and (self.since_key < 0 or self.since_key >= self.keyframe_every)):
+            self.flags = KEY
+            self.since_key = 0
+            struct.pack_into('<I', buf, n, tick)
+            n += 4
+            for i in range(CHANNELS):
+                v = fix(row[base + i], i)
+                n = _put_varint(buf, n, _zigzag(v))
+                prev[i] = v
+        else:
+            n = _put_varint(buf, n, (tick - self.tick) & 0xFFFFFFFF)
+            m = n
+            n += 2
+            mask = 0
+            for i in range(CHANNELS):
+                v = fix(row[base + i], i)
+                d = v - prev[i]
+                if(d):
+                    mask |= 1 << i
+                    n = _put_varint(buf, n, _zigzag(d))
+                    prev[i] = v
+            buf[m] = mask & 0xFF
+            buf[m + 1] = mask >> 8
+        self.tick = tick
+        self.n = n
+        self.rows += 1
+        self.since_key += 1
+        if(self.rows == self.block_rows):
+            return(self.finish())
+        return(None)
+
+    def finish(self): #close the block early, returns it (empty if there were no rows)
+        if(self.rows == 0):
+            return(self.mv[0:0])
+        n = self.n
+        struct.pack_into(HEADER, self.buf, 0, MAGIC, self.flags, self.seq & 0xFFFF, self.rows, n - HEADER_SIZE)
+        struct.pack_into('<I', self.buf, n, binascii.crc32(self.mv[0:n]))
+        self.seq += self.rows
+        self.rows = 0
+        self.flags = 0
+        self.n = HEADER_SIZE
+        return(self.mv[0:n + 4])
+
+
+#---decoding, meant for CPython---
+
+def _varints(data, i, count, out): #reads count varints from data[i:] into out (a list), returns the new i
+    for k in range(count):
+        v = 0
+        shift = 0
+        while(True):
+            b = data[i]
+            i += 1
+            v |= (b & 0x7F) << shift
+            if(b < 0x80):
+                break
+            shift += 7
+        out.append(v)
+    return(i)
+
+def _unzigzag(v):
+    return(v >> 1 if not v & 1 else -((v + 1) >> 1))
+
+#yields (offset, flags, seq, rows, body) for each block in data whose CRC checks out, skipping over anything damaged
+def blocks(data, stats = None):
+    data = bytes(data)
+    mv = memoryview(data)
+    n = len(data)
+    i = 0
+    bad = 0
+    while(i + HEADER_SIZE + 4 <= n):
+        if(mv[i:i + 2] == MAGIC):
+            magic, flags, seq, rows, length = struct.unpack_from(HEADER, data, i)
+            end = i + HEADER_SIZE + length
+            if(end + 4 <= n and binascii.crc32(mv[i:end]) == struct.unpack_from('<I', data, end)[0]):
+                yield (i, flags, seq, rows, mv[i + HEADER_SIZE:end])
+                i = end + 4
+                continue
+        bad += 1
+        i = data.find(MAGIC, i + 1)
+        if(i < 0):
+            break
+    if(stats is not None):
+        stats['bad'] = bad
+
+#the rows of every block in data as (seq, key, [tick, channels...]) where key rows hold full values and the rest hold the
+#change from the row before. Blocks that don't follow on from the one before (a damaged or missing block in between) are
+#skipped up to the next keyframe, and counted in stats['orphans']; stats['missing'] counts the rows lost either way
+def _parse(data, stats = None):
+    ret = []
+    chained = False
+    expect = None #sequence number the next block should start at
+    orphans = 0
+    missing = 0
+    for offset, flags, seq, count, body in blocks(data, stats):
+        if(not flags & KEY and (not chained or seq != expect)):
+            orphans += 1
+            chained = False
+            continue
+        if(expect is not None):
+            missing += (seq - expect) & 0xFFFF
+        body = bytes(body)
+        i = 0
+        for r in range(count):
+            if(r == 0 and flags & KEY):
+                vals = []
+                i = _varints(body, 4, CHANNELS, vals)
+                ret.append(((seq + r) & 0xFFFF, True, [struct.unpack_from('<I', body, 0)[0]] + [_unzigzag(v) for v in vals]))
+                continue
+            d = []
+            i = _varints(body, i, 1, d)
+            mask = body[i] | body[i + 1] << 8
+            i += 2
+            changed = []
+            i = _varints(body, i, bin(mask).count('1'), changed)
+            row = [d[0]] + [0] * CHANNELS
+            k = 0
+            for c in range(CHANNELS):
+                if(mask >> c & 1):
+                    row[1 + c] = _unzigzag(changed[k])
+                    k += 1
+            ret.append(((seq + r) & 0xFFFF, False, row))
+        chained = True
+        expect = (seq + count) & 0xFFFF
+    if(stats is not None):
+        stats['orphans'] = orphans
+        stats['missing'] = missing
+    return(ret)
+
+def rows(data, stats = None): #every row in data as a list [seq, tick, channel values as stored]
+    ret = []
+    cur = None
+    for seq, key, row in _parse(data, stats):
+        if(key):
+            cur = row
+        else:
+            cur = [(cur[0] + row[0]) & 0xFFFFFFFF] + [cur[c] + row[c] for c in range(1, 1 + CHANNELS)]
+        ret.append([seq] + cur)
+    return(ret)
+
+def decode(data, stats = None): #same as frame.decode(): a list of (seq, tick, channels...) with channels in their real units
+    return([tuple(r[0:2] + [r[2 + i] / frame.SCALES[i] for i in range(CHANNELS)]) for r in rows(data, stats)])
+
+def to_csv(data, out, stats = None): #same columns as frame.to_csv()
+    out.write(','.join(frame.FIELDS) + ',timestamp,seq\n')
+    for row in decode(data, stats):
+        out.write(','.join(['%g' % v for v in row[2:]]) + ',%d,%d\n' % (row[1], row[0]))
+
+def to_numpy(data, stats = None):
+    #like frame.to_numpy(), a dict of arrays: 'seq', 'tick' and one float array per channel
+    #the deltas are summed in bulk: a running total over the whole log, less the total just before each row's keyframe
+    import numpy
+    parsed = _parse(data, stats)
+    d = numpy.array([r[2] for r in parsed], dtype = numpy.int64).reshape(-1, 1 + CHANNELS)
+    key = numpy.array([r[1] for r in parsed], dtype = bool)
+    total = numpy.cumsum(d, axis = 0)
+    starts = numpy.flatnonzero(key)
+    before = numpy.zeros((len(starts), 1 + CHANNELS), dtype = numpy.int64)
+    before[1:] = total[starts[1:] - 1]
+    vals = total - before[numpy.cumsum(key) - 1]
+    ret = {'seq': numpy.array([r[0] for r in parsed], dtype = numpy.int64), 'tick': vals[:, 0] & 0xFFFFFFFF}
+    for i in range(CHANNELS):
+        ret[frame.FIELDS[i]] = vals[:, 1 + i] / frame.SCALES[i]
+    return(ret)
@@ -0,0 +1,130 @@
+import array
+import _thread
+from utime import ticks_ms, ticks_diff, ticks_add, sleep_ms
+
+#sensor acquisition on the pico's second core, so SD card and display transfers on the first can't hold up a reading
+#core 1 runs core1's loop, which calls sample(slot) every period_ms to fill in one fixed size record in place, and the
+#record is handed over through a ring; core 0 takes records out whenever it gets round to it.
+#the ring has one producer (core 1) and one consumer (core 0) and no lock: each index is written by one side only and
+#only after the record it covers is complete, so neither side ever waits on the other. A record that finds the ring full
+#is dropped and counted. Nothing in reserve()/publish() or peek()/release() allocates.
+#the indices live in one element arrays rather than attributes, a store into an array can't move anything the other
+#core might be reading at the same moment (an attribute store can, if it grows the object's attribute table).
+#devices used on core 1 must only be used there: their buses aren't shared safely between cores, and an IRQ handler
+#runs on the core that set it up, so make the hall sensors in setup (see main.py)
+#under CPython _thread is an ordinary thread, which is how the benchmarks test it
+
+
+class ring():
+    def __init__(self, size, slots = 64):
+        self.size = size #bytes per record
+        self.slots = slots #holds slots - 1 records, one slot is kept empty to tell full from empty
+        self.buf = bytearray(size * slots)
+        mv = memoryview(self.buf)
+        self.views = [mv[i * size:(i + 1) * size] for i in range(slots)]
+        self.head = array.array('L', [0]) #next slot to fill, written by the producer only
+        self.tail = array.array('L', [0]) #next slot to read, written by the consumer only
+        self.stats = array.array('L', [0, 0]) #records published, records dropped (producer only)
+        self.taken = array.array('L', [0]) #records read (consumer only)
+
+    def __len__(self): #records waiting, either side can ask
+        n = self.head[0] - self.tail[0]
+        return(n + self.slots if n < 0 else n)
+
+    def dropped(self):
+        return(self.stats[1])
+
+    #producer
+    def reserve(self): #the slot for the next record as a memoryview, None (and a drop) if the ring is full
+        h = self.head[0] + 1
+        if(h == self.slots):
+            h = 0
+        if(h == self.tail[0]):
+            self.stats[1] += 1
+            return(None)
+        return(self.views[self.head[0]])
+
+    def publish(self): #hand the reserved record over
+        h = self.head[0] + 1
+        if(h == self.slots):
+            h = 0
+        self.stats[0] += 1
+        self.head[0] = h
+
+    def put(self, data): #copy a record in, False if it was dropped
+        v = self.reserve()
+        if(v is None):
+            return(False)
+        v[:] = data
+        self.publish()
+        return(True)
+
+    #consumer
+    def peek(self): #the oldest record as a memoryview, None if there isn't one
+        t = self.tail[0]
+        if(t == self.head[0]):
+            return(None)
+        return(self.views[t])
+
+    def release(self): #done with the record from peek()
+        t = self.tail[0] + 1
+        if(t == self.slots):
+            t = 0
+        self.taken[0] += 1
+        self.tail[0] = t
+
+    def drain_into(self, buf, offset = 0): #copy whole records into buf from offset while they fit, returns the new end
+        size = self.size
+        while(offset + size <= len(buf)):
+            v = self.peek()
+            if(v is None):
+                break
+            buf[offset:offset + size] = v
+            self.release()
+            offset += size
+        return(offset)
+
+
+class core1():
+    def __init__(self, ring, sample, period_ms = 100, setup = None):
+        self.ring = ring
+        self.sample = sample #sample(slot) fills in a record, called on core 1
+        self.setup = setup #called once on core 1 before the first sample, e.g. to make the hall sensors there
+        self.period = period_ms
+        self.state = array.array('B', [0, 0]) #running (set by core 0), finished (set by core 1)
+        self.late = 0 #periods core 1 started behind, written on core 1 only
+        self.runs = 0
+
+    def start(self):
+        self.state[0] = 1
+        self.state[1] = 0
+        _thread.start_new_thread(self._loop, ())
+
+    def stop(self, timeout_ms = 1000): #ask core 1 to finish and wait for it, True if it did
+        self.state[0] = 0
+        t = ticks_ms()
+        while(not self.state[1]):
+            if(ticks_diff(ticks_ms(), t) > timeout_ms):
+                return(False)
+            sleep_ms(1)
+        return(True)
+
+    def _loop(self):
+        if(self.setup is not None):
+            self.setup()
+        slot = ticks_ms()
+        while(self.state[0]):
+            v = self.ring.reserve()
+            if(v is not None):
+                self.sample(v)
+                self.ring.publish()
+            self.runs += 1
+            slot = ticks_add(slot, self.period)
+            wait = ticks_diff(slot, ticks_ms())
+            if(wait > 0):
+                sleep_ms(wait)
+            else:
+                self.late += 1
+                if(wait < -self.period): #a whole period behind, start again from now instead of catching up
+                    slot = ticks_ms()
+        self.state[1] = 1
@@ -0,0 +1,129 @@
+import struct
+import binascii
+
+#compact fixed-width binary log records, one frame per row of sensor data
+#a frame is 42 bytes against ~120 for the same row as CSV text:
+#  magic 'GP', sequence number, tick (ms), the 15 channels as scaled 16-bit integers, CRC32 of everything before it
+#the sequence number wraps at 65536 and lets the decoder count frames that went missing
+#the logger packs frames on the pico (pack_into(), or CSV with fmt = 'frame'), the decoder below runs on a PC
+
+MAGIC = b'GP'
+
+#channel names (same order and names as the columns of the Arduino logger) and the factor each one is stored multiplied by
+FIELDS = ('speed', 'rpm', 'vBat0', 'vBat1', 'current', 'temp0', 'temp1', 'temp2', 'temp3',
+    'accX', 'accY', 'accZ', 'gyroX', 'gyroY', 'gyroZ')
+SCALES = (100, 1, 100, 100, 10, 10, 10, 10, 10, 1, 1, 1, 1, 1, 1) #accel/gyro are raw MPU6050 counts
+COLUMNS = len(FIELDS) + 1 #a logged row is the channels followed by the tick
+
+BODY = '<2sHIHHHHhhhhhhhhhhh' #magic, sequence, tick, speed, rpm, vBat0, vBat1 unsigned, the rest signed
+FORMAT = BODY + 'I'
+BODY_SIZE = struct.calcsize(BODY)
+SIZE = struct.calcsize(FORMAT)
+
+_LIMITS = ((0, 65535),) * 4 + ((-32768, 32767),) * 11
+
+
+#a nan (a sensor that gave no reading) is stored as the field's low limit, infinities as the limit on their side, so one
+#bad value can't stop the whole row being packed
+def _fix(v, i): #scale a channel value to its stored integer, clamped to the field's range
+    lo, hi = _LIMITS[i]
+    if(v != v): #nan
+        return(lo)
+    v = v * SCALES[i]
+    if(v <= lo):
+        return(lo)
+    if(v >= hi):
+        return(hi)
+    return(int(v + (0.5 if v >= 0 else -0.5)))
+
+#pack one row into buf at offset. row holds the 15 channels then the tick, starting at row[base]
+#(so a row can be packed straight out of a flat array like CSV's) and seq is the frame's sequence number
+#tick, if given, is used in place of row[base + 15], for rows whose tick is kept apart (CSV keeps its ticks in an integer
+#array, a float32 one would round them once past 2^24 ms)
+def pack_into(buf, offset, seq, row, base = 0, tick = None):
+    f = _fix
+    if(tick is None):
+        tick = row[base + 15]
+    struct.pack_into(BODY, buf, offset, MAGIC, seq & 0xFFFF, int(tick) & 0xFFFFFFFF,
+        f(row[base], 0), f(row[base + 1], 1), f(row[base + 2], 2), f(row[base + 3], 3), f(row[base + 4], 4),
+        f(row[base + 5], 5), f(row[base + 6], 6), f(row[base + 7], 7), f(row[base + 8], 8),
+        f(row[base + 9], 9), f(row[base + 10], 10), f(row[base + 11], 11),
+        f(row[base + 12], 12), f(row[base + 13], 13), f(row[base + 14], 14))
+    crc = binascii.crc32(memoryview(buf)[offset:offset + BODY_SIZE])
+    struct.pack_into('<I', buf, offset + BODY_SIZE, crc)
+    return(offset + SIZE)
+
+
+#packs rows into one reusable frame buffer and keeps the sequence count
+class encoder():
+    def __init__(self, seq = 0):
+        self.seq = seq
+        self.buf = bytearray(SIZE)
+
+    def pack(self, row, base = 0): #returns self.buf holding the frame, valid until the next call
+        pack_into(self.buf, 0, self.seq, row, base)
+        self.seq += 1
+        return(self.buf)
+
+
+#---decoding, meant for CPython---
+
+#yields (offset, frame) for each frame in data whose CRC checks out, skipping over anything damaged
+#stats, if given a dict, gets the number of bad stretches skipped and frames missing according to the sequence numbers
+def frames(data, stats = None):
+    if(not isinstance(data, (bytes, bytearray))):
+        data = bytes(data)
+    mv = memoryview(data)
+    n = len(data)
+    i = 0
+    bad = 0
+    missing = 0
+    last = -1
+    while(i + SIZE <= n):
+        if(mv[i:i + 2] == MAGIC and
+                binascii.crc32(mv[i:i + BODY_SIZE]) == struct.unpack_from('<I', data, i + BODY_SIZE)[0]):
+            seq = data[i + 2] | data[i + 3] << 8
+            if(last >= 0):
+                missing += (seq - last - 1) & 0xFFFF
+            last = seq
+            yield (i, mv[i:i + SIZE])
+            i += SIZE
+            continue
+        bad += 1 #resync on the next magic
+        i = data.find(MAGIC, i + 1)
+        if(i < 0):
+            break
+    if(stats is not None):
+        stats['bad'] = bad
+        stats['missing'] = missing
+
+def decode(data, stats = None): #returns a list of (seq, tick, channels...) tuples with channels in their real units
+    ret = []
+    for offset, f in frames(data, stats):
+        v = struct.unpack_from(FORMAT, f, 0)
+        row = [v[1], v[2]]
+        for i in range(len(FIELDS)):
+            row.append(v[3 + i] / SCALES[i])
+        ret.append(tuple(row))
+    return(ret)
+
+def to_csv(data, out, stats = None): #writes the frames to the text file out as CSV in the Arduino logger's column order
+    out.write(','.join(FIELDS) + ',timestamp,seq\n')
+    for row in decode(data, stats):
+        out.write(','.join(['%g' % v for v in row[2:]]) + ',%d,%d\n' % (row[1], row[0]))
+
+def to_numpy(data, stats = None):
+    #decodes every frame in one go, returns a dict of arrays: 'seq', 'tick' and one float array per channel
+    import numpy
+    dtype = numpy.dtype([('magic', 'S2'), ('seq', '<u2'), ('tick', '<u4')] +
+        [(FIELDS[i], '<u2' if i < 4 else '<i2') for i in range(len(FIELDS))] + [('crc', '<u4')])
+    data = bytes(data)
+    good = [o for o, f in frames(data, stats)]
+    if(len(good) * SIZE == len(data)): #no damage, the whole buffer is one array
+        raw = numpy.frombuffer(data, dtype)
+    else:
+        raw = numpy.frombuffer(b''.join([data[o:o + SIZE] for o in good]), dtype)
+    ret = {'seq': raw['seq'].astype(numpy.int64), 'tick': raw['tick'].astype(numpy.int64)}
+    for i in range(len(FIELDS)):
+        ret[FIELDS[i]] = raw[FIELDS[i]] / SCALES[i]
+    return(ret)
@@ -1,4 +1,3 @@
-import machine
 from utime import sleep_ms
 
 #Library for using a PCA7830 I2C ADC chip with a raspberry pi pico
@@ -7,6 +6,20 @@ from utime import sleep_ms
 #channel definitions, because the channel selection is coded to simplify the differentials
 channels = [0,4,1,5,2,6,3,7]
 
+#command byte bits
+SINGLE_ENDED = 0x80
+PD_ADC_ON = 0x04 #power down between conversions is off, internal reference off
+
+def cmd_se(channel): #command byte for a single-ended reading of a channel (0-7)
+    return(SINGLE_ENDED | (channels[channel]<<4) | PD_ADC_ON)
+
+def cmd_diff(pair): #command byte for a differential reading, pair n is channel n (+) against its neighbour (-), see read_channel_diff
+    return((channels[pair]<<4) | PD_ADC_ON)
+
+#command lists for scan()
+ALL_SE = bytes([cmd_se(i) for i in range(8)])
+ALL_DIFF = bytes([cmd_diff(i) for i in range(8)])
+
 
 class ADS7830():
     def __init__(self, i2c, address = 0x48):
@@ -17,14 +30,28 @@ class ADS7830():
         self.state = [0] * 16
         
     def read_channel_se(self, channel): # reads the value of a single channel relative to system ground
-        cmd = 128
-        cmd = cmd + (channels[channel]<<4)
-        cmd = cmd + 4
-        self.temp[0] = cmd
-        self.i2c.writeto(self.address, self.temp)
-        self.i2c.readfrom_into(self.address, self.temp_read)
+        #command byte and read go in one transaction (repeated start) instead of a separate write and read
+        self.i2c.readfrom_mem_into(self.address, cmd_se(channel), self.temp_read)
         return(self.temp_read[0])
     
+    #reads a list of channels into out in one pass, cmds is a bytes/bytearray of command bytes (see cmd_se, cmd_diff, ALL_SE)
+    #and out is any preallocated sequence of ints at least as long (bytearray, array, list), out[i] gets the reading for cmds[i].
+    #one bus transaction per channel and no allocations; a signed difference of any two entries is then just out[i] - out[j]
+    def scan(self, cmds, out):
+        i2c = self.i2c
+        address = self.address
+        t = self.temp_read
+        for i in range(len(cmds)):
+            i2c.readfrom_mem_into(address, cmds[i], t)
+            out[i] = t[0]
+        return(out)
+    
+    #fills buf with back to back conversions of one channel (cmd as for scan) in a single transaction: the chip starts a
+    #new conversion of the selected channel for every byte read, so a burst costs a byte of bus time per sample
+    def read_burst(self, cmd, buf):
+        self.i2c.readfrom_mem_into(self.address, cmd, buf)
+        return(buf)
+    
     def print_channels_se(self):
         for i in range(8):
             print(self.read_channel_se(i))
@@ -34,29 +61,19 @@ class ADS7830():
             print(self.read_channel_diff(i))
     
     def read_channel_diff(self, pair): #reads the differential value of two channels. The ADS7830 only allows differential readings on adjacent channels
-        cmd = 0
-        cmd = cmd + (channels[pair]<<4)
-        cmd = cmd + 4
-        self.temp[0] = cmd
-        self.i2c.writeto(self.address, self.temp)
-        self.i2c.readfrom_into(self.address, self.temp_read)
+        #N.B. the chip's differential input is unipolar, a negative difference reads as 0
+        self.i2c.readfrom_mem_into(self.address, cmd_diff(pair), self.temp_read)
         return(self.temp_read[0])
         
-    def read_channels_diff(self, ch0, ch1): #calculates a differential between an arbitrary pair of channels
-        read_channel_se(ch0)
-        x = self.temp_read[0]
-        read_channel_se(ch1)
-        y = self.temp_read[0]
-        self.temp_read[0] = y-x
-        return(self.temp_read[0])
+    def read_channels_diff(self, ch0, ch1): #calculates a signed differential (ch0 - ch1, -255 to 255) between an arbitrary pair of channels
+        x = self.read_channel_se(ch0)
+        y = self.read_channel_se(ch1)
+        return(x - y)
 
 #debug code
-sda=machine.Pin(16)
-scl=machine.Pin(17)
-i2c0=machine.I2C(0, sda=sda, scl=scl, freq=400000)
-vMonitor = ADS7830(i2c0)
-
 def debug(n=255):
+    import board
+    vMonitor = board.adc()
     for i in range(n):
         vMonitor.print_channels_se()
         print('')
@@ -23,59 +23,114 @@ CFG_INPUT   = const(0b11111111)
 CFG_OUTPUT  = const(0b00000000)
 
 
+#registers come in pairs (port 0, port 1) and the chip's register pointer flips between the two of a pair, so both ports
+#are read or written in one transaction; 16 bit values below are port 0 in the low byte and port 1 in the high byte.
+#the output and configuration registers are shadowed, changing one pin is a single 2 byte write of its port.
+#with int_pin given (the chip's open drain INT line), inputs are only read after the chip has flagged a change
+#read_inputs() reads both ports, display_read() only needs port 1 and reads just that one when there's no INT line
+
 class PCA9555():
-    def __init__(self, i2c, address = 0x20):
+    def __init__(self, i2c, address = 0x20, int_pin = None):
         self.i2c = i2c
         self.address = address
         self.temp = bytearray(2)
         self.temp_read = bytearray(1)
+        self.pair_buf = bytearray(3) #register, port 0, port 1
+        self.pair_in = bytearray(2)
         self.state = [0] * 16
+        self.out = 0xFFFF #shadows of the output and configuration registers, power on values
+        self.cfg = 0xFFFF
+        self.inputs = 0xFFFF #last value read from the inputs
+        self.buttons = [False, False]
+        self.changed = True #inputs need reading
+        self.int_pin = None
+        if(int_pin is not None):
+            self.use_interrupt(int_pin)
+        
+    def _shadow(self, register, value): #keep the shadows in step with a single register write
+        if(register == OUTPUT0 or register == OUTPUT1):
+            shift = (register - OUTPUT0) * 8
+            self.out = (self.out & ~(0xFF << shift)) | (value << shift)
+        elif(register == CFG0 or register == CFG1):
+            shift = (register - CFG0) * 8
+            self.cfg = (self.cfg & ~(0xFF << shift)) | (value << shift)
         
     def reg_write(self, register, value):
         self.temp[0] = register
         self.temp[1] = value
         self.i2c.writeto(self.address, self.temp)
+        self._shadow(register, value)
     
-    def reg_read(self, register):
+    def reg_read(self, register): #returns the register as an int
         self.i2c.readfrom_mem_into(self.address, register, self.temp_read)
-        return(bin(self.temp_read[0]))
+        return(self.temp_read[0])
     
-    def reg_bit(self, register, bit):
+    def reg_bit(self, register, bit): #returns one bit of a register, 0 or 1
         self.i2c.readfrom_mem_into(self.address, register, self.temp_read)
-        mask = 1 << bit
-        self.temp_read[0] = self.temp_read[0] & mask
-        return(bin(self.temp_read[0]))
+        return((self.temp_read[0] >> bit) & 1)
+    
+    def pair_write(self, register, value): #both registers of a pair in one transaction, register is the port 0 one
+        self.pair_buf[0] = register
+        self.pair_buf[1] = value & 0xFF
+        self.pair_buf[2] = (value >> 8) & 0xFF
+        self.i2c.writeto(self.address, self.pair_buf)
+        if(register == OUTPUT0):
+            self.out = value & 0xFFFF
+        elif(register == CFG0):
+            self.cfg = value & 0xFFFF
+    
+    def pair_read(self, register):
+        self.i2c.readfrom_mem_into(self.address, register, self.pair_in)
+        return(self.pair_in[0] | self.pair_in[1] << 8)
 
     def write_outputs(self, vals):
-        self.reg_write(OUTPUT0, vals[0])
-        self.reg_write(OUTPUT1, vals[1])
+        self.pair_write(OUTPUT0, vals[0] | vals[1] << 8)
+    
+    def pin(self, n, value): #set output n (0-15), only its port is written and only if it changes
+        v = self.out | (1 << n) if value else self.out & ~(1 << n)
+        if(v != self.out):
+            self.reg_write(OUTPUT0 + (n >> 3), (v >> (n & 8)) & 0xFF)
+    
+    def mode(self, n, is_input): #configure pin n as an input or an output
+        v = self.cfg | (1 << n) if is_input else self.cfg & ~(1 << n)
+        if(v != self.cfg):
+            self.reg_write(CFG0 + (n >> 3), (v >> (n & 8)) & 0xFF)
+    
+    def use_interrupt(self, int_pin): #inputs are only read again once INT has gone low
+        self.int_pin = machine.Pin(int_pin, machine.Pin.IN, machine.Pin.PULL_UP)
+        self.int_pin.irq(trigger=machine.Pin.IRQ_FALLING, handler=self._int, hard=True)
+        self.changed = True
+    
+    def _int(self, pin):
+        self.changed = True
+    
+    def read_inputs(self): #both input ports as a 16 bit int, from the last read if INT says nothing changed
+        if(self.int_pin is not None and not self.changed):
+            return(self.inputs)
+        self.changed = False
+        self.inputs = self.pair_read(INPUT0) #reading clears INT on the chip
+        if(self.int_pin is not None and self.int_pin.value() == 0): #changed again during the read
+            self.changed = True
+        return(self.inputs)
         
     def setup_inputs(self):
-        self.reg_write(CFG0, CFG_INPUT)
-        self.reg_write(CFG1, CFG_INPUT)
+        self.pair_write(CFG0, 0xFFFF)
         
     def setup_outputs(self):
-        self.reg_write(CFG0, CFG_OUTPUT)
-        self.reg_write(CFG1, CFG_OUTPUT)
+        self.pair_write(CFG0, 0x0000)
         
     def display_setup(self): #setup I/O configuration as used on the RICM greenpower display module
-        self.reg_write(CFG0, CFG_OUTPUT)
-        self.reg_write(CFG1, CFG_INPUT)
+        self.pair_write(CFG0, CFG_OUTPUT | CFG_INPUT << 8)
         
-    def display_read(self): #read display buttons
-        buttons = [False, False]
-        state = self.reg_read(INPUT1)
-        state = str(state)
-        buttons[0] = state[9] == '0'
-        buttons[1] = state[8] == '0'
-        return buttons;
+    def display_read(self): #read display buttons, returns self.buttons (left, right), True while pressed
+        #buttons pull port 1 pins 0 and 1 low. Without INT only port 1 is read, one byte, as port 0 is all outputs here
+        state = self.reg_read(INPUT1) if self.int_pin is None else self.read_inputs() >> 8
+        self.buttons[0] = not state & 0x01
+        self.buttons[1] = not state & 0x02
+        return self.buttons
             
     def all_high(self):
-        self.write_outputs([OUTPUT_HIGH, OUTPUT_HIGH])
+        self.pair_write(OUTPUT0, 0xFFFF)
         
     def all_low(self):
-        self.write_outputs([OUTPUT_LOW, OUTPUT_LOW])
-        
-    
-            
-            
+        self.pair_write(OUTPUT0, 0x0000)
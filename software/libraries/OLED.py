@@ -28,6 +28,14 @@ SET_CHARGE_PUMP = const(0x8D)
 
 # Subclassing FrameBuffer provides support for graphics primitives
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
+# The drawing methods below note the columns they touch in each page, and show() only sends those parts of the pages
+# that differ from what the display already holds (self.sent). Anything written straight into self.buffer has to be
+# passed to mark(), or sent with show(full=True)
+# For a display that must not hold up the sampling, begin() copies the frame into a second buffer (self.front) and step()
+# sends it a chunk of at most self.chunk bytes at a time, so every call has a fixed upper bound on its bus time; drawing
+# the next frame into self.buffer meanwhile can't tear the one being sent
+REGION_COST = 10 # bytes of addressing overhead per region, more than this per byte saved and a full refresh is cheaper
+
 class SSD1306(framebuf.FrameBuffer):
     def __init__(self, width, height, external_vcc):
         self.width = width
@@ -35,9 +43,119 @@ class SSD1306(framebuf.FrameBuffer):
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        self.mv = memoryview(self.buffer)
+        self.sent = bytearray(len(self.buffer)) # copy of the display's RAM
+        self.d0 = bytearray([255] * self.pages) # first and last dirty column of each page, clean when d0 > d1
+        self.d1 = bytearray(self.pages)
+        self.stale = True # display RAM unknown, the next show() sends everything
+        self.cmds = bytearray(6)
+        self.front = bytearray(len(self.buffer)) # frame being sent by step()
+        self.fmv = memoryview(self.front)
+        self.r0 = bytearray(self.pages) # its regions, same as d0/d1
+        self.r1 = bytearray(self.pages)
+        self.busy = False
+        self.fp = 0 # page and column step() is up to, column -1 before the page's window is set
+        self.fc = -1
+        self.chunk = 64 # bytes per step(), about 1.5 ms on a 400 kHz I2C bus
+        self.col_offset = 32 if width == 64 else 0 # displays with width of 64 pixels are shifted by 32
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
+    def mark(self, x, y, w, h): # note that a rectangle of the buffer has changed
+        x1 = x + w
+        y1 = y + h
+        if x < 0:
+            x = 0
+        if y < 0:
+            y = 0
+        if x1 > self.width:
+            x1 = self.width
+        if y1 > self.height:
+            y1 = self.height
+        if x >= x1 or y >= y1:
+            return
+        x1 -= 1
+        d0 = self.d0
+        d1 = self.d1
+        for p in range(y >> 3, ((y1 - 1) >> 3) + 1):
+            if x < d0[p]:
+                d0[p] = x
+            if x1 > d1[p]:
+                d1[p] = x1
+
+    def fill(self, c):
+        super().fill(c)
+        self.mark(0, 0, self.width, self.height)
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, c)
+        self.mark(x, y, 1, 1)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.mark(x, y, w, 1)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.mark(x, y, 1, h)
+
+    def line(self, x0, y0, x1, y1, c):
+        super().line(x0, y0, x1, y1, c)
+        self.mark(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            super().fill_rect(x, y, w, h, c)
+        else:
+            super().rect(x, y, w, h, c)
+        self.mark(x, y, w, h)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.mark(x, y, w, h)
+
+    def text(self, s, x, y, c=1):
+        super().text(s, x, y, c)
+        self.mark(x, y, 8 * len(s), 8)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None, w=None, h=None):
+        # w and h are the size of fbuf, a FrameBuffer can't tell us; without them everything right of and below x, y is marked
+        if palette is None:
+            super().blit(fbuf, x, y, key)
+        else:
+            super().blit(fbuf, x, y, key, palette)
+        self.mark(x, y, w if w is not None else self.width, h if h is not None else self.height)
+
+    def ellipse(self, x, y, xr, yr, c, f=False, m=0xF):
+        super().ellipse(x, y, xr, yr, c, f, m)
+        self.mark(x - xr, y - yr, 2 * xr + 1, 2 * yr + 1)
+
+    def poly(self, x, y, coords, c, f=False):
+        super().poly(x, y, coords, c, f)
+        # coords is x, y pairs relative to x, y: mark their bounding box
+        if len(coords) < 2:
+            return
+        x0 = x1 = coords[0]
+        y0 = y1 = coords[1]
+        for i in range(2, len(coords) - 1, 2):
+            px = coords[i]
+            py = coords[i + 1]
+            if px < x0:
+                x0 = px
+            if px > x1:
+                x1 = px
+            if py < y0:
+                y0 = py
+            if py > y1:
+                y1 = py
+        self.mark(x + x0, y + y0, x1 - x0 + 1, y1 - y0 + 1)
+
+    def scroll(self, dx, dy):
+        super().scroll(dx, dy)
+        self.mark(0, 0, self.width, self.height)
+
     def init_display(self):
         for cmd in (
             SET_DISP,  # display off
@@ -92,20 +210,139 @@ class SSD1306(framebuf.FrameBuffer):
         self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
         self.write_cmd(SET_SEG_REMAP | (rotate & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
-        if self.width == 64:
-            # displays with width of 64 pixels are shifted by 32
-            x0 += 32
-            x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
+    def window(self, x0, x1, p0, p1): # sets the columns and pages the following data fills
+        c = self.cmds
+        c[0] = SET_COL_ADDR
+        c[1] = x0 + self.col_offset
+        c[2] = x1 + self.col_offset
+        c[3] = SET_PAGE_ADDR
+        c[4] = p0
+        c[5] = p1
+        self.write_cmds(c)
+
+    def write_cmds(self, cmds):
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
+    def dirty(self): # trims each page's dirty range to the bytes that differ from the display, returns their total
+        b = self.buffer
+        s = self.sent
+        d0 = self.d0
+        d1 = self.d1
+        w = self.width
+        n = 0
+        for p in range(self.pages):
+            c0 = d0[p]
+            c1 = d1[p]
+            a = p * w
+            while c0 <= c1 and b[a + c0] == s[a + c0]:
+                c0 += 1
+            while c1 >= c0 and b[a + c1] == s[a + c1]:
+                c1 -= 1
+            if c0 > c1:
+                d0[p] = 255
+                d1[p] = 0
+                continue
+            d0[p] = c0
+            d1[p] = c1
+            n += c1 - c0 + 1 + REGION_COST
+        return n
+
+    def clean(self):
+        for p in range(self.pages):
+            self.d0[p] = 255
+            self.d1[p] = 0
+
+    def begin(self, full=False): # starts sending the changed parts of the current frame, False if one is still going
+        if self.busy:
+            return False
+        r0 = self.r0
+        r1 = self.r1
+        if full or self.stale or self.dirty() >= len(self.buffer):
+            for p in range(self.pages):
+                r0[p] = 0
+                r1[p] = self.width - 1
+            self.stale = False
+        else:
+            for p in range(self.pages):
+                r0[p] = self.d0[p]
+                r1[p] = self.d1[p]
+        self.clean()
+        self.front[:] = self.buffer
+        self.fp = 0
+        self.fc = -1
+        self.busy = True
+        return True
+
+    def step(self, limit=0): # sends up to limit (default self.chunk) bytes of the frame, True while there is more to send
+        if not self.busy:
+            return False
+        left = limit if limit else self.chunk
+        w = self.width
+        while self.fp < self.pages:
+            p = self.fp
+            c1 = self.r1[p]
+            if self.r0[p] > c1:
+                self.fp += 1
+                continue
+            if self.fc < 0:
+                self.fc = self.r0[p]
+                self.window(self.fc, c1, p, p)
+            if not left:
+                return True
+            e = c1 + 1
+            if e > self.fc + left:
+                e = self.fc + left
+            a = p * w + self.fc
+            b = p * w + e
+            self.write_data(self.fmv[a:b])
+            self.sent[a:b] = self.fmv[a:b]
+            left -= e - self.fc
+            if e > c1:
+                self.fp += 1
+                self.fc = -1
+            else:
+                self.fc = e
+        self.busy = False
+        return False
+
+    def chunks(self, limit=0): # step() as a generator, one chunk per next()
+        while self.step(limit):
+            yield
+
+    def finish(self): # sends whatever is left of the frame in flight
+        while self.step(len(self.buffer)):
+            pass
+
+    def show(self, full=False): # sends the changed parts of the buffer, returns the number of data bytes sent
+        if self.busy:
+            self.finish()
+        if not full and not self.stale and self.dirty() < len(self.buffer):
+            d0 = self.d0
+            d1 = self.d1
+            mv = self.mv
+            w = self.width
+            n = 0
+            for p in range(self.pages):
+                c0 = d0[p]
+                c1 = d1[p]
+                if c0 > c1:
+                    continue
+                a = p * w + c0
+                e = p * w + c1 + 1
+                self.window(c0, c1, p, p)
+                self.write_data(mv[a:e])
+                self.sent[a:e] = mv[a:e]
+                d0[p] = 255
+                d1[p] = 0
+                n += e - a
+            return n
+        self.window(0, self.width - 1, 0, self.pages - 1)
         self.write_data(self.buffer)
+        self.sent[:] = self.buffer
+        self.stale = False
+        self.clean()
+        return len(self.buffer)
 
 
 class SSD1306_I2C(SSD1306):
@@ -121,7 +358,13 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, cmds): # a run of commands in one transaction
+        self.write_list[0] = b"\x00"  # Co=0, D/C#=0
+        self.write_list[1] = cmds
+        self.i2c.writevto(self.addr, self.write_list)
+
     def write_data(self, buf):
+        self.write_list[0] = b"\x40"  # Co=0, D/C#=1
         self.write_list[1] = buf
         self.i2c.writevto(self.addr, self.write_list)
 
@@ -153,6 +396,14 @@ class SSD1306_SPI(SSD1306):
         self.spi.write(bytearray([cmd]))
         self.cs(1)
 
+    def write_cmds(self, cmds):
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cs(1)
+        self.dc(0)
+        self.cs(0)
+        self.spi.write(cmds)
+        self.cs(1)
+
     def write_data(self, buf):
         self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.cs(1)
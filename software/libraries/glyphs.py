@@ -0,0 +1,143 @@
+import framebuf
+
+#large characters for the dashboard displays, drawn once into an atlas and copied onto the screen from then on
+#each character of the built in 8x8 font is scaled up by scale into a cell of 8*scale by 8*scale pixels (MONO_VLSB, the
+#display's own layout), so showing a reading is a copy per character instead of drawing the font pixel by pixel.
+#the atlas can be saved to flash and loaded on the next boot instead of being built again
+#field and layout redraw only the characters of a reading that changed since it was last shown
+
+DIGITS = '0123456789.- '
+UNITS = 'CVAkmph%'
+
+
+class atlas():
+    def __init__(self, chars = DIGITS + UNITS, scale = 4, path = None):
+        self.chars = chars
+        self.scale = scale
+        self.w = 8 * scale #cell size in pixels
+        self.h = 8 * scale
+        self.pages = self.h // 8
+        self.size = self.w * self.pages #bytes per cell
+        self.data = bytearray(self.size * len(chars))
+        self.mv = memoryview(self.data)
+        if(path is None or not self.load(path)):
+            self.build()
+            if(path is not None):
+                self.save(path)
+        self.fbs = [framebuf.FrameBuffer(self.mv[i * self.size:(i + 1) * self.size], self.w, self.h, framebuf.MONO_VLSB)
+            for i in range(len(chars))] #for drawing at heights that aren't a multiple of 8
+
+    def build(self):
+        small = bytearray(8)
+        sfb = framebuf.FrameBuffer(small, 8, 8, framebuf.MONO_VLSB)
+        s = self.scale
+        for i in range(len(self.chars)):
+            sfb.fill(0)
+            sfb.text(self.chars[i], 0, 0, 1)
+            base = i * self.size
+            for col in range(8):
+                bits = small[col]
+                for row in range(8):
+                    if(bits >> row & 1):
+                        for y in range(row * s, row * s + s):
+                            o = base + (y >> 3) * self.w + col * s
+                            m = 1 << (y & 7)
+                            for x in range(s):
+                                self.data[o + x] |= m
+
+    def save(self, path):
+        f = open(path, 'wb')
+        f.write(self.data)
+        f.close()
+
+    def load(self, path): #True if path held an atlas of the right size
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return(False)
+        n = f.readinto(self.data)
+        f.close()
+        return(n == len(self.data))
+
+    def index(self, ch): #cell of ch, unknown characters show as a space (or the first cell)
+        i = self.chars.find(ch)
+        if(i < 0):
+            i = self.chars.find(' ')
+        return(i if i >= 0 else 0)
+
+    #draw one character at x, y on an OLED.SSD1306, background included so it replaces whatever was there
+    def char(self, d, ch, x, y):
+        i = self.index(ch)
+        if(y & 7 or y < 0 or x < 0): #not on a page boundary, let blit() do the bit shifting
+            d.blit(self.fbs[i], x, y, -1, None, self.w, self.h)
+            return
+        w = self.w
+        if(x + w > d.width):
+            w = d.width - x
+        if(w <= 0):
+            return
+        src = i * self.size
+        dst = (y >> 3) * d.width + x
+        for p in range(self.pages):
+            if(y + 8 * p >= d.height):
+                break
+            d.buffer[dst:dst + w] = self.mv[src:src + w] #a page of the cell is one run of bytes, same as the display's
+            src += self.w
+            dst += d.width
+        d.mark(x, y, w, self.h)
+
+    def text(self, d, s, x, y): #draw a string, returns the x after it
+        for ch in s:
+            self.char(d, ch, x, y)
+            x += self.w
+        return(x)
+
+
+#one reading on the display: fmt % value, right aligned in width characters at x, y
+class field():
+    def __init__(self, glyphs, x, y, width = 4, fmt = '%.1f'):
+        self.glyphs = glyphs
+        self.x = x
+        self.y = y
+        self.width = width
+        self.fmt = fmt
+        self.shown = None #text on the display, None until the first update
+
+    def update(self, d, value): #returns the number of characters redrawn
+        s = self.fmt % value
+        if(len(s) > self.width): #too wide, drop decimals first and show dashes if that's not enough
+            s = '%d' % value
+            if(len(s) > self.width):
+                s = '-' * self.width
+        s = ' ' * (self.width - len(s)) + s
+        if(s == self.shown):
+            return(0)
+        n = 0
+        g = self.glyphs
+        for i in range(self.width):
+            if(self.shown is None or s[i] != self.shown[i]):
+                g.char(d, s[i], self.x + i * g.w, self.y)
+                n += 1
+        self.shown = s
+        return(n)
+
+    def reset(self): #draw everything again on the next update, e.g. after the display was cleared
+        self.shown = None
+
+
+#a screen of named fields
+class layout():
+    def __init__(self, d):
+        self.d = d
+        self.fields = {}
+
+    def add(self, name, f):
+        self.fields[name] = f
+        return(f)
+
+    def set(self, name, value):
+        return(self.fields[name].update(self.d, value))
+
+    def reset(self):
+        for f in self.fields.values():
+            f.reset()
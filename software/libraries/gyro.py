@@ -1,14 +1,71 @@
 #downloaded from https://github.com/adamjezek98/MPU6050-ESP8266-MicroPython
 #and modified
-import machine
+import array
 from utime import sleep_ms
 
+#the fast path is read(): the 14 data bytes are read into a preallocated buffer and decoded into a reusable array,
+#so a sample costs one bus transaction and no allocations. get_values() is the old dict interface built on top of it
+
+#registers
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+FIFO_EN = 0x23
+INT_STATUS = 0x3A
+ACCEL_XOUT_H = 0x3B #first of the 14 data registers
+USER_CTRL = 0x6A
+PWR_MGMT_1 = 0x6B
+FIFO_COUNTH = 0x72
+FIFO_R_W = 0x74
+
+FIFO_SIZE = 1024 #bytes
+FIFO_OFLOW = 0x10 #INT_STATUS bit
+
+#positions in the array returned by read()
+AX = 0
+AY = 1
+AZ = 2
+TEMP = 3
+GX = 4
+GY = 5
+GZ = 6
+
+def temp_c(raw): #die temperature from its raw reading
+    return(raw / 340.00 + 36.53)
+
 
 class accel():
     def __init__(self, i2c, addr=0x68):
         self.iic = i2c
         self.addr = addr
-        self.iic.writeto(self.addr, bytearray([107, 0]))
+        self.buf = bytearray(14)
+        self.values = array.array('h', [0] * 7) #AcX, AcY, AcZ, Tmp, GyX, GyY, GyZ as raw signed counts
+        self.temp = bytearray(2)
+        self.reg_views = (None, memoryview(self.buf)[0:1], memoryview(self.buf)[0:2])
+        self.write_reg(PWR_MGMT_1, 0)
+
+    def write_reg(self, reg, value):
+        self.temp[0] = reg
+        self.temp[1] = value
+        self.iic.writeto(self.addr, self.temp)
+
+    def read_reg(self, reg, n = 1): #returns the register (or the pair from reg, n = 2, as one big endian number)
+        b = self.buf
+        self.iic.readfrom_mem_into(self.addr, reg, self.reg_views[n])
+        v = 0
+        for i in range(n):
+            v = v << 8 | b[i]
+        return(v)
+
+    def read(self): #returns self.values, updated in place
+        self.iic.readfrom_mem_into(self.addr, ACCEL_XOUT_H, self.buf)
+        b = self.buf
+        v = self.values
+        for i in range(7): #big endian pairs to signed ints
+            x = b[2 * i] << 8 | b[2 * i + 1]
+            if(x & 0x8000):
+                x -= 0x10000
+            v[i] = x
+        return(v)
 
     def get_raw_values(self):
         a = self.iic.readfrom_mem(self.addr, 0x3B, 14)
@@ -26,16 +83,16 @@ class accel():
             return firstbyte << 8 | secondbyte
         return - (((firstbyte ^ 255) << 8) | (secondbyte ^ 255) + 1)
 
-    def get_values(self):
-        raw_ints = self.get_raw_values()
+    def get_values(self): #same readings as read(), as a new dict
+        v = self.read()
         vals = {}
-        vals["AcX"] = self.bytes_toint(raw_ints[0], raw_ints[1])
-        vals["AcY"] = self.bytes_toint(raw_ints[2], raw_ints[3])
-        vals["AcZ"] = self.bytes_toint(raw_ints[4], raw_ints[5])
-        vals["Tmp"] = self.bytes_toint(raw_ints[6], raw_ints[7]) / 340.00 + 36.53
-        vals["GyX"] = self.bytes_toint(raw_ints[8], raw_ints[9])
-        vals["GyY"] = self.bytes_toint(raw_ints[10], raw_ints[11])
-        vals["GyZ"] = self.bytes_toint(raw_ints[12], raw_ints[13])
+        vals["AcX"] = v[AX]
+        vals["AcY"] = v[AY]
+        vals["AcZ"] = v[AZ]
+        vals["Tmp"] = temp_c(v[TEMP])
+        vals["GyX"] = v[GX]
+        vals["GyY"] = v[GY]
+        vals["GyZ"] = v[GZ]
         return vals  # returned in range of Int16
         # -32768 to 32767
 
@@ -45,13 +102,206 @@ class accel():
             print(self.get_values())
             sleep(0.05)
             
-#debug code
-sda=machine.Pin(16)
-scl=machine.Pin(17)
-i2c0=machine.I2C(0, sda=sda, scl=scl, freq=400000)
-accelerometer = accel(i2c0)
+#high rate sampling through the chip's 1 KB FIFO: the chip samples accel and gyro at rate Hz on its own and queues them,
+#drain() empties the FIFO in multi-sample bursts (call it more often than the FIFO fills, 85 ms at 1 kHz), keeps every
+#sample in a ring of the last ring_size samples and sums them, read() then hands back the mean of everything since the
+#last read() in the same layout as accel.read(), i.e. the high rate data decimated to the logging rate.
+#if an accelerometer axis goes past trigger counts (raw, 16384 = 1 g at the default range) the ring keeps filling for
+#post more samples and then freezes, so dump() returns the samples from before and after the event until rearm()
+#watch() sets limits on each axis: the first sample outside them cuts the mean short, the next read() returns the mean
+#of the samples before it (self.cut is True until then, its lows and highs take in the sample that cut it) and the one
+#after starts with it, so a row can end at a jolt
+class fifo():
+    SAMPLE = 12 #bytes per sample, accel xyz then gyro xyz
+
+    def __init__(self, imu, rate = 1000, ring_size = 1024, burst = 16, trigger = None, post = None):
+        self.imu = imu
+        self.rate = rate
+        self.burst = burst
+        self.buf = bytearray(burst * self.SAMPLE)
+        mv = memoryview(self.buf)
+        self.views = [mv[0:k * self.SAMPLE] for k in range(burst + 1)] #a view per burst length, made once
+        self.values = array.array('h', [0] * 7) #the mean since the last read(), TEMP stays 0
+        self.sums = [0] * 6
+        self.mins = [32767] * 6 #smallest and largest sample per axis since the last read()
+        self.maxs = [-32768] * 6
+        self.lows = array.array('h', [0] * 7) #the smallest and largest samples up to the last read(), same layout as values
+        self.highs = array.array('h', [0] * 7)
+        self.count = 0 #samples in sums
+        self.ring_size = ring_size
+        self.ring = array.array('h', [0] * (6 * ring_size))
+        self.head = 0 #next sample slot in the ring
+        self.samples = 0 #total samples drained
+        self.overflows = 0
+        self.trigger = trigger
+        self.post = post if post is not None else ring_size // 2
+        self.triggered = False
+        self.trigger_sample = 0 #value of self.samples at the trigger
+        self.frozen = False
+        self.watching = False
+        self.lo = [-32768] * 6 #watch() limits, per axis
+        self.hi = [32767] * 6
+        self.cut = False
+        self.setup()
+
+    def setup(self): #sample rate, low pass filter and FIFO contents, then reset and start the FIFO
+        imu = self.imu
+        imu.write_reg(CONFIG, 1) #DLPF 184 Hz, the gyro runs at 1 kHz
+        imu.write_reg(SMPLRT_DIV, max(0, min(255, 1000 // self.rate - 1)))
+        imu.write_reg(FIFO_EN, 0x78) #XG, YG, ZG and accel
+        imu.write_reg(USER_CTRL, 0x04) #FIFO reset
+        imu.write_reg(USER_CTRL, 0x40) #FIFO on
+        imu.read_reg(INT_STATUS) #clears a stale overflow
 
+    def drain(self): #empties the FIFO, returns the number of samples read
+        imu = self.imu
+        if(imu.read_reg(INT_STATUS) & FIFO_OFLOW): #samples were lost and the rest may be out of step, start over
+            self.overflows += 1
+            imu.write_reg(USER_CTRL, 0x44)
+            return(0)
+        n = imu.read_reg(FIFO_COUNTH, 2) // self.SAMPLE
+        left = n
+        while(left):
+            k = left if left < self.burst else self.burst
+            imu.iic.readfrom_mem_into(imu.addr, FIFO_R_W, self.views[k])
+            self._store(k)
+            left -= k
+        return(n)
+
+    def watch(self, lows = None, highs = None): #limits in read()'s layout, a sample outside them cuts the mean. None for off
+        self.watching = lows is not None
+        if(self.watching):
+            for i in range(6):
+                j = i if i < 3 else i + 1
+                self.lo[i] = lows[j]
+                self.hi[i] = highs[j]
+
+    def _store(self, k):
+        b = self.buf
+        s = self.sums
+        mn = self.mins
+        mx = self.maxs
+        ring = self.ring
+        watch = self.watching and not self.cut
+        for j in range(k):
+            o = j * self.SAMPLE
+            if(watch and self.count): #only while watching, it costs a second pass over the sample
+                lo = self.lo
+                hi = self.hi
+                for i in range(6):
+                    x = b[o + 2 * i] << 8 | b[o + 2 * i + 1]
+                    if(x & 0x8000):
+                        x -= 0x10000
+                    if(x < lo[i] or x > hi[i]): #the mean so far goes to the next read(), this sample starts a new one
+                        self._close()
+                        self._fold(o)
+                        self.cut = True
+                        watch = False
+                        break
+            r = self.head * 6
+            spike = False
+            for i in range(6):
+                x = b[o] << 8 | b[o + 1]
+                if(x & 0x8000):
+                    x -= 0x10000
+                o += 2
+                s[i] += x
+                if(x < mn[i]):
+                    mn[i] = x
+                if(x > mx[i]):
+                    mx[i] = x
+                if(not self.frozen):
+                    ring[r + i] = x
+                if(i < 3 and self.trigger is not None and (x > self.trigger or x < -self.trigger)):
+                    spike = True
+            self.samples += 1
+            self.count += 1
+            if(not self.frozen):
+                self.head += 1
+                if(self.head == self.ring_size):
+                    self.head = 0
+                if(spike and not self.triggered):
+                    self.triggered = True
+                    self.trigger_sample = self.samples - 1
+                if(self.triggered and self.samples - self.trigger_sample > self.post):
+                    self.frozen = True
+
+    #drains the FIFO and returns the mean since the last read() (accel.read() layout), self.values
+    #self.lows and self.highs get the smallest and largest sample on each axis over the same samples, for spotting a jolt
+    #the mean smooths over, whichever way it goes. After a cut (see watch()) it is the mean up to the cut
+    def read(self):
+        self.drain()
+        if(self.cut):
+            self.cut = False
+        else:
+            self._close()
+        return(self.values)
+
+    def _fold(self, o): #the sample at buf[o] into self.lows and self.highs, so the row it cut says what cut it
+        b = self.buf
+        for i in range(6):
+            x = b[o + 2 * i] << 8 | b[o + 2 * i + 1]
+            if(x & 0x8000):
+                x -= 0x10000
+            j = i if i < 3 else i + 1
+            if(x < self.lows[j]):
+                self.lows[j] = x
+            if(x > self.highs[j]):
+                self.highs[j] = x
+
+    def _close(self): #the samples so far become self.values, self.lows and self.highs, and the sums start again
+        v = self.values
+        if(self.count):
+            s = self.sums
+            c = self.count
+            v[AX] = s[0] // c
+            v[AY] = s[1] // c
+            v[AZ] = s[2] // c
+            v[GX] = s[3] // c
+            v[GY] = s[4] // c
+            v[GZ] = s[5] // c
+            lo = self.lows
+            hi = self.highs
+            mn = self.mins
+            mx = self.maxs
+            for i in range(6):
+                s[i] = 0
+                j = i if i < 3 else i + 1
+                lo[j] = mn[i]
+                hi[j] = mx[i]
+                mn[i] = 32767
+                mx[i] = -32768
+            self.count = 0
+
+    def set_rate(self, rate): #change the sample rate, the FIFO starts again empty (what was in it is read first)
+        if(rate != self.rate):
+            self.drain()
+            self.rate = rate
+            self.setup()
+
+    #the ring in time order as an array of ax, ay, az, gx, gy, gz per sample, and the trigger's index in it
+    #into is an array of 6 * ring_size int16 to fill instead of a new one, the samples are then a memoryview of it
+    def dump(self, into = None):
+        end = self.samples if not self.frozen else self.trigger_sample + self.post + 1 #one past the last sample in the ring
+        n = min(end, self.ring_size)
+        first = end - n
+        ret = into if into is not None else array.array('h', [0] * (6 * n))
+        out = memoryview(ret)
+        ring = memoryview(self.ring)
+        r = (self.head - n) % self.ring_size
+        k = min(n, self.ring_size - r) #samples up to the end of the ring, the rest wrapped round to the start
+        out[0:6 * k] = ring[6 * r:6 * (r + k)]
+        out[6 * k:6 * n] = ring[0:6 * (n - k)]
+        return(ret if into is None else out[0:6 * n], self.trigger_sample - first if self.triggered else -1)
+
+    def rearm(self):
+        self.triggered = False
+        self.frozen = False
+
+#debug code
 def debug(n=255):
+    import board
+    accelerometer = board.imu()
     for i in range(n):
         print(accelerometer.get_values())
         sleep_ms(1000)
\ No newline at end of file
@@ -1,36 +1,121 @@
 from micropython import const
 import machine
+import array
 import time
 
-last_tick = time.ticks_us()
-last_interval = 1;
+#a class abstraction for a digital hall effect sensor used as a rev counter
+#the interrupt handler only stores the time of each edge in a preallocated ring (no allocation, safe as a hard IRQ),
+#everything else happens when a reading is asked for: the intervals between the last few edges are averaged
+#(mean, like main.ino, or median, which shrugs off a single noisy edge) and the reading drops to 0 after a timeout.
+#the board has two sensors, SPD_0 at the wheel and SPD_1 on the motor, see board.wheel() and board.motor()
+#for testing, edge(t) records an edge at any ticks_us() time and the readings take the current time as an argument
 
-def hall_handler(pin): #handler to update speed sensor interval when hall sensor is tripped
-    t = time.ticks_us()
-    global last_interval = time.ticks_diff(t,last_tick)
-    global last_tick = t
-    
+SPD_0 = const(20) #wheel sensor pin, one magnet
+SPD_1 = const(19) #motor sensor pin, four magnets
+WHEEL_DIAMETER = 15.75 #inches, the 40 cm tire in main.ino
+
+MEAN = const(0)
+MEDIAN = const(1)
 
-#a class abstraction for a digital hall effect sensor used as a rev counter
 
 class hall():
-    
-    def __init__(self, pin, diameter):
-        self.pin = machine.Pin(pin, machine.Pin.IN)
-        self.scale = 5280/(6.28*(diameter/12)) #number of revolutions per mile given wheel diameter in inches
-        self.pin.irq(trigger=Pin.IRQ_RISING, handler=hall_handler)
-        
-    def get_rpm(self):
-        return((1000000/last_interval)*60)
-    
-    def get_speed(self):
-        return((scale/self.get_rpm())*60)
-    
-    def get_speed_kph(self):
-        return(self.get_speed()*1.6)
-    
+
+    #diameter is the wheel's in inches (only needed for the speed readings), magnets is the number per revolution,
+    #window is how many intervals a reading is taken over, timeout_ms is how long without an edge before reading 0
+    #(by default a revolution a minute, the same cut off as main.ino) and edges closer together than debounce_us are ignored
+    def __init__(self, pin, diameter = WHEEL_DIAMETER, magnets = 1, window = 5, method = MEAN, timeout_ms = None, debounce_us = 0):
+        self.diameter = diameter
+        self.magnets = magnets
+        self.scale = 3.14159 * diameter * 60 / 63360 #mph per rpm, wheel circumference in miles times minutes per hour
+        self.window = window
+        self.method = method
+        self.timeout = (timeout_ms if timeout_ms is not None else 60000 // magnets) * 1000 #us
+        self.debounce = debounce_us
+        self.size = window + 2 #one more edge than intervals, plus a spare so an edge during a reading can't overwrite it
+        self.times = array.array('l', [0] * self.size) #ticks_us() of the latest edges, newest at self.index
+        self.work = array.array('l', [0] * window) #intervals of the current reading, reused
+        self.index = 0
+        self.edges = 0 #number of edges seen, the ring is only valid this far back
+        self.pin = None
+        if(pin is not None): #pin None for testing with edge()
+            self.pin = machine.Pin(pin, machine.Pin.IN)
+            self.pin.irq(trigger=machine.Pin.IRQ_FALLING, handler=self._irq, hard=True)
+
+    def _irq(self, pin):
+        self.edge(time.ticks_us())
+
+    def edge(self, t): #record an edge at time t (us)
+        i = self.index
+        if(self.edges and time.ticks_diff(t, self.times[i]) < self.debounce):
+            return
+        i += 1
+        if(i == self.size):
+            i = 0
+        self.times[i] = t
+        self.index = i
+        self.edges += 1
+
+    def reset(self):
+        self.edges = 0
+
+    def set_window(self, window): #average over fewer intervals to follow changes sooner, at most the window it was made with
+        self.window = max(1, min(window, len(self.work)))
+
+    def interval(self, now = None): #us between edges over the window, 0 if stopped
+        state = machine.disable_irq()
+        i = self.index
+        n = self.edges
+        machine.enable_irq(state)
+        if(n < 2):
+            return(0)
+        if(now is None):
+            now = time.ticks_us()
+        t = self.times
+        since = time.ticks_diff(now, t[i])
+        if(since > self.timeout):
+            return(0)
+        k = n - 1
+        if(k > self.window):
+            k = self.window
+        w = self.work
+        for j in range(k):
+            p = i - 1
+            if(p < 0):
+                p = self.size - 1
+            w[j] = time.ticks_diff(t[i], t[p])
+            i = p
+        if(self.method == MEDIAN):
+            for j in range(1, k): #insertion sort, k is small
+                v = w[j]
+                m = j - 1
+                while(m >= 0 and w[m] > v):
+                    w[m + 1] = w[m]
+                    m -= 1
+                w[m + 1] = v
+            ret = w[k // 2] if k & 1 else (w[k // 2 - 1] + w[k // 2]) // 2
+        else:
+            ret = 0
+            for j in range(k):
+                ret += w[j]
+            ret //= k
+        if(since > ret): #slowing down, the next interval is already longer than the average
+            ret = since
+        return(ret)
+
+    def get_rpm(self, now = None):
+        t = self.interval(now)
+        if(t == 0):
+            return(0)
+        return(60000000 / (t * self.magnets))
+
+    def get_speed(self, now = None): #mph
+        return(self.get_rpm(now) * self.scale)
+
+    def get_speed_kph(self, now = None):
+        return(self.get_speed(now) * 1.609)
+
 def hall_1_debug():
-    hall1 = hall(19,12)
+    hall1 = hall(SPD_0)
     for i in range(1000):
-        print(hall1.get_speed)
-        time.sleep_ms(1000)    
\ No newline at end of file
+        print(hall1.get_speed())
+        time.sleep_ms(1000)
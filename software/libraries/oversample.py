@@ -0,0 +1,112 @@
+import array
+from utime import ticks_ms, ticks_diff
+
+#oversampling for the ADS7830, whose 8 bit readings of the battery voltages and the current are coarse and noisy
+#each channel is read as a burst of 4^bits back to back conversions in one transaction (ADS7830.read_burst), and the
+#sum is decimated by 2^bits: with at least a count of noise on the input that gives bits more bits of resolution, and the
+#noise drops by 2^bits. bits is either given or the most a bus time budget for one read() of every channel allows.
+#readings are integers in 1/2^bits counts (self.one to a count, full scale 255 * one), so 8 bit maths carries over with
+#a divide by one. An exponential moving average can go on top: each read() moves it 1/2^ema of the way to the new value.
+#everything is integer and nothing allocates per sample. coulombs integrates a current reading over time
+
+I2C_FREQ = 400000
+MAX_BITS = 4 #256 conversions, 5.8 ms of bus time a channel at 400 kHz
+
+
+def burst_us(n, freq = I2C_FREQ): #bus time of a burst of n conversions: address, command, address again then n bytes
+    return(((n + 3) * 9 + 3) * 1000000 // freq)
+
+def bits_for(budget_us, channels, freq = I2C_FREQ): #the most extra bits whose bursts of every channel fit in budget_us
+    bits = 0
+    while(bits < MAX_BITS and burst_us(4 ** (bits + 1), freq) * channels <= budget_us):
+        bits += 1
+    return(bits)
+
+
+class oversampler():
+
+    #cmds are ADS7830 command bytes (ADC.cmd_se, ADC.cmd_diff), one reading each. Give bits, or budget_us for read() to
+    #take at most that long on the bus at freq. ema is the moving average's shift, 0 for none
+    def __init__(self, adc, cmds, bits = None, budget_us = None, freq = I2C_FREQ, ema = 0):
+        self.adc = adc
+        self.cmds = cmds
+        if(bits is None):
+            bits = bits_for(budget_us, len(cmds), freq) if budget_us is not None else 2
+        self.bits = min(bits, MAX_BITS)
+        self.one = 1 << self.bits
+        self.n = 4 ** self.bits #conversions per reading
+        self.buf = bytearray(self.n)
+        self.values = array.array('l', [0] * len(cmds)) #the latest readings, in 1/one counts
+        self.ema = ema
+        self.acc = array.array('l', [0] * len(cmds)) #the moving averages << ema
+        self.filtered = array.array('l', [0] * len(cmds)) #the moving averages, in 1/one counts
+        self.started = False
+        self.samples = 0 #conversions so far
+
+    def read(self): #every channel, returns self.values (self.filtered has the averages)
+        b = self.buf
+        n = self.n
+        bits = self.bits
+        mask = self.one - 1
+        half = self.one >> 1
+        v = self.values
+        for i in range(len(self.cmds)):
+            self.adc.read_burst(self.cmds[i], b)
+            s = 0
+            for j in range(n):
+                s += b[j]
+            q = s >> bits
+            r = s & mask
+            if(r > half or (r == half and r and q & 1)): #to the nearest, ties to even so they don't pull the average up
+                q += 1
+            v[i] = q
+        self.samples += n * len(self.cmds)
+        if(self.ema):
+            self._average()
+        return(v)
+
+    def _average(self):
+        v = self.values
+        a = self.acc
+        f = self.filtered
+        e = self.ema
+        for i in range(len(v)):
+            if(self.started):
+                a[i] += v[i] - (a[i] >> e)
+            else: #start from the first reading instead of climbing up from 0
+                a[i] = v[i] << e
+            f[i] = a[i] >> e
+        self.started = True
+
+    def counts(self, i): #reading i as a float in 8 bit counts
+        return(self.values[i] / self.one)
+
+
+#charge drawn from the batteries, from a current reading (e.g. oversampler readings) given every so often with add()
+#amps is the current for one unit of the reading (for an oversampler reading, amps per 8 bit count / one).
+#the current is held from one add() to the next and summed as whole milliamp milliseconds, carried into whole
+#millicoulombs as it goes, so the integers stay small enough for the pico not to allocate
+class coulombs():
+    def __init__(self, amps, now_ms = None):
+        self.k = int(amps * 1000 * 256 + 0.5) #mA per unit, 8 fractional bits
+        self.last = now_ms
+        self.ma = 0 #latest current
+        self.part = 0 #mA ms less than a whole millicoulomb
+        self.mc = 0 #millicoulombs (mA s)
+
+    def add(self, reading, now_ms = None):
+        if(now_ms is None):
+            now_ms = ticks_ms()
+        if(self.last is not None):
+            p = self.part + self.ma * ticks_diff(now_ms, self.last)
+            self.mc += p // 1000
+            self.part = p % 1000
+        self.ma = (reading * self.k) >> 8
+        self.last = now_ms
+
+    def reset(self):
+        self.part = 0
+        self.mc = 0
+
+    def amp_hours(self):
+        return(self.mc / 3600000)
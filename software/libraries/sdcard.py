@@ -12,6 +12,17 @@ Example usage on ESP8266:
     sd = sdcard.SDCard(machine.SPI(1), machine.Pin(15))
     os.mount(sd, '/sd')
     os.listdir('/')
+
+While the card is programming a block it holds DO low. By default every write waits
+for that before returning. With cooperative=True a write returns as soon as the card
+has taken the data, and the wait happens at the start of the next command instead, so
+the caller can get on with other work (or await wait_ready()) while the card is busy.
+Any wait calls self.idle(), if set, between polls. With pre_erase=True multi-block
+writes are preceded by ACMD23 (SET_WR_BLK_ERASE_COUNT) so the card can erase the whole
+run up front. set_crc(True) sends CMD59 so the card checks a CRC on every command and
+data block, and the data the card sends is checked too: a block that comes back
+damaged raises OSError(EIO) instead of being returned. It costs a CRC per block, so it
+is meant for proving a new SPI rate (see sdclock.py) rather than for logging.
 """
 
 from micropython import const
@@ -19,6 +30,8 @@ import time
 
 
 _CMD_TIMEOUT = const(100)
+_TOKEN_TIMEOUT_MS = const(100)  # read access limit, for the data token
+_BUSY_TIMEOUT_MS = const(500)  # write busy limit: 250 ms for SDHC, 500 ms for SDXC
 
 _R1_IDLE_STATE = const(1 << 0)
 # R1_ERASE_RESET = const(1 << 1)
@@ -31,11 +44,52 @@ _TOKEN_CMD25 = const(0xFC)
 _TOKEN_STOP_TRAN = const(0xFD)
 _TOKEN_DATA = const(0xFE)
 
+_crc16_table = None
+
+
+def crc7(buf):
+    # the CRC of a command frame's first five bytes, as its last byte (with the end bit)
+    c = 0
+    for k in range(5):
+        b = buf[k]
+        for i in range(8):
+            c = (c << 1) & 0xFF
+            if ((b << i) ^ c) & 0x80:
+                c ^= 0x09
+    return ((c & 0x7F) << 1) | 1
+
+
+def crc16(buf):
+    # CRC-16-CCITT (XMODEM) of a data block, table driven, the table is made on first use
+    global _crc16_table
+    t = _crc16_table
+    if t is None:
+        import array
+
+        t = array.array("H", [0] * 256)
+        for i in range(256):
+            c = i << 8
+            for j in range(8):
+                c = ((c << 1) ^ 0x1021 if c & 0x8000 else c << 1) & 0xFFFF
+            t[i] = c
+        _crc16_table = t
+    c = 0
+    for b in buf:
+        c = ((c << 8) & 0xFFFF) ^ t[(c >> 8) ^ b]
+    return c
+
 
 class SDCard:
-    def __init__(self, spi, cs, baudrate=1320000):
+    def __init__(self, spi, cs, baudrate=1320000, cooperative=False, pre_erase=False):
         self.spi = spi
         self.cs = cs
+        self.cooperative = cooperative
+        self.pre_erase = pre_erase
+        self.idle = None  # called while waiting on the card
+        self.pending = False  # card may still be programming the last write
+        self.busy_polls = 0  # bytes polled while the card was busy, for tuning
+        self.crc = False  # CRCs on, see set_crc()
+        self.crcbuf = bytearray(2)
 
         self.cmdbuf = bytearray(6)
         self.dummybuf = bytearray(512)
@@ -138,17 +192,71 @@ class SDCard:
                 return
         raise OSError("timeout waiting for v2 card")
 
+    def set_crc(self, on):
+        # CMD59: CRC checking on or off, returns False if the card didn't take it
+        was = self.crc
+        self.crc = True  # the command itself goes out with a proper CRC either way
+        ok = self.cmd(59, 1 if on else 0, 0) == 0
+        self.crc = on if ok else was
+        return ok
+
+    def wait_busy(self):
+        # with CS low: poll until the card lets go of DO
+        t = self.tokenbuf
+        start = time.ticks_ms()
+        self.spi.readinto(t, 0xFF)
+        while t[0] == 0x00:
+            if time.ticks_diff(time.ticks_ms(), start) > _BUSY_TIMEOUT_MS:
+                self.cs(1)
+                raise OSError("timeout waiting for the card to finish writing")
+            self.busy_polls += 1
+            if self.idle is not None:
+                self.idle()
+            self.spi.readinto(t, 0xFF)
+
+    def ready(self):
+        # True once the last write has been programmed, without waiting for it
+        if not self.pending:
+            return True
+        self.cs(0)
+        self.spi.readinto(self.tokenbuf, 0xFF)
+        busy = self.tokenbuf[0] == 0x00
+        self.cs(1)
+        self.spi.write(b"\xff")
+        if not busy:
+            self.pending = False
+        return not busy
+
+    async def wait_ready(self, poll_ms=1):
+        # for uasyncio: give the other tasks the time the card spends programming
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while not self.ready():
+            await asyncio.sleep(poll_ms / 1000)
+
+    def end_busy(self):
+        # the card has just started programming: wait for it, or leave it to the next command
+        if self.cooperative:
+            self.pending = True
+        else:
+            self.wait_busy()
+
     def cmd(self, cmd, arg, crc, final=0, release=True, skip1=False):
         self.cs(0)
+        if self.pending:
+            self.wait_busy()
+            self.pending = False
 
         # create and send the command
         buf = self.cmdbuf
         buf[0] = 0x40 | cmd
-        buf[1] = arg >> 24
-        buf[2] = arg >> 16
-        buf[3] = arg >> 8
-        buf[4] = arg
-        buf[5] = crc
+        buf[1] = (arg >> 24) & 0xFF
+        buf[2] = (arg >> 16) & 0xFF
+        buf[3] = (arg >> 8) & 0xFF
+        buf[4] = arg & 0xFF
+        buf[5] = crc7(buf) if self.crc else crc
         self.spi.write(buf)
 
         if skip1:
@@ -179,15 +287,17 @@ class SDCard:
     def readinto(self, buf):
         self.cs(0)
 
-        # read until start byte (0xff)
-        for i in range(_CMD_TIMEOUT):
+        # read until start byte (0xfe), polling rather than sleeping a whole ms per try
+        start = time.ticks_ms()
+        while True:
             self.spi.readinto(self.tokenbuf, 0xFF)
             if self.tokenbuf[0] == _TOKEN_DATA:
                 break
-            time.sleep_ms(1)
-        else:
-            self.cs(1)
-            raise OSError("timeout waiting for response")
+            if time.ticks_diff(time.ticks_ms(), start) > _TOKEN_TIMEOUT_MS:
+                self.cs(1)
+                raise OSError("timeout waiting for response")
+            if self.idle is not None:
+                self.idle()
 
         # read data
         mv = self.dummybuf_memoryview
@@ -196,41 +306,54 @@ class SDCard:
         self.spi.write_readinto(mv, buf)
 
         # read checksum
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        c = self.crcbuf
+        self.spi.readinto(c, 0xFF)
 
         self.cs(1)
         self.spi.write(b"\xff")
+        if self.crc and (c[0] << 8 | c[1]) != crc16(buf):
+            raise OSError(5)  # EIO, the block was damaged on the way
 
-    def write(self, token, buf):
+    def write(self, token, buf, last=True):
+        # last=False inside a multi-block write, the next block has to wait for this one anyway
         self.cs(0)
 
         # send: start of block, data, checksum
-        self.spi.read(1, token)
+        self.tokenbuf[0] = token
+        self.spi.write(self.tokenbuf)
         self.spi.write(buf)
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        if self.crc:
+            c = crc16(buf)
+            self.crcbuf[0] = c >> 8
+            self.crcbuf[1] = c & 0xFF
+            self.spi.write(self.crcbuf)
+        else:
+            self.spi.write(b"\xff\xff")
 
         # check the response
-        if (self.spi.read(1, 0xFF)[0] & 0x1F) != 0x05:
+        self.spi.readinto(self.tokenbuf, 0xFF)
+        if (self.tokenbuf[0] & 0x1F) != 0x05:
             self.cs(1)
             self.spi.write(b"\xff")
-            return
+            return False
 
         # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0:
-            pass
+        if last:
+            self.end_busy()
+        else:
+            self.wait_busy()
 
         self.cs(1)
         self.spi.write(b"\xff")
+        return True
 
     def write_token(self, token):
         self.cs(0)
-        self.spi.read(1, token)
+        self.tokenbuf[0] = token
+        self.spi.write(self.tokenbuf)
         self.spi.write(b"\xff")
         # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0x00:
-            pass
+        self.end_busy()
 
         self.cs(1)
         self.spi.write(b"\xff")
@@ -254,13 +377,16 @@ class SDCard:
                 raise OSError(5)  # EIO
             offset = 0
             mv = memoryview(buf)
-            while nblocks:
-                # receive the data and release card
-                self.readinto(mv[offset : offset + 512])
-                offset += 512
-                nblocks -= 1
-            if self.cmd(12, 0, 0xFF, skip1=True):
-                raise OSError(5)  # EIO
+            try:
+                while nblocks:
+                    # receive the data and release card
+                    self.readinto(mv[offset : offset + 512])
+                    offset += 512
+                    nblocks -= 1
+            finally:
+                # stop the transfer even if a block was damaged
+                if self.cmd(12, 0, 0xFF, skip1=True):
+                    raise OSError(5)  # EIO
 
     def writeblocks(self, block_num, buf):
         nblocks, err = divmod(len(buf), 512)
@@ -271,19 +397,27 @@ class SDCard:
                 raise OSError(5)  # EIO
 
             # send the data
-            self.write(_TOKEN_DATA, buf)
+            if not self.write(_TOKEN_DATA, buf):
+                raise OSError(5)  # EIO, the card rejected the block
         else:
+            # ACMD23: number of blocks about to be written, so the card can pre-erase them
+            # (an optional hint: if the card turns either command down, write without it)
+            if self.pre_erase and self.cmd(55, 0, 0) == 0:
+                self.cmd(23, nblocks, 0)
             # CMD25: set write address for first block
             if self.cmd(25, block_num * self.cdv, 0) != 0:
                 raise OSError(5)  # EIO
             # send the data
             offset = 0
             mv = memoryview(buf)
-            while nblocks:
-                self.write(_TOKEN_CMD25, mv[offset : offset + 512])
+            ok = True
+            while nblocks and ok:
+                ok = self.write(_TOKEN_CMD25, mv[offset : offset + 512], False)
                 offset += 512
                 nblocks -= 1
             self.write_token(_TOKEN_STOP_TRAN)
+            if not ok:
+                raise OSError(5)  # EIO, the card rejected a block
 
     def ioctl(self, op, arg):
         if op == 4:  # get number of blocks
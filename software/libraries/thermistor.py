@@ -1,30 +1,39 @@
-import machine
 from utime import sleep_ms
 import ADC
+import thermtable
 
 #a class abstraction for a thermistor, using the ADS7830
+#readings are converted with the shared lookup table in thermtable.py (tenths of a degree C per 8-bit reading),
+#so a temperature costs one index instead of a polynomial in floating point
+
+FIRST_CHANNEL = 4 #thermistor 0 is on ADC channel 4, offset is because of the way the pins are setup on our board
+SCAN = bytes([ADC.cmd_se(FIRST_CHANNEL + i) for i in range(4)]) #ADC command list for all four thermistors
+
+def to_farenheit(tenths): #tenths of a degree C to whole degrees F, in integer maths
+    return((tenths * 9 // 5 + 320) // 10)
 
 class thermistor():
     
-    def __init__(self, number = 0, address = 0x48, sda=16, scl=17, bus=0, f=False):
-        sda0=machine.Pin(16)
-        scl0=machine.Pin(17)
-        i2c0=machine.I2C(bus, sda=sda0, scl=scl0, freq=400000)
-        self.adc = ADC.ADS7830(i2c0)
-        self.number = number+4 #which thermistor is this? (0-3), offset is because of the way the pins are setup on our board
+    def __init__(self, number = 0, adc = None, f=False):
+        if(adc is None): #all the thermistors share the board's one ADC
+            import board
+            adc = board.adc()
+        self.adc = adc
+        self.number = number+FIRST_CHANNEL #which thermistor is this? (0-3)
         self.f = f
+        self.t_tenths = 0 #tenths of a degree C
         self.t_celsius = 0
         self.t_farenheit = 0
     
-    #equation that takes the raw voltage level from the thermistor and converts it to a celsius temperature
+    #takes the raw voltage level from the thermistor and returns a celsius temperature
     def equation(self, raw):
-        temp = -54.9 + (1.52*raw) + (-0.011*pow(raw,2)) + (0.0000312*pow(raw,3)) #cubic polynomial is not ideal but we only sample at a low rate so it should be ok
-        return(temp) #using this equation, the absolute deviation should not exceed 8 degrees, consider rounding to 5 degrees
+        return(thermtable.TABLE[raw] / 10)
     
     def read(self):
         raw = self.adc.read_channel_se(self.number)
-        self.t_celsius = int(self.equation(raw))
-        self.t_farenheit = int((self.t_celsius*5/9)+32)
+        self.t_tenths = thermtable.TABLE[raw]
+        self.t_celsius = self.t_tenths // 10
+        self.t_farenheit = to_farenheit(self.t_tenths)
     
     def __str__(self):
         self.read()
@@ -39,14 +48,26 @@ class thermistor():
             return(str(self.t_farenheit))
         else:
             return(str(self.t_celsius))
+
+
+#all four thermistors read together: one ADC scan, then one table lookup per channel
+class bank():
+    def __init__(self, adc, table = None):
+        self.adc = adc
+        self.table = table if table is not None else thermtable.TABLE
+        self.raw = bytearray(4)
+        self.tenths = [0, 0, 0, 0] #tenths of a degree C, thermistor 0-3
+        
+    def read(self): #returns self.tenths, updated in place
+        self.adc.scan(SCAN, self.raw)
+        t = self.table
+        for i in range(4):
+            self.tenths[i] = t[self.raw[i]]
+        return(self.tenths)
         
 #debug code
-t0 = thermistor()
-
 def debug(n=255):
+    t0 = thermistor()
     for i in range(n):
         print(t0)
         sleep_ms(500)
-        
-    
-        
\ No newline at end of file
@@ -0,0 +1,57 @@
+import array
+import math
+
+#lookup table from 8-bit ADS7830 readings to temperature in tenths of a degree C, so a thermistor read is one index
+#the thermistor sits on the low side of a divider with a fixed resistor up to the ADC reference, so hotter reads lower.
+#readings are clamped to 0-150C like the Arduino table (thermistor.h): below 0C an 8-bit reading can't resolve much.
+#TABLE below is generated, run tools/make_thermtable.py to rebuild it for another part, or call build() on the pico
+
+
+#temperature table for readings 0..levels-1, from the Beta equation, or Steinhart-Hart if sh = (A, B, C) is given
+def build(beta = 3950, r25 = 10000, r_fixed = 10000, sh = None, t_min = 0, t_max = 150, levels = 256):
+    ret = array.array('h', [0] * levels)
+    for code in range(levels):
+        ratio = (code + 0.5) / levels #middle of the reading's voltage range
+        r = r_fixed * ratio / (1 - ratio)
+        if(sh is not None):
+            l = math.log(r)
+            t = 1 / (sh[0] + sh[1] * l + sh[2] * l * l * l) - 273.15
+        else:
+            t = 1 / (1 / 298.15 + math.log(r / r25) / beta) - 273.15
+        t = min(t_max, max(t_min, t))
+        ret[code] = int(t * 10 + 0.5)
+    return(ret)
+
+def write(path, table, note): #writes this module back out with a new table
+    file = open(__file__, 'r')
+    source = file.read()
+    file.close()
+    source = source[:source.rindex('\n#generated: ') + 1]
+    lines = ['#generated: ' + note, 'TABLE = array.array(\'h\', [']
+    for i in range(0, len(table), 16):
+        lines.append('    ' + ', '.join([str(v) for v in table[i:i + 16]]) + ',')
+    lines.append('])')
+    file = open(path, 'w')
+    file.write(source + '\n'.join(lines) + '\n')
+    file.close()
+
+
+#generated: beta 3950, 10000 ohms at 25C, 10000 ohm fixed resistor
+TABLE = array.array('h', [
+    1500, 1500, 1500, 1500, 1500, 1457, 1383, 1321, 1268, 1222, 1181, 1144, 1111, 1081, 1054, 1028,
+    1004, 982, 961, 942, 924, 906, 889, 874, 859, 844, 830, 817, 804, 792, 780, 769,
+    758, 747, 737, 727, 717, 707, 698, 689, 681, 672, 664, 656, 648, 640, 632, 625,
+    617, 610, 603, 596, 590, 583, 576, 570, 564, 558, 552, 546, 540, 534, 528, 522,
+    517, 511, 506, 501, 495, 490, 485, 480, 475, 470, 465, 460, 455, 450, 446, 441,
+    436, 432, 427, 423, 418, 414, 409, 405, 401, 397, 392, 388, 384, 380, 376, 372,
+    368, 364, 360, 356, 352, 348, 344, 340, 336, 332, 328, 325, 321, 317, 313, 310,
+    306, 302, 298, 295, 291, 287, 284, 280, 277, 273, 269, 266, 262, 259, 255, 252,
+    248, 245, 241, 238, 234, 231, 227, 224, 220, 217, 213, 210, 207, 203, 200, 196,
+    193, 189, 186, 182, 179, 176, 172, 169, 165, 162, 158, 155, 151, 148, 145, 141,
+    138, 134, 131, 127, 124, 120, 117, 113, 109, 106, 102, 99, 95, 92, 88, 84,
+    81, 77, 73, 70, 66, 62, 58, 55, 51, 47, 43, 39, 36, 32, 28, 24,
+    20, 16, 12, 8, 3, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+])
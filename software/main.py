@@ -0,0 +1,164 @@
+import time
+import array
+import scheduler
+import CSV
+import frame
+import board
+import gyro
+import timing
+import dualcore
+import adaptive
+import ADC
+import oversample
+
+#the telemetry logger: samples the sensors every 100 ms and logs them to the SD card once a second,
+#using the same period tiers as the Arduino firmware. Set DEBUG to print the scheduler statistics every 10 s
+#the IMU samples at IMU_RATE through its FIFO and each logged row holds the mean since the last one; a knock past
+#KNOCK counts on any axis also saves the high rate samples around it to the card (event_<sample>.bin, 6 int16 per sample)
+#set PROFILE to time the driver calls (see timing.py), the table is printed and appended to timing.txt every 10 s
+#set DUAL_CORE to do the sampling on core 1 (see dualcore.py): each row goes to core 0 as a frame through a ring and core 0
+#only writes them to the card, so a slow card can't delay a reading. Rows that find the ring full are dropped and counted.
+#the IMU is core 1's too, so core 1 also copies out a knock's samples and rearms, and core 0 just writes the copy out
+#set ADAPTIVE to let the sampling rate follow the car (see adaptive.py): rows every 500 ms and the IMU at 250 Hz on a
+#steady straight, up to every 50 ms and 500 Hz through corners, braking and knocks, and a jolt between two slow rows ends
+#the row there. Each change is appended to rates.csv as tick,period_ms,imu_rate,hall_window, which tools/decode_log.py
+#picks up. Not with DUAL_CORE (an error at start up)
+#the battery voltages and the current are oversampled (see oversample.py) within OVERSAMPLE_US of bus time a row, and the
+#charge drawn is counted from the current; set OVERSAMPLE_US to 0 for single 8 bit readings
+DEBUG = False
+PROFILE = False
+DUAL_CORE = False
+ADAPTIVE = False
+LOG_FORMAT = 'delta' #'delta' (see delta.py) or 'frame', tools/decode_log.py reads either. DUAL_CORE always logs frames
+IMU_RATE = 500 #Hz, the FIFO holds 170 ms of samples at this rate
+KNOCK = 24000 #raw counts, 16384 = 1 g
+OVERSAMPLE_US = 2000 #16 conversions a channel at 400 kHz
+AMPS = 0.0258 / 0.00625 #per count, the current sense amplifier across the shunt
+if(ADAPTIVE and DUAL_CORE): #core 1 samples at a fixed period, so the rate could never change
+    raise ValueError('ADAPTIVE only works with DUAL_CORE off')
+if(PROFILE): #before the card is mounted, or the filesystem's block I/O goes round the wrappers (see timing.py)
+    timing.instrument()
+
+row = [0.0] * frame.COLUMNS #the latest values, in frame.FIELDS order followed by the tick in ms
+
+adc = board.adc()
+power = oversample.oversampler(adc, bytes([ADC.cmd_se(i) for i in range(4)]), budget_us = OVERSAMPLE_US, freq = board.I2C_FREQ)
+charge = oversample.coulombs(AMPS / power.one)
+imu = board.imu()
+motion = gyro.fifo(imu, IMU_RATE, ring_size = 512, trigger = KNOCK)
+temps = board.thermistors() #all four from one ADC scan
+wheel = None #made by hall_setup(), on core 1 with DUAL_CORE so their edge IRQs run there
+motor = None
+rates = None #the adaptive.controller with ADAPTIVE
+try:
+    log = CSV.CSV(frame.COLUMNS, 64 if ADAPTIVE else 32, fmt = 'frame' if DUAL_CORE else LOG_FORMAT) #a second of rows at 50 ms, and the rows cut short
+except OSError: #no card in the slot, keep running for the displays
+    log = None
+
+def hall_setup():
+    global wheel, motor
+    wheel = board.wheel()
+    motor = board.motor()
+
+def read_row():
+    row[0] = wheel.get_speed_kph()
+    row[1] = motor.get_rpm()
+    p = power.read() #in 1/power.one counts
+    vbat = p[0] * 0.0516 / power.one #see readBatteryVoltages() in main.ino for the divider maths
+    row[2] = vbat
+    row[3] = p[1] * 0.1 / power.one - vbat
+    row[4] = (p[2] - p[3]) * AMPS / power.one
+    charge.add(p[2] - p[3])
+    t = temps.read() #tenths of a degree
+    for i in range(4):
+        row[5 + i] = t[i] / 10
+    v = motion.read()
+    row[9] = v[gyro.AX]
+    row[10] = v[gyro.AY]
+    row[11] = v[gyro.AZ]
+    row[12] = v[gyro.GX]
+    row[13] = v[gyro.GY]
+    row[14] = v[gyro.GZ]
+    row[15] = time.ticks_ms()
+
+def drain_imu():
+    motion.drain()
+    if(motion.cut): #a threshold crossed between two rows (ADAPTIVE), the row ends there: take it now
+        sampling.wake()
+
+def sample():
+    read_row()
+    if(log is not None):
+        log.append(row)
+    if(rates is not None and rates.update(motion.lows, motion.highs, row[0], row[15])):
+        rates.apply(sampling, motion, (wheel, motor))
+
+seq = [0] #frame sequence number, core 1 only
+event = None #a knock's samples copied out on core 1 (DUAL_CORE)
+event_info = array.array('L', [0, 0]) #samples in event (0 for none waiting, set by core 1 and cleared by core 0), its trigger sample
+def sample_frame(slot): #core 1, packs the row straight into its slot in the ring
+    read_row()
+    frame.pack_into(slot, 0, seq[0], row)
+    seq[0] += 1
+    if(motion.frozen and not event_info[0]): #the last one is written out, so event is free
+        samples, at = motion.dump(event)
+        event_info[1] = motion.trigger_sample
+        motion.rearm()
+        event_info[0] = len(samples) // 6 #last, core 0 can have it from here on
+
+def write_log():
+    if(log is not None):
+        if(DUAL_CORE):
+            n = frames.drain_into(batch)
+            if(n):
+                log.sd.write_to_card(batch_mv[0:n])
+            if(event_info[0]):
+                log.sd.write_to_card(memoryview(event)[0:6 * event_info[0]], 'event_%d.bin' % event_info[1])
+                event_info[0] = 0
+        else:
+            log.write()
+            if(motion.frozen):
+                ring, at = motion.dump()
+                log.sd.write_to_card(memoryview(ring), 'event_%d.bin' % motion.trigger_sample)
+                motion.rearm()
+
+def rate_changed(now_ms, level):
+    if(log is not None):
+        log.sd.write_to_card('%d,%d,%d,%d\n' % ((now_ms,) + level), 'rates.csv')
+
+def timing_report():
+    text = timing.summary()
+    print(text)
+    if(log is not None):
+        log.sd.write_to_card(text.encode(), 'timing.txt')
+
+def report():
+    sched.report()
+    print('charge used: %.3f Ah' % charge.amp_hours())
+    if(DUAL_CORE):
+        print('core 1: %d rows, %d late, %d dropped, %d waiting' % (acquisition.runs, acquisition.late, frames.dropped(), len(frames)))
+    elif(rates is not None):
+        print('rate: %d ms rows, %d Hz IMU, %d changes' % (rates.current()[0], rates.current()[1], rates.changes))
+
+sched = scheduler.scheduler()
+if(DUAL_CORE):
+    frames = dualcore.ring(frame.SIZE, 64) #6 s of rows
+    batch = bytearray(frame.SIZE * 64)
+    batch_mv = memoryview(batch)
+    event = array.array('h', [0] * (6 * motion.ring_size))
+    acquisition = dualcore.core1(frames, sample_frame, scheduler.TICK_100M, hall_setup)
+    acquisition.start()
+else:
+    hall_setup()
+    sched.add('imu', drain_imu if ADAPTIVE else motion.drain, 50)
+    sampling = sched.add('sample', sample, scheduler.TICK_100M, nap_ms = 10 if ADAPTIVE else None)
+    if(ADAPTIVE):
+        rates = adaptive.controller(on_change = rate_changed)
+        rate_changed(time.ticks_ms(), rates.current()) #the starting level, so every row in the log is covered
+        rates.apply(sampling, motion, (wheel, motor))
+sched.add('log', write_log, scheduler.TICK_1S)
+if(DEBUG):
+    sched.add('report', report, scheduler.TICK_10S)
+if(PROFILE):
+    sched.add('timing', timing_report, scheduler.TICK_10S)
+sched.run()
@@ -0,0 +1,266 @@
+import struct
+
+#high rate logging straight into the card's sectors, bypassing the filesystem for every append
+#the log file is created once at full size through the filesystem (preallocate()), its sectors are found by reading the FAT
+#(fat_extent()), and from then on records are streamed into that range with multi-block writes by a rawlog object.
+#the file never changes size, so the FAT and directory entry stay valid and the card can still be read on a PC;
+#sector 0 of the file is a header that records how many bytes of data follow it, use load() to read the data back
+#N.B. don't open the file through the filesystem while a rawlog is streaming into it
+
+MAGIC = b'RLOG'
+VERSION = 1
+HEADER = '<4sHHII' #magic, version, sector size, bytes of data, number of header updates
+SECTOR = 512
+
+
+#create path as a file of size bytes (rounded up to whole sectors plus the header sector), written out in large pieces
+#so FatFs hands out clusters in one run. On a fragmented card the result may not be contiguous, fat_extent() will say so
+def preallocate(path, size, chunk = 4096):
+    size = ((size + SECTOR - 1) // SECTOR + 1) * SECTOR
+    buf = bytearray(chunk)
+    mv = memoryview(buf)
+    file = open(path, 'wb')
+    left = size
+    while(left > 0):
+        n = min(left, chunk)
+        file.write(mv[0:n])
+        left -= n
+    file.close()
+    return(size)
+
+
+#just enough of a FAT12/16/32 reader to find where a file lives on a block device
+class _fat():
+    def __init__(self, dev):
+        self.dev = dev
+        self.sec = bytearray(SECTOR)
+        self.fatbuf = bytearray(2 * SECTOR) #two sectors, FAT12 entries can straddle a sector boundary
+        self.fat_cached = -1
+        self.base = 0 #first sector of the volume
+        dev.readblocks(0, self.sec)
+        if(not self._is_bpb()): #not a volume boot sector, try the first partition of an MBR
+            if(self.sec[510] != 0x55 or self.sec[511] != 0xAA):
+                raise OSError(19) #ENODEV
+            self.base = struct.unpack_from('<I', self.sec, 454)[0]
+            dev.readblocks(self.base, self.sec)
+            if(not self._is_bpb()):
+                raise OSError(19)
+        s = self.sec
+        bps, spc, reserved, nfats, root_entries, total16, media, fatsz16 = struct.unpack_from('<HBHBHHBH', s, 11)
+        total32, fatsz32 = struct.unpack_from('<II', s, 32)
+        fatsz = fatsz16 if fatsz16 else fatsz32
+        total = total16 if total16 else total32
+        self.spc = spc
+        self.root_sectors = (root_entries * 32 + SECTOR - 1) // SECTOR
+        self.fat_start = self.base + reserved
+        self.root_start = self.fat_start + nfats * fatsz
+        self.data_start = self.root_start + self.root_sectors
+        clusters = (total - (self.data_start - self.base)) // spc
+        if(clusters < 4085):
+            self.type = 12
+            self.eoc = 0xFF8
+        elif(clusters < 65525):
+            self.type = 16
+            self.eoc = 0xFFF8
+        else:
+            self.type = 32
+            self.eoc = 0x0FFFFFF8
+        self.root_cluster = struct.unpack_from('<I', s, 44)[0] if self.type == 32 else 0
+
+    def _is_bpb(self):
+        s = self.sec
+        bps = s[11] | s[12] << 8
+        return(s[0] in (0xEB, 0xE9) and bps == SECTOR and s[13] and not (s[13] & (s[13] - 1)) and s[16] in (1, 2))
+
+    def _fat_load(self, sector):
+        if(sector != self.fat_cached):
+            self.dev.readblocks(sector, self.fatbuf)
+            self.fat_cached = sector
+
+    def next_cluster(self, cluster): #follow one link of a cluster chain
+        if(self.type == 12):
+            offset = cluster + cluster // 2
+        else:
+            offset = cluster * (self.type // 8)
+        self._fat_load(self.fat_start + offset // SECTOR)
+        offset %= SECTOR
+        if(self.type == 12):
+            v = self.fatbuf[offset] | self.fatbuf[offset + 1] << 8
+            return(v >> 4 if cluster & 1 else v & 0xFFF)
+        if(self.type == 16):
+            return(self.fatbuf[offset] | self.fatbuf[offset + 1] << 8)
+        return(struct.unpack_from('<I', self.fatbuf, offset)[0] & 0x0FFFFFFF)
+
+    def cluster_sector(self, cluster):
+        return(self.data_start + (cluster - 2) * self.spc)
+
+    def _dir_sectors(self, cluster): #sectors of a directory, cluster 0 is the fixed FAT12/16 root
+        if(cluster == 0):
+            for i in range(self.root_sectors):
+                yield self.root_start + i
+            return
+        while(cluster < self.eoc):
+            first = self.cluster_sector(cluster)
+            for i in range(self.spc):
+                yield first + i
+            cluster = self.next_cluster(cluster)
+
+    def entries(self, cluster): #yields (name, attributes, first cluster, size, 8.3 name) for each file in a directory
+        lfn = ''
+        for sector in self._dir_sectors(cluster):
+            self.dev.readblocks(sector, self.sec)
+            s = self.sec
+            for e in range(0, SECTOR, 32):
+                first = s[e]
+                if(first == 0): #end of directory
+                    return
+                attr = s[e + 11]
+                if(first == 0xE5):
+                    lfn = ''
+                    continue
+                if(attr == 0x0F): #long name part, they come last part first
+                    part = ''
+                    for o in (1, 3, 5, 7, 9, 14, 16, 18, 20, 22, 24, 28, 30):
+                        c = s[e + o] | s[e + o + 1] << 8
+                        if(c == 0 or c == 0xFFFF):
+                            break
+                        part += chr(c)
+                    lfn = part if first & 0x40 else part + lfn
+                    continue
+                if(attr & 0x08): #volume label
+                    lfn = ''
+                    continue
+                name = bytes(s[e:e + 8]).decode().rstrip()
+                if(first == 0x05):
+                    name = chr(0xE5) + name[1:]
+                ext = bytes(s[e + 8:e + 11]).decode().rstrip()
+                if(ext):
+                    name += '.' + ext
+                hi, t, d, lo, size = struct.unpack_from('<HHHHI', s, e + 20)
+                yield (lfn if lfn else name, attr, hi << 16 | lo, size, name)
+                lfn = ''
+
+    def find(self, path): #returns (first cluster, size) of the file at path (relative to the volume root)
+        cluster = self.root_cluster
+        parts = [p for p in path.split('/') if p]
+        for i in range(len(parts)):
+            want = parts[i].lower()
+            for name, attr, first, size, short in self.entries(cluster):
+                if(name.lower() == want or short.lower() == want):
+                    break
+            else:
+                raise OSError(2) #ENOENT
+            if(i < len(parts) - 1):
+                if(not attr & 0x10):
+                    raise OSError(20) #ENOTDIR
+                cluster = first if first else self.root_cluster
+        return(first, size)
+
+
+#returns (first sector, number of sectors) of the file at path (relative to the root of the volume on dev)
+#raises OSError if the file's clusters are not one contiguous run
+def fat_extent(dev, path):
+    fat = _fat(dev)
+    first, size = fat.find(path)
+    if(first < 2 or size == 0):
+        raise OSError(22) #EINVAL, empty file
+    clusters = (size + fat.spc * SECTOR - 1) // (fat.spc * SECTOR)
+    cluster = first
+    for i in range(clusters - 1):
+        nxt = fat.next_cluster(cluster)
+        if(nxt != cluster + 1):
+            raise OSError(27) #EFBIG, closest errno to "file is fragmented"
+        cluster = nxt
+    return(fat.cluster_sector(first), (size + SECTOR - 1) // SECTOR)
+
+
+#streams data into a preallocated run of sectors, data is gathered in a buffer of buffer_sectors sectors and each full
+#buffer goes out as one multi-block write (CMD25 on an sdcard.SDCard). flush() pushes out what is left over and updates
+#the header, a partly filled sector is rewritten by the next flush so nothing is lost and nothing is padded in the log
+class rawlog():
+    def __init__(self, dev, first, sectors, buffer_sectors = 8):
+        if(sectors < 2):
+            raise OSError(28) #ENOSPC
+        self.dev = dev
+        self.first = first #header sector, data starts in the one after
+        self.sectors = sectors
+        self.buf = bytearray(buffer_sectors * SECTOR)
+        self.mv = memoryview(self.buf)
+        self.zeros = memoryview(bytearray(SECTOR))
+        self.header = bytearray(SECTOR)
+        self.fill = 0 #bytes in buf
+        self.next = first + 1 #sector that buf[0] belongs in
+        self.dropped = 0 #bytes that did not fit
+        self.updates = 0
+        self.write_header()
+
+    def used(self): #bytes of data written so far
+        return((self.next - self.first - 1) * SECTOR + self.fill)
+
+    def room(self): #bytes of data that still fit
+        return((self.first + self.sectors - self.next) * SECTOR - self.fill)
+
+    def write(self, data): #returns the number of bytes accepted, a record that does not fit is dropped whole
+        n = len(data)
+        if(n > self.room()):
+            self.dropped += n
+            return(0)
+        size = len(self.buf)
+        if(self.fill + n < size): #the common case
+            self.buf[self.fill:self.fill + n] = data
+            self.fill += n
+            return(n)
+        mv = memoryview(data)
+        i = 0
+        while(i < n):
+            if(self.fill == 0 and n - i >= size): #whole buffers go straight through without a copy
+                k = (n - i) // size * size
+                self.dev.writeblocks(self.next, mv[i:i + k])
+                self.next += k // SECTOR
+                i += k
+                continue
+            k = min(n - i, size - self.fill)
+            self.buf[self.fill:self.fill + k] = mv[i:i + k]
+            self.fill += k
+            i += k
+            if(self.fill == size):
+                self.dev.writeblocks(self.next, self.buf)
+                self.next += size // SECTOR
+                self.fill = 0
+        return(n)
+
+    def flush(self):
+        if(self.fill):
+            whole, part = divmod(self.fill, SECTOR)
+            end = self.fill
+            if(part):
+                end += SECTOR - part
+                self.buf[self.fill:end] = self.zeros[0:end - self.fill]
+            self.dev.writeblocks(self.next, self.mv[0:end])
+            if(whole): #keep only the partly filled sector, it is written again next time
+                self.buf[0:part] = self.mv[whole * SECTOR:self.fill]
+                self.next += whole
+                self.fill = part
+        self.write_header()
+
+    def write_header(self):
+        self.updates += 1
+        struct.pack_into(HEADER, self.header, 0, MAGIC, VERSION, SECTOR, self.used(), self.updates)
+        self.dev.writeblocks(self.first, self.header)
+
+    def close(self):
+        self.flush()
+
+
+#read the data back out of a raw log file, e.g. after copying it off the card
+def load(path):
+    file = open(path, 'rb')
+    header = file.read(SECTOR)
+    magic, version, sector, used, updates = struct.unpack_from(HEADER, header, 0)
+    if(magic != MAGIC):
+        file.close()
+        raise ValueError('not a raw log file')
+    file.seek(sector)
+    ret = file.read(used)
+    file.close()
+    return(ret)
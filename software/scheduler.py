@@ -0,0 +1,147 @@
+try:
+    import uasyncio as asyncio
+except ImportError: #CPython, for testing with fake drivers
+    import asyncio
+try:
+    from utime import ticks_us, ticks_diff, ticks_add
+except ImportError:
+    import time
+    def ticks_us():
+        return(time.perf_counter_ns() // 1000)
+    def ticks_diff(a, b):
+        return(a - b)
+    def ticks_add(a, b):
+        return(a + b)
+
+#a cooperative scheduler that runs each job as its own uasyncio task at a fixed period,
+#in place of blocking loops with sleep_ms. Each job is a plain function (or an async function if it needs to wait on
+#something itself) and keeps statistics on how late it started, how regular it was, and how often it missed its deadline
+
+#the period tiers used by the Arduino firmware (main.ino), in ms
+TICK_1M = 1
+TICK_100M = 100
+TICK_300M = 300
+TICK_1S = 1000
+TICK_10S = 10000
+
+
+class task():
+    def __init__(self, name, fn, period_ms, deadline_ms = None, nap_ms = None):
+        self.name = name
+        self.fn = fn
+        self.period = period_ms * 1000 #us
+        self.deadline = (deadline_ms if deadline_ms is not None else period_ms) * 1000 #must have finished this long after its slot
+        self.nap = nap_ms * 1000 if nap_ms is not None else None #longest sleep between checks for wake(), None for no wake()
+        self.slot = 0 #us, when the next run is due
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.misses = 0 #runs that finished after their deadline
+        self.skipped = 0 #slots dropped entirely because the task was still running (or starved) when they came round
+        self.late_sum = 0 #us
+        self.late_max = 0 #us the start was after its slot
+        self.jitter_max = 0 #us the gap between two starts differed from the period
+        self.run_max = 0 #us spent in fn
+        self.last_start = None
+
+    def set_period(self, period_ms): #takes effect from the next run, a deadline that was the period follows it
+        if(self.deadline == self.period):
+            self.deadline = period_ms * 1000
+        self.period = period_ms * 1000
+
+    def late_mean(self):
+        return(self.late_sum // self.runs if self.runs else 0)
+
+    def wake(self): #run now rather than at the next slot, seen within nap_ms. The slots carry on a period apart from here
+        self.slot = ticks_us()
+
+    async def loop(self, sched):
+        self.slot = ticks_us()
+        while(sched.running):
+            slot = self.slot
+            start = ticks_us()
+            late = ticks_diff(start, slot)
+            if(late > self.late_max):
+                self.late_max = late
+            self.late_sum += late
+            if(self.last_start is not None):
+                jitter = abs(ticks_diff(start, self.last_start) - self.period)
+                if(jitter > self.jitter_max):
+                    self.jitter_max = jitter
+            self.last_start = start
+            r = self.fn()
+            if(r is not None and hasattr(r, 'send')): #async job
+                await r
+            end = ticks_us()
+            run = ticks_diff(end, start)
+            if(run > self.run_max):
+                self.run_max = run
+            if(ticks_diff(end, slot) > self.deadline):
+                self.misses += 1
+            self.runs += 1
+            slot = ticks_add(slot, self.period)
+            wait = ticks_diff(slot, ticks_us())
+            if(wait < 0): #a whole period or more has gone by, don't try to catch up
+                n = -wait // self.period
+                if(n):
+                    self.skipped += n
+                    slot = ticks_add(slot, n * self.period)
+                    wait = ticks_diff(slot, ticks_us())
+            self.slot = slot
+            if(self.nap is None):
+                await _sleep_us(wait)
+            else: #in naps, so a wake() from another task moving self.slot is seen
+                while(wait > self.nap):
+                    await _sleep_us(self.nap)
+                    wait = ticks_diff(self.slot, ticks_us())
+                await _sleep_us(wait)
+
+
+async def _sleep_us(us):
+    if(us <= 0):
+        await asyncio.sleep(0) #still give the other tasks a turn
+    elif(hasattr(asyncio, 'sleep_ms')):
+        await asyncio.sleep_ms((us + 999) // 1000) #rounded up, waking early would just mean waiting again
+    else:
+        await asyncio.sleep(us / 1000000)
+
+
+class scheduler():
+    def __init__(self):
+        self.tasks = []
+        self.running = False
+
+    def add(self, name, fn, period_ms, deadline_ms = None, nap_ms = None): #fn() is called every period_ms, returns the task for its statistics
+        t = task(name, fn, period_ms, deadline_ms, nap_ms)
+        self.tasks.append(t)
+        return(t)
+
+    async def main(self, duration_ms = None): #runs every task, for duration_ms or until stop() is called
+        self.running = True
+        jobs = [asyncio.create_task(t.loop(self)) for t in self.tasks]
+        if(duration_ms is None):
+            while(self.running):
+                await asyncio.sleep(1)
+        else:
+            await _sleep_us(duration_ms * 1000)
+        self.running = False
+        for j in jobs:
+            j.cancel()
+        await asyncio.sleep(0)
+
+    def run(self, duration_ms = None):
+        asyncio.run(self.main(duration_ms))
+
+    def stop(self):
+        self.running = False
+
+    def report(self): #prints a table of the task statistics, times in us
+        print('task          period   runs  miss  skip   late avg   late max  jitter max   run max')
+        for t in self.tasks:
+            print('{:<12}{:>8}{:>7}{:>6}{:>6}{:>11}{:>11}{:>12}{:>10}'.format(t.name, t.period // 1000, t.runs, t.misses,
+                t.skipped, t.late_mean(), t.late_max, t.jitter_max, t.run_max))
+
+    def reset(self):
+        for t in self.tasks:
+            t.reset()
@@ -0,0 +1,154 @@
+from utime import ticks_us, ticks_diff
+import rawlog
+
+#SPI clock calibration for the SD card
+#sdcard.SDCard initialises the card at 100 kHz and then runs at whatever baudrate it was given (1.32 MHz by default),
+#which is well below what most cards and the wiring can do. clock steps the rate up through RATES, writing a scratch
+#run of sectors at each step and reading it back, and settles on the fastest rate that came back intact.
+#the scratch sectors are a file of their own (SCRATCH_FILE, made once with rawlog.preallocate() and found with
+#rawlog.fat_extent()), so nothing else on the card is ever written while a rate is unproven, and CRCs are on (CMD59)
+#while probing: a command whose address was garbled on the way is rejected by the card instead of landing somewhere else.
+#the result can be kept in a small file on the card itself, so each card remembers its own rate; on the next boot only
+#the cached rate is checked. measure() times writes and reads at the chosen rate, once, when the rate is found
+
+SAFE = 1320000 #the driver's default, every card manages this
+RATES = (1320000, 4000000, 8000000, 10000000, 12500000, 15625000, 20000000, 25000000, 31250000, 40000000)
+CACHE = 'sdclock.txt' #cache file in the root of the card
+SCRATCH_FILE = 'sdclock.bin' #scratch file in the root of the card
+SCRATCH = 4 #sectors
+
+
+#first sector of the scratch file at path (root is where the card is mounted), made if it isn't there yet. None if
+#it can't be used: a card too fragmented to give it one run of sectors, or a device without a FAT rawlog can read
+def scratch_file(sd, path, root, sectors = SCRATCH):
+    for attempt in range(2):
+        try:
+            first, n = rawlog.fat_extent(sd, path[len(root):])
+            if(n >= sectors):
+                return(first)
+        except OSError:
+            pass
+        if(attempt == 0):
+            try:
+                rawlog.preallocate(path, sectors * 512)
+            except OSError:
+                return(None)
+    return(None)
+
+
+class clock():
+    def __init__(self, sd, scratch, sectors = SCRATCH): #scratch: first of sectors sectors that are free to overwrite
+        self.sd = sd
+        self.scratch = scratch
+        self.buf = bytearray(512 * sectors)
+        self.back = bytearray(512 * sectors)
+        self.rate = SAFE
+        self.write_kbs = 0
+        self.read_kbs = 0
+        self.failed = 0 #rate that failed its check, 0 if none did
+        self.cached = False #True if the rate came from the cache file
+
+    def __str__(self):
+        return('SD clock %.2f MHz%s, write %d kB/s, read %d kB/s' % (self.rate / 1000000, ' (cached)' if self.cached else '',
+            self.write_kbs, self.read_kbs))
+
+    def set(self, rate):
+        self.sd.init_spi(rate)
+        self.rate = rate
+
+    def check(self, rate, rounds = 2): #True if the scratch sectors survive a write and read back at rate
+        self.set(rate)
+        buf = self.buf
+        for r in range(rounds):
+            seed = (rate >> 10) + r * 85
+            for i in range(len(buf)):
+                buf[i] = (i * 7 + seed) & 0xFF
+            try:
+                self.sd.writeblocks(self.scratch, buf)
+                self.sd.readblocks(self.scratch, self.back)
+            except OSError:
+                return(False)
+            if(self.back != buf):
+                return(False)
+        return(True)
+
+    def _crc(self, on): #CRC checking while a rate is on trial, set at the safe rate
+        if(hasattr(self.sd, 'set_crc')):
+            if(on):
+                self.set(SAFE)
+            self.sd.set_crc(on)
+
+    def calibrate(self, rates = RATES, rounds = 2): #step up until a rate fails, returns the fastest that passed
+        self._crc(True)
+        good = SAFE
+        self.failed = 0
+        for rate in rates:
+            if(rate <= good):
+                continue
+            if(not self.check(rate, rounds)):
+                self.failed = rate
+                break
+            good = rate
+        self.set(SAFE) #the card may be confused after a failed rate
+        self._crc(False)
+        self.set(good)
+        self.cached = False
+        return(good)
+
+    def measure(self, reps = 8, now = ticks_us, diff = ticks_diff): #write and read rates in kB/s through the scratch sectors
+        sd = self.sd
+        t = now()
+        for i in range(reps):
+            sd.writeblocks(self.scratch, self.buf)
+        if(hasattr(sd, 'ready')): #a cooperative card may still be programming the last one
+            while(not sd.ready()):
+                pass
+        w = diff(now(), t)
+        t = now()
+        for i in range(reps):
+            sd.readblocks(self.scratch, self.back)
+        r = diff(now(), t)
+        kb = reps * len(self.buf) / 1024
+        self.write_kbs = int(kb * 1000000 / w) if w > 0 else 0
+        self.read_kbs = int(kb * 1000000 / r) if r > 0 else 0
+        return(self.write_kbs, self.read_kbs)
+
+    def load(self, path): #cached rate (and the speeds measured with it), None if there isn't one
+        try:
+            f = open(path, 'r')
+        except OSError:
+            return(None)
+        try:
+            v = [int(x) for x in f.read().split()]
+            rate = v[0]
+            if(len(v) >= 3):
+                self.write_kbs = v[1]
+                self.read_kbs = v[2]
+        except (ValueError, IndexError):
+            rate = None
+        f.close()
+        return(rate)
+
+    def save(self, path):
+        f = open(path, 'w')
+        f.write('%d %d %d\n' % (self.rate, self.write_kbs, self.read_kbs))
+        f.close()
+
+    #the whole thing: check the cached rate if there is one, or calibrate, measure and update the cache if there
+    #isn't (or it no longer passes). Returns the rate the card is left running at
+    def tune(self, path = None, rates = RATES):
+        rate = self.load(path) if path else None
+        if(rate is not None):
+            self._crc(True)
+            ok = self.check(rate)
+            self.set(SAFE)
+            self._crc(False)
+            self.set(rate if ok else SAFE)
+            if(ok):
+                self.cached = True
+                return(self.rate)
+        self.calibrate(rates)
+        self.measure()
+        if(path):
+            self.save(path)
+        return(self.rate)
@@ -0,0 +1,157 @@
+import array
+try:
+    from utime import ticks_us, ticks_diff
+except ImportError: #CPython, for testing with fake drivers
+    import time
+    def ticks_us():
+        return(time.perf_counter_ns() // 1000)
+    def ticks_diff(a, b):
+        return(a - b)
+
+#timing spans for the hot paths, with a fixed bucket latency histogram each, for finding bus and card stalls on the car
+#a span counts calls and keeps their total, max and a histogram of their durations (BUCKETS, in us), from which p99 is
+#read off; adding a time never allocates. Spans go round code by hand:
+#    s = timing.get('pack')
+#    t = ticks_us()
+#    ...
+#    s.add(ticks_diff(ticks_us(), t))
+#or round a method of a class with wrap(), which every instance then goes through. instrument() wraps the usual suspects
+#(HOT) and summary() gives a table for the serial port or the card. Nothing is wrapped until instrument() is called,
+#so with profiling off the drivers run exactly as they would without this module. Call it before the card is mounted:
+#VfsFat keeps the block device's readblocks/writeblocks from when it was made, so it would go round the wrappers
+
+BUCKETS = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000) #us, upper bounds, the last bucket is everything over
+
+#(module, class, method, arguments) of the calls instrument() times, see wrap() for arguments
+HOT = (('ADC', 'ADS7830', 'read_channel_se', 1), ('ADC', 'ADS7830', 'scan', 2), ('ADC', 'ADS7830', 'read_burst', 2),
+    ('gyro', 'accel', 'get_values', 0), ('gyro', 'accel', 'read', 0),
+    ('OLED', 'SSD1306', 'show', None),
+    ('SD', 'card', 'write_to_card', None),
+    ('sdcard', 'SDCard', 'readblocks', 2), ('sdcard', 'SDCard', 'writeblocks', 2))
+
+spans = {} #name: span
+_wrapped = [] #(class, method name, original) for uninstrument()
+
+
+class span():
+    def __init__(self, name):
+        self.name = name
+        self.counts = array.array('L', [0] * (len(BUCKETS) + 1))
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.n = 0
+        self.s = 0 #total in whole seconds and us, so it stays a small int however long the race
+        self.us = 0
+        self.max = 0
+
+    def add(self, us): #record one call that took us
+        self.n += 1
+        self.us += us
+        if(self.us >= 1000000):
+            self.s += self.us // 1000000
+            self.us %= 1000000
+        if(us > self.max):
+            self.max = us
+        i = 0
+        for b in BUCKETS:
+            if(us <= b):
+                break
+            i += 1
+        self.counts[i] += 1
+
+    def mean(self): #us
+        return((self.s * 1000000 + self.us) // self.n if self.n else 0)
+
+    #upper bound of the bucket the p'th percentile call falls in (nearest rank: the smallest bucket holding at least p% of
+    #the calls), the max if it's in the last
+    def percentile(self, p = 99):
+        if(self.n == 0):
+            return(0)
+        want = (self.n * p + 99) // 100
+        seen = 0
+        for i in range(len(BUCKETS)):
+            seen += self.counts[i]
+            if(seen >= want):
+                return(min(BUCKETS[i], self.max))
+        return(self.max)
+
+
+def get(name): #the span called name, made the first time
+    if(name not in spans):
+        spans[name] = span(name)
+    return(spans[name])
+
+#the wrappers: one for each number of positional arguments, which call the method without allocating, and one for any
+#arguments (optional or keyword ones), which builds a tuple and a dict on every call
+def _timed0(orig, s):
+    def timed(self):
+        t = ticks_us()
+        r = orig(self)
+        s.add(ticks_diff(ticks_us(), t))
+        return(r)
+    return(timed)
+
+def _timed1(orig, s):
+    def timed(self, a):
+        t = ticks_us()
+        r = orig(self, a)
+        s.add(ticks_diff(ticks_us(), t))
+        return(r)
+    return(timed)
+
+def _timed2(orig, s):
+    def timed(self, a, b):
+        t = ticks_us()
+        r = orig(self, a, b)
+        s.add(ticks_diff(ticks_us(), t))
+        return(r)
+    return(timed)
+
+def _timed_any(orig, s):
+    def timed(self, *args, **kw):
+        t = ticks_us()
+        r = orig(self, *args, **kw)
+        s.add(ticks_diff(ticks_us(), t))
+        return(r)
+    return(timed)
+
+_TIMED = (_timed0, _timed1, _timed2)
+
+#time every call of cls.method as the span called name (default 'class.method'). args is how many arguments every call
+#gives it (0 to 2, not counting self), or None if it has optional or keyword ones
+def wrap(cls, method, name = None, args = None):
+    orig = getattr(cls, method)
+    s = get(name if name else cls.__name__ + '.' + method)
+    make = _TIMED[args] if args is not None else _timed_any
+    setattr(cls, method, make(orig, s))
+    _wrapped.append((cls, method, orig))
+    return(s)
+
+def instrument(hot = HOT): #wrap the calls in hot, modules that can't be imported (e.g. no SD driver) are skipped
+    for mod, cls, method, args in hot:
+        try:
+            m = __import__(mod)
+        except ImportError:
+            continue
+        wrap(getattr(m, cls), method, args = args)
+
+def uninstrument():
+    while(_wrapped):
+        cls, method, orig = _wrapped.pop()
+        setattr(cls, method, orig)
+
+def reset():
+    for s in spans.values():
+        s.reset()
+
+def summary(): #a table of every span that has run, times in us
+    lines = ['span                          calls     mean      p99      max  ' + ' '.join(['%d' % b for b in BUCKETS]) + ' more']
+    for name in spans:
+        s = spans[name]
+        if(s.n):
+            lines.append('{:<28}{:>7}{:>9}{:>9}{:>9}  {}'.format(name, s.n, s.mean(), s.percentile(99), s.max,
+                ' '.join(['%d' % c for c in s.counts])))
+    return('\n'.join(lines) + '\n')
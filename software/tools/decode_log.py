@@ -0,0 +1,69 @@
+#converts binary logs copied off the card into CSV, run on a PC:
+#    python decode_log.py log_0003.bin [out.csv] [--rates rates.csv]
+#raw log files (see rawlog.py) are unwrapped first, frames and delta blocks (delta.py) are told apart by their magic,
+#output goes to stdout if no output file is given. With the rate changes from an adaptive run (see adaptive.py) each row
+#also gets the period it was sampled at in period_ms, for resampling onto an even time base
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import frame
+import delta
+import rawlog
+
+
+def read(path): #the log data in a file, unwrapping a raw log if it is one
+    f = open(path, 'rb')
+    magic = f.read(len(rawlog.MAGIC))
+    f.close()
+    if(magic == rawlog.MAGIC):
+        return(rawlog.load(path))
+    f = open(path, 'rb')
+    data = f.read()
+    f.close()
+    return(data)
+
+def read_rates(path): #rates.csv as a list of (tick, period ms) in the order they were logged
+    ret = []
+    f = open(path)
+    for line in f:
+        parts = line.strip().split(',')
+        if(len(parts) >= 2):
+            ret.append((int(parts[0]), int(parts[1])))
+    f.close()
+    return(ret)
+
+def with_rates(rows, changes, out): #like to_csv(), plus the period of the latest change at or before each row's tick
+    out.write(','.join(frame.FIELDS) + ',timestamp,seq,period_ms\n')
+    k = 0
+    period = changes[0][1] if changes else 0
+    for row in rows:
+        while(k < len(changes) and changes[k][0] <= row[1]):
+            period = changes[k][1]
+            k += 1
+        out.write(','.join(['%g' % v for v in row[2:]]) + ',%d,%d,%d\n' % (row[1], row[0], period))
+
+def main(argv):
+    changes = None
+    if('--rates' in argv):
+        i = argv.index('--rates')
+        changes = read_rates(argv[i + 1])
+        argv = argv[0:i] + argv[i + 2:]
+    if(len(argv) < 2):
+        print('usage: decode_log.py log.bin [out.csv] [--rates rates.csv]')
+        return(2)
+    data = read(argv[1])
+    out = open(argv[2], 'w') if len(argv) > 2 else sys.stdout
+    stats = {}
+    fmt = delta if data[0:len(delta.MAGIC)] == delta.MAGIC else frame
+    if(changes is not None):
+        with_rates(fmt.decode(data, stats), changes, out)
+    else:
+        fmt.to_csv(data, out, stats)
+    if(out is not sys.stdout):
+        out.close()
+    sys.stderr.write('%d damaged stretches skipped, %d rows missing\n' % (stats['bad'], stats['missing']))
+    return(0)
+
+if(__name__ == '__main__'):
+    sys.exit(main(sys.argv))
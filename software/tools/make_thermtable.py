@@ -0,0 +1,16 @@
+#regenerates libraries/thermtable.py for a different thermistor or divider, run on a PC:
+#    python make_thermtable.py [beta] [r25] [r_fixed]
+#defaults are the MF52-103J3950 (beta 3950, 10k at 25C) on the board's 10k divider
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..', 'libraries'))
+import thermtable
+
+args = [float(a) for a in sys.argv[1:4]]
+beta, r25, r_fixed = args + [3950, 10000, 10000][len(args):]
+table = thermtable.build(beta, r25, r_fixed)
+path = os.path.join(here, '..', 'libraries', 'thermtable.py')
+thermtable.write(path, table, 'beta %g, %g ohms at 25C, %g ohm fixed resistor' % (beta, r25, r_fixed))
+print('wrote', os.path.normpath(path))
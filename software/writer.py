@@ -0,0 +1,117 @@
+try:
+    from utime import ticks_us, ticks_diff
+except ImportError: #CPython, for testing with fake drivers
+    import time
+    def ticks_us():
+        return(time.perf_counter_ns() // 1000)
+    def ticks_diff(a, b):
+        return(a - b)
+
+#double (or more) buffered writes to the card, so a slow card write doesn't hold up sampling
+#producers copy their records into the active buffer and a full buffer waits its turn in a queue; step() hands the oldest
+#full buffer to the sink, and is meant to run as its own scheduler task. With ready set (e.g. the ready() of a cooperative
+#sdcard.SDCard) step() leaves the buffer queued while the card is still programming the last one, so neither the producer
+#nor the writer task ever sits waiting on the card, and a latency spike is soaked up by the buffers behind it.
+#when every buffer is full the policy decides: DROP loses the record (counted in dropped), BLOCK writes buffers out on the
+#spot until it fits, which waits on the card like an unbuffered write would. Either way it counts as an overrun
+#the sink is any function that takes a full buffer (a memoryview), e.g. the write() of a rawlog.rawlog or an SD.session
+
+DROP = 0
+BLOCK = 1
+
+
+class writer():
+    def __init__(self, sink, buffers = 2, size = 512, policy = DROP, ready = None):
+        if(buffers < 2):
+            raise ValueError('needs at least two buffers')
+        self.sink = sink
+        self.ready = ready #returns True when the sink can take a buffer without waiting, None to always write
+        self.policy = policy
+        self.size = size
+        self.n = buffers
+        self.bufs = [bytearray(size) for i in range(buffers)]
+        self.mvs = [memoryview(b) for b in self.bufs]
+        self.head = 0 #oldest full buffer, the full ones follow it in order and the active one comes after them
+        self.count = 0 #full buffers waiting for the sink
+        self.fill = 0 #bytes in the active buffer
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.overruns = 0 #writes that found every buffer full
+        self.dropped = 0 #bytes lost to overruns under DROP
+        self.max_fill = 0 #most bytes ever waiting
+        self.written = 0 #bytes handed to the sink
+        self.flushes = 0 #buffers handed to the sink
+        self.deferred = 0 #step() calls that found the sink still busy
+        self.write_max = 0 #us, longest sink call
+
+    def buffered(self): #bytes waiting, full buffers and the active one
+        return(self.count * self.size + self.fill)
+
+    def room(self): #bytes that fit before an overrun
+        return((self.n - self.count) * self.size - self.fill)
+
+    def write(self, data): #returns the number of bytes accepted, a record that does not fit is dropped whole
+        n = len(data)
+        if(n > self.room()):
+            self.overruns += 1
+            if(self.policy == DROP or n > self.n * self.size):
+                self.dropped += n
+                return(0)
+            while(n > self.room()):
+                self._flush_one()
+        size = self.size
+        if(self.fill + n < size): #the common case
+            buf = self.bufs[(self.head + self.count) % self.n]
+            buf[self.fill:self.fill + n] = data
+            self.fill += n
+        else:
+            mv = memoryview(data)
+            i = 0
+            while(i < n):
+                k = min(n - i, size - self.fill)
+                buf = self.bufs[(self.head + self.count) % self.n]
+                buf[self.fill:self.fill + k] = mv[i:i + k]
+                self.fill += k
+                i += k
+                if(self.fill == size): #queue it, the next buffer becomes the active one
+                    self.count += 1
+                    self.fill = 0
+        b = self.buffered()
+        if(b > self.max_fill):
+            self.max_fill = b
+        return(n)
+
+    def write_to_card(self, data, fname = '', directory = ''): #lets a CSV.CSV log through the writer, every file name goes to the one sink
+        return(self.write(data))
+
+    def _flush_one(self):
+        t = ticks_us()
+        self.sink(self.mvs[self.head])
+        t = ticks_diff(ticks_us(), t)
+        if(t > self.write_max):
+            self.write_max = t
+        self.head += 1
+        if(self.head == self.n):
+            self.head = 0
+        self.count -= 1
+        self.written += self.size
+        self.flushes += 1
+
+    def step(self): #write out one full buffer if the sink is ready for it, returns True if it did
+        if(self.count == 0):
+            return(False)
+        if(self.ready is not None and not self.ready()):
+            self.deferred += 1
+            return(False)
+        self._flush_one()
+        return(True)
+
+    def flush(self): #write out everything, the partly filled buffer too, waiting on the sink as needed
+        while(self.count):
+            self._flush_one()
+        if(self.fill):
+            self.sink(self.mvs[self.head][0:self.fill])
+            self.written += self.fill
+            self.flushes += 1
+            self.fill = 0